@@ -1,9 +1,12 @@
 import json
-from openai import OpenAI
 import sys
+from pathlib import Path
 import time
 import re
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.openai_client import get_client
+
 CLASSIFY_INSTRUCTIONS = '''You are a legal expert specialized in categorizing cases based on the aspect of the case specifically related to AI. 
 The case title is: {title}
 The summary of the case is: {text}
@@ -24,9 +27,7 @@ Rule 3: Respond with JSON: {"category": ["category_name1", "category_name2", ...
 
 
 def get_raw_response(prompt, model="gpt-4o-mini", **kwargs):
-    with open("otherkey.txt") as f:
-        key = f.read().strip()
-    client = OpenAI(api_key=key)
+    client = get_client()
 
     max_retries = 5
     for attempt in range(max_retries):
@@ -1,8 +1,13 @@
 import json
 import os
+import sys
 import time
+from pathlib import Path
 from typing import Dict, Any, Optional, List
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.prompt_budget import pack_items, truncate_tokens
+
 INPUT_FILE_PATH = "categories_from_summaries.json"
 OUTPUT_FILE_PATH = "categories_prompt_tuning.json"
 
@@ -19,13 +24,12 @@ TEMPERATURE = float(os.getenv("OPENAI_TEMPERATURE", "0.0"))
 MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
 REQUEST_TIMEOUT = int(os.getenv("OPENAI_REQUEST_TIMEOUT", "60"))
 MAX_SUMMARIES_PER_CLUSTER = int(os.getenv("MAX_SUMMARIES_PER_CLUSTER", "0")) # if non-zero, creates limit
+SUMMARIES_TOKEN_BUDGET = int(os.getenv("SUMMARIES_TOKEN_BUDGET", "24000")) # summary tokens per cluster prompt
+MAX_SUMMARY_TOKENS = int(os.getenv("MAX_SUMMARY_TOKENS", "1000")) # per summary, replaces the 4000-char cut
 
-try:
-    from openai import OpenAI
-    _OPENAI_SDK_V1 = True
-except Exception:
-    import openai as _openai_legacy
-    _OPENAI_SDK_V1 = False
+import openai as _openai
+# The v1 SDK has client classes; older ones only the module-level API
+_OPENAI_SDK_V1 = hasattr(_openai, "OpenAI")
 
 
 # System prompt
@@ -69,10 +73,15 @@ USER_INSTRUCTION_TEMPLATE = (
     "SUMMARIES (each item is one case in the cluster):\n{summaries_block}"
 )
 
+_CLIENT = None
+
 def _openai_client():
-    if _OPENAI_SDK_V1:
-        return OpenAI(api_key=API_KEY)
-    return None
+    # Built once so every cluster and retry reuses the same pooled connections
+    global _CLIENT
+    if _OPENAI_SDK_V1 and _CLIENT is None:
+        from common.openai_client import build_client
+        _CLIENT = build_client(api_key=API_KEY)
+    return _CLIENT
 
 
 def _format_summaries_block(summaries: List[str]) -> str:
@@ -80,8 +89,7 @@ def _format_summaries_block(summaries: List[str]) -> str:
     for i, s in enumerate(summaries, 1):
         s = (s or "").strip()
         # Guard against runaway length per line
-        if len(s) > 4000:
-            s = s[:4000] + "…"
+        s = truncate_tokens(s, MAX_SUMMARY_TOKENS, model=MODEL)
         lines.append(f"{i}. {s}")
     return "\n".join(lines)
 
@@ -115,6 +123,17 @@ def classify_cluster_with_gpt(cluster_name: str, summaries: List[str]) -> Dict[s
     else:
         use_summaries = summaries
 
+    # Most representative summaries that fit the token budget
+    packed = pack_items(
+        [(s or "").strip() for s in use_summaries],
+        SUMMARIES_TOKEN_BUDGET,
+        model=MODEL,
+        separator="\n",
+        max_item_tokens=MAX_SUMMARY_TOKENS,
+    )
+    use_summaries = [use_summaries[i] for i in packed.indices]
+    print(f"  sending {len(use_summaries)}/{len(summaries)} summaries, {packed.tokens:,} tokens", flush=True)
+
     payload_messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {
@@ -143,8 +162,8 @@ def classify_cluster_with_gpt(cluster_name: str, summaries: List[str]) -> Dict[s
                 )
                 content = resp.choices[0].message.content
             else:
-                _openai_legacy.api_key = API_KEY
-                resp = _openai_legacy.ChatCompletion.create(
+                _openai.api_key = API_KEY
+                resp = _openai.ChatCompletion.create(
                     model=MODEL,
                     messages=payload_messages,
                     temperature=TEMPERATURE,
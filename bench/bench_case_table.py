@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Time to load a few columns (x, y and the cluster ids) of the processed output
+three ways: json.load of the whole file, streaming it with
+common/processed_io.py, and reading the columnar case table written by
+common/case_table.py. Also reports the write time and on-disk size of each.
+
+Documents are the synthetic ones from bench_processed_io.py. The first table
+read after writing is served from the page cache, as it would be on a
+workstation re-running the downstream scripts.
+
+    python bench/bench_case_table.py
+    python bench/bench_case_table.py --sizes 10000 100000 --text-chars 20000
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+sys.path.append(str(ROOT / "bench"))
+from common.case_table import write_case_table, load_columns, table_dir
+from common.processed_io import write_processed, iter_documents
+from bench_processed_io import synthetic_document, meta_for
+
+COLUMNS = ["x", "y", "kmeans_cluster", "hdbscan_cluster"]
+
+
+def size_mb(path):
+    path = Path(path)
+    files = path.iterdir() if path.is_dir() else [path]
+    return sum(f.stat().st_size for f in files) / 2**20
+
+
+def timed(fn, repeat=3):
+    """Best of `repeat` runs, in seconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def json_load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        docs = json.load(f)["documents"]
+    return {name: [d[name] for d in docs] for name in COLUMNS}
+
+
+def json_stream(path):
+    values = {name: [] for name in COLUMNS}
+    for doc in iter_documents(path, exclude=("full_text", "summary")):
+        for name in COLUMNS:
+            values[name].append(doc[name])
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--text-chars", type=int, default=20000, help="length of each synthetic full_text")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = Path(tmp) / f"cases_{n}.json"
+            docs = lambda: (synthetic_document(i, args.text_chars) for i in range(n))
+            json_write = timed(lambda: write_processed(path, docs(), meta_for(n)), repeat=1)
+            table_write = timed(lambda: write_case_table(path, docs()), repeat=1)
+            loaded = load_columns(path, COLUMNS)
+            assert len(loaded["x"]) == n
+
+            print(f"\n{n} documents, full_text {args.text_chars} chars, loading {', '.join(COLUMNS)}")
+            print(f"  JSON written in {json_write:.2f}s ({size_mb(path):.0f} MB), "
+                  f"case table in {table_write:.2f}s ({size_mb(table_dir(path)):.0f} MB)")
+            for label, fn in [
+                ("json.load", lambda: json_load(path)),
+                ("streamed JSON", lambda: json_stream(path)),
+                ("case table", lambda: load_columns(path, COLUMNS)),
+            ]:
+                print(f"  {label:<16}{1000 * timed(fn, args.repeat):>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
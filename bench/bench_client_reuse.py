@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Per-request latency of building a fresh OpenAI client for every case (the old
+extract_case_structure pattern) vs. reusing the pooled client from
+common/openai_client.py, measured against the local mock server.
+
+    python bench/bench_client_reuse.py --requests 200 --latency 0.02
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from openai import OpenAI
+
+from common.mock_openai_server import MockOpenAIServer
+from common.openai_client import build_client
+
+REQUEST = {
+    "model": "gpt-5.1",
+    "messages": [{"role": "user", "content": "Extract information from this court case. " * 20}],
+    "temperature": 0,
+}
+
+
+def time_requests(n, make_client):
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client = make_client()
+        client.chat.completions.create(**REQUEST)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[int(0.95 * (len(ordered) - 1))]
+    print(f"  {label:<28} mean {1000 * statistics.mean(latencies):7.2f} ms   "
+          f"p50 {1000 * statistics.median(latencies):7.2f} ms   p95 {1000 * p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="mock server think time in seconds")
+    args = parser.parse_args()
+
+    with MockOpenAIServer(latency=args.latency) as server:
+        print(f"{args.requests} sequential requests, mock latency {1000 * args.latency:.0f} ms")
+
+        # Before: new client (and connection) per case
+        before = time_requests(
+            args.requests,
+            lambda: OpenAI(api_key="mock", base_url=server.base_url)
+        )
+        report("client per request", before)
+
+        # After: one pooled keep-alive client, response cache off so every call hits the server
+        shared = build_client(api_key="mock", base_url=server.base_url, cached=False)
+        after = time_requests(args.requests, lambda: shared)
+        report("shared pooled client", after)
+
+    saved = statistics.mean(before) - statistics.mean(after)
+    print(f"\n  Saved {1000 * saved:.2f} ms per request "
+          f"({100 * saved / statistics.mean(before):.0f}%). Over TLS the gap also includes a handshake per request.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Compare the clustering spaces in cont1/cluster_space.py: time to compute the
+features, K-Means and HDBSCAN runtime on them, and silhouette scores via
+misc/silh.py.
+
+Every space's labels are scored twice: in the space itself, and in the raw
+embeddings with cosine distance. The second number is comparable across
+spaces; a high first number with a low second one means the clusters are
+mostly an artefact of the projection. HDBSCAN is scored on its core
+(non-noise) points, as in silh.py.
+
+Uses the embeddings.npz written by 2_process+cluster_cses.py, or synthetic
+768-d vectors. UMAP spaces are skipped when umap is not installed.
+
+    python bench/bench_cluster_space.py cont1/embeddings.npz
+    python bench/bench_cluster_space.py --synthetic 5000
+"""
+import argparse
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT / "cont1"))
+sys.path.append(str(ROOT / "misc"))
+from cluster_space import project, CLUSTER_SPACES
+from silh import safe_silhouette
+from bench_knn import synthetic_embeddings
+
+
+def hdbscan_labels(features):
+    # Same settings as 2_5_testing.py; sklearn's implementation if hdbscan is missing
+    if importlib.util.find_spec("hdbscan") is not None:
+        from hdbscan import HDBSCAN
+    else:
+        from sklearn.cluster import HDBSCAN
+    return HDBSCAN(min_cluster_size=5, min_samples=3, cluster_selection_epsilon=0.0,
+                   metric="euclidean").fit_predict(features)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("embeddings", nargs="?", help="embeddings.npz from 2_process+cluster_cses.py")
+    parser.add_argument("--synthetic", type=int, help="use this many synthetic 768-d vectors instead")
+    parser.add_argument("--spaces", nargs="+", default=list(CLUSTER_SPACES), choices=CLUSTER_SPACES)
+    parser.add_argument("--n-kmeans", type=int, help="K-Means clusters (default: as 2_5_testing.py)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        embeddings = synthetic_embeddings(args.synthetic)
+    elif args.embeddings:
+        with np.load(args.embeddings) as npz:
+            embeddings = npz["embeddings"].astype(np.float32)
+    else:
+        parser.error("pass embeddings.npz or --synthetic N")
+
+    from sklearn.cluster import KMeans
+
+    n_docs = len(embeddings)
+    n_kmeans = args.n_kmeans or min(max(n_docs // 25, 15), 30)
+    has_umap = importlib.util.find_spec("umap") is not None
+
+    results = []
+    for space in args.spaces:
+        if space.startswith("umap") and not has_umap:
+            print(f"Skipping {space}: umap is not installed")
+            continue
+        print(f"\n{space}:")
+        if space == "umap2d":
+            from umap import UMAP
+            features, t_space = timed(UMAP(n_components=2, random_state=42, n_neighbors=15,
+                                           min_dist=0.01).fit_transform, embeddings)
+        else:
+            features, t_space = timed(project, embeddings, space)
+
+        labels_km, t_km = timed(KMeans(n_clusters=n_kmeans, random_state=42, n_init=10).fit_predict, features)
+        labels_hdb, t_hdb = timed(hdbscan_labels, features)
+        core = labels_hdb != -1
+
+        results.append({
+            "space": space,
+            "dim": features.shape[1],
+            "t_space": t_space,
+            "t_kmeans": t_km,
+            "t_hdbscan": t_hdb,
+            "hdb_clusters": len(set(labels_hdb[core])),
+            "noise": 1 - core.mean(),
+            "km_own": safe_silhouette(features, labels_km, f"K-Means, {space}"),
+            "km_raw": safe_silhouette(embeddings, labels_km, "K-Means, raw cosine", metric="cosine"),
+            "hdb_own": safe_silhouette(features[core], labels_hdb[core], f"HDBSCAN core, {space}") if core.any() else None,
+            "hdb_raw": safe_silhouette(embeddings[core], labels_hdb[core], "HDBSCAN core, raw cosine",
+                                       metric="cosine") if core.any() else None,
+        })
+
+    def fmt(score):
+        return f"{score:.3f}" if score is not None else "N/A"
+
+    print(f"\n{n_docs} documents, {n_kmeans} K-Means clusters\n")
+    print(f"{'space':<7} {'dim':>4} {'space s':>8} {'kmeans s':>9} {'hdbscan s':>10} {'hdb k':>6} {'noise':>6}  "
+          f"{'silhouette K-Means own/raw':>27}  {'HDBSCAN own/raw':>16}")
+    for r in results:
+        print(f"{r['space']:<7} {r['dim']:>4} {r['t_space']:8.1f} {r['t_kmeans']:9.1f} {r['t_hdbscan']:10.1f} "
+              f"{r['hdb_clusters']:>6} {100 * r['noise']:5.0f}%  "
+              f"{fmt(r['km_own']) + ' / ' + fmt(r['km_raw']):>27}  {fmt(r['hdb_own']) + ' / ' + fmt(r['hdb_raw']):>16}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Latency, throughput and peak memory of the LegalBERT embedding backends
+(torch, onnx, onnx-int8), plus cosine similarity of each backend's CLS
+vectors to the PyTorch ones.
+
+Every backend runs in its own fresh process, so the peak RSS reported is
+that backend's alone (model load included). ONNX models are exported on the
+first run and reused afterwards.
+
+    python bench/bench_embedding_backends.py cont1/court_cases_with_summaries.json --limit 300 --threads 4
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "cont1"))
+
+
+def run_backend(backend, summaries, batch_size, threads):
+    from embedding_engine import load_encoder, embed_texts
+
+    start = time.perf_counter()
+    tokenizer, model = load_encoder(backend, num_threads=threads)
+    load_seconds = time.perf_counter() - start
+
+    # Warm up, then time single-summary latency and batched throughput
+    embed_texts(summaries[:batch_size], tokenizer, model, batch_size=batch_size, num_threads=threads, progress_every=0)
+    latencies = []
+    for summary in summaries[:20]:
+        start = time.perf_counter()
+        embed_texts([summary], tokenizer, model, batch_size=1, num_threads=threads, progress_every=0)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    embeddings = embed_texts(summaries, tokenizer, model, batch_size=batch_size, num_threads=threads, progress_every=0)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "load_s": load_seconds,
+        "latency_ms": 1000 * float(np.median(latencies)),
+        "docs_per_s": len(summaries) / elapsed,
+        "peak_rss_mb": peak_mb,
+        "embeddings": embeddings,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="court_cases_with_summaries.json")
+    parser.add_argument("--limit", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--threads", type=int, default=0, help="intra-op threads (0 = default)")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        summaries = [d["summary"] for d in json.load(f)][:args.limit]
+
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    for backend in args.backends:
+        with ctx.Pool(1) as pool:
+            results[backend] = pool.apply(run_backend, (backend, summaries, args.batch_size, args.threads))
+
+    from embedding_onnx import cosine_rows, MIN_COSINE
+
+    reference = results.get("torch", {}).get("embeddings")
+    print(f"\n{len(summaries)} summaries, batch size {args.batch_size}, threads {args.threads or 'default'}\n")
+    print(f"{'backend':<11} {'load s':>7} {'p50 ms/doc':>11} {'docs/s':>8} {'peak RSS MB':>12} {'min cos':>9} {'mean cos':>9}")
+    for backend, r in results.items():
+        cos_min = cos_mean = ""
+        if reference is not None:
+            cosine = cosine_rows(reference, r["embeddings"])
+            cos_min, cos_mean = f"{np.min(cosine):.5f}", f"{np.mean(cosine):.5f}"
+        print(f"{backend:<11} {r['load_s']:7.1f} {r['latency_ms']:11.1f} {r['docs_per_s']:8.1f} "
+              f"{r['peak_rss_mb']:12.0f} {cos_min:>9} {cos_mean:>9}")
+    if reference is not None:
+        print(f"\nQuality threshold: min cosine >= {MIN_COSINE}")
+
+
+if __name__ == "__main__":
+    main()
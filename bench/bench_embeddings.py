@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Compare the original one-summary-at-a-time LegalBERT loop with the batched,
+length-sorted engine in cont1/embedding_engine.py: docs/s for each batch
+size, plus how far the batched CLS vectors are from the loop's.
+
+    python bench/bench_embeddings.py cont1/court_cases_with_summaries.json --limit 200 --batch-sizes 8 16 32
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "cont1"))
+from embedding_engine import load_legalbert_model, embed_texts
+
+
+def legacy_embeddings(summaries, tokenizer, model):
+    """The loop generate_embeddings used to run"""
+    embeddings = []
+    model.eval()
+    for summary in summaries:
+        inputs = tokenizer(summary, return_tensors="pt", truncation=True, max_length=512, padding=True)
+        with torch.no_grad():
+            outputs = model(**inputs)
+            embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()
+        embeddings.append(embedding[0])
+    return np.array(embeddings)
+
+
+def compare(reference, embeddings):
+    cosine = np.sum(reference * embeddings, axis=1) / (
+        np.linalg.norm(reference, axis=1) * np.linalg.norm(embeddings, axis=1)
+    )
+    return float(np.max(np.abs(reference - embeddings))), float(np.min(cosine))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="court_cases_with_summaries.json")
+    parser.add_argument("--limit", type=int, default=200, help="summaries to embed")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16, 32])
+    parser.add_argument("--threads", type=int, default=0, help="torch threads (0 = default)")
+    args = parser.parse_args()
+
+    with open(args.input, encoding="utf-8") as f:
+        summaries = [d["summary"] for d in json.load(f)][:args.limit]
+    tokenizer, model = load_legalbert_model()
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    start = time.perf_counter()
+    reference = legacy_embeddings(summaries, tokenizer, model)
+    elapsed = time.perf_counter() - start
+    print(f"\n{'legacy loop':<16} {len(summaries) / elapsed:7.1f} docs/s")
+
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        embeddings = embed_texts(summaries, tokenizer, model, batch_size=batch_size,
+                                 num_threads=args.threads, progress_every=0)
+        batched = time.perf_counter() - start
+        max_diff, min_cos = compare(reference, embeddings)
+        print(f"{f'batch {batch_size}':<16} {len(summaries) / batched:7.1f} docs/s  "
+              f"{elapsed / batched:4.1f}x  max |diff| {max_diff:.2e}  min cosine {min_cos:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Startup cost of the pipeline scripts, measured with `python -X importtime`.
+
+Each script is loaded in a fresh interpreter with runpy under a name other
+than __main__, so its module-level code (imports, model loading) runs but
+main() does not. Reports wall time, the import time Python records, and the
+slowest top-level imports. With --max-seconds the exit status is 1 when any
+script is slower, so CI can track regressions; --json writes the numbers.
+
+    python bench/bench_import_time.py
+    python bench/bench_import_time.py --max-seconds 1.0 --json import_times.json
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCRIPTS = [
+    "cont1/1_prep_cases.py",
+    "cont1/2_process+cluster_cses.py",
+    "cont1/2_5_testing.py",
+    "cont1/3_create_vis.py",
+    "cont1/3_5_create_vis.py",
+    "cont1/count.py",
+    "cont2/3_breakdown.py",
+    "cont2/4_actors_breakdown.py",
+    "cont2/6_ai_type.py",
+    "cont2_rd2/2_llm_label.py",
+    "cont2_rd2/3_julie_basic_analysis.py",
+    "cont2_rd2/3_rock_basic_analysis.py",
+    "cont2_rd2/4_julie_analysis_playground.py",
+]
+
+# import time: self [us] | cumulative | imported package
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+_LOADER = (
+    "import runpy, sys; sys.path.insert(0, {folder!r}); "
+    "runpy.run_path({path!r}, run_name='__bench__')"
+)
+
+
+def measure(script):
+    path = ROOT / script
+    code = _LOADER.format(folder=str(path.parent), path=str(path))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=path.parent, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+
+    top_level = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        # Nesting is shown by indentation; one leading space means top level
+        if m and len(m.group(3)) == 1:
+            top_level.append((int(m.group(2)) / 1e6, m.group(4)))
+    error = None
+    if proc.returncode != 0:
+        lines = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        error = lines[-1] if lines else f"exit status {proc.returncode}"
+    return {
+        "script": script,
+        "wall_s": wall,
+        "import_s": sum(t for t, _ in top_level),
+        "slowest": sorted(top_level, reverse=True)[:3],
+        "error": error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("scripts", nargs="*", default=SCRIPTS, help="paths relative to the repo root")
+    parser.add_argument("--max-seconds", type=float, help="fail if any script takes longer to load")
+    parser.add_argument("--json", help="write the measurements to this file")
+    args = parser.parse_args()
+
+    results = [measure(script) for script in args.scripts]
+
+    print(f"{'script':<44} {'wall s':>7} {'import s':>9}  slowest imports")
+    for r in results:
+        slowest = ", ".join(f"{name} {t:.2f}s" for t, name in r["slowest"])
+        print(f"{r['script']:<44} {r['wall_s']:7.2f} {r['import_s']:9.2f}  {slowest}")
+        if r["error"]:
+            print(f"{'':<44} ! {r['error']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.max_seconds is not None:
+        slow = [r for r in results if r["wall_s"] > args.max_seconds]
+        for r in slow:
+            print(f"FAIL {r['script']}: {r['wall_s']:.2f}s > {args.max_seconds:.2f}s")
+        sys.exit(1 if slow else 0)
+
+
+if __name__ == "__main__":
+    main()
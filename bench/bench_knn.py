@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Build time and recall of the kNN graph backends in cont1/knn_graph.py on
+synthetic 768-d embeddings (clustered Gaussians, like LegalBERT CLS vectors)
+at growing corpus sizes.
+
+Recall@k is measured against brute-force neighbours of a random sample of
+rows. Backends that are not installed are skipped; `exact` is skipped above
+--exact-max rows. With --umap, UMAP is also fit with and without the
+precomputed graph, to show how much of the fit the graph accounts for.
+
+    python bench/bench_knn.py --sizes 1000 10000 100000 --umap
+"""
+import argparse
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "cont1"))
+from knn_graph import build_knn, KNN_BACKENDS, N_NEIGHBORS
+
+_MODULES = {"pynndescent": "pynndescent", "hnswlib": "hnswlib", "exact": "sklearn"}
+
+
+def synthetic_embeddings(n, dim=768, n_topics=50, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=1.0, size=(n_topics, dim)).astype(np.float32)
+    topics = rng.integers(n_topics, size=n)
+    return centers[topics] + rng.normal(scale=0.6, size=(n, dim)).astype(np.float32)
+
+
+def true_neighbors(embeddings, rows, k):
+    """Brute-force k nearest rows of embeddings[rows], in chunks"""
+    sq_norms = np.einsum("ij,ij->i", embeddings, embeddings)
+    result = []
+    for chunk in np.array_split(rows, max(1, len(rows) // 256)):
+        d = sq_norms[chunk, None] - 2 * embeddings[chunk] @ embeddings.T + sq_norms[None, :]
+        result.append(np.argpartition(d, k, axis=1)[:, :k])
+    return np.concatenate(result)
+
+
+def recall(indices, truth, rows):
+    hits = sum(len(set(indices[r]) & set(t)) for r, t in zip(rows, truth))
+    return hits / truth.size
+
+
+def time_umap(embeddings, knn=None):
+    from umap import UMAP
+
+    start = time.perf_counter()
+    if knn is None:
+        UMAP(n_neighbors=N_NEIGHBORS, random_state=42).fit(embeddings)
+    else:
+        UMAP(n_neighbors=N_NEIGHBORS, random_state=42, precomputed_knn=knn).fit(embeddings)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=N_NEIGHBORS)
+    parser.add_argument("--backends", nargs="+", default=list(KNN_BACKENDS), choices=KNN_BACKENDS)
+    parser.add_argument("--sample", type=int, default=500, help="rows whose recall is checked")
+    parser.add_argument("--exact-max", type=int, default=20000, help="largest size the exact backend runs at")
+    parser.add_argument("--umap", action="store_true", help="also time UMAP fits with and without the graph")
+    args = parser.parse_args()
+
+    backends = []
+    for backend in args.backends:
+        if importlib.util.find_spec(_MODULES[backend]) is None:
+            print(f"Skipping {backend}: {_MODULES[backend]} is not installed")
+        else:
+            backends.append(backend)
+
+    print(f"\n{'rows':>8} {'backend':<12} {'build s':>8} {f'recall@{args.k}':>10} {'UMAP fit s':>11}")
+    for n in args.sizes:
+        embeddings = synthetic_embeddings(n, args.dim)
+        rows = np.random.default_rng(1).choice(n, size=min(args.sample, n), replace=False)
+        truth = true_neighbors(embeddings, rows, args.k)
+
+        if args.umap:
+            print(f"{n:>8} {'(internal)':<12} {'':>8} {'':>10} {time_umap(embeddings):11.1f}")
+        for backend in backends:
+            if backend == "exact" and n > args.exact_max:
+                continue
+            start = time.perf_counter()
+            knn = build_knn(embeddings, args.k, backend=backend)
+            build = time.perf_counter() - start
+            fit = f"{time_umap(embeddings, knn):11.1f}" if args.umap else ""
+            print(f"{n:>8} {backend:<12} {build:8.1f} {recall(knn[0], truth, rows):10.3f} {fit:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Compare PDF text extraction paths on a local folder of opinions:
+
+  legacy   - the original loop: PyPDF2, `text += page.extract_text()`, one process
+  <backend> - cont1/pdf_extract.py backends, single process and across a process pool
+
+Pages are chosen exactly like step 1 (first MAX_PAGES + last LAST_PAGES).
+
+    python bench/bench_pdf_extract.py path/to/pdfs --workers 8
+"""
+import argparse
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "cont1"))
+from pdf_extract import BACKENDS, open_pdf
+from pdf_pipeline import extract_pdf_text, select_pages
+
+MAX_PAGES = 17
+LAST_PAGES = 5
+
+
+def legacy_extract(data, max_pages, last_pages):
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    total_pages = len(pdf_reader.pages)
+    pages_to_extract, _ = select_pages(total_pages, max_pages, last_pages)
+    text = ""
+    for i in pages_to_extract:
+        text += pdf_reader.pages[i].extract_text()
+    return {'text': text, 'extracted_pages': pages_to_extract}
+
+
+def _safe(fn, *args):
+    try:
+        return fn(*args)
+    except Exception:
+        return None
+
+
+def run(label, fn, blobs, workers):
+    start = time.perf_counter()
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_safe, [fn] * len(blobs), *zip(*blobs)))
+    else:
+        results = [_safe(fn, *args) for args in blobs]
+    elapsed = time.perf_counter() - start
+
+    ok = [r for r in results if r is not None]
+    pages = sum(len(r['extracted_pages']) for r in ok)
+    chars = sum(len(r['text']) for r in ok)
+    print(f"  {label:<22} {elapsed:7.2f}s  {len(ok) / elapsed:7.1f} docs/s  {pages / elapsed:8.1f} pages/s  "
+          f"{chars:>11,} chars  ({len(results) - len(ok)} failed)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("folder", help="directory of sample PDFs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    args = parser.parse_args()
+
+    paths = sorted(Path(args.folder).rglob("*.pdf"))
+    data = [p.read_bytes() for p in paths]
+    print(f"{len(paths)} PDFs ({sum(map(len, data)) / 1e6:.1f} MB), {args.workers} workers\n")
+
+    baseline = run("legacy (1 proc)", legacy_extract, [(d, MAX_PAGES, LAST_PAGES) for d in data], 1)
+    for backend in args.backends:
+        blobs = [(d, MAX_PAGES, LAST_PAGES, backend) for d in data]
+        try:
+            open_pdf(data[0], backend).close()
+        except ImportError as e:
+            print(f"  {backend:<22} skipped: {e}")
+            continue
+        except Exception:
+            pass
+        single = run(f"{backend} (1 proc)", extract_pdf_text, blobs, 1)
+        pooled = run(f"{backend} ({args.workers} procs)", extract_pdf_text, blobs, args.workers)
+        print(f"  {'':<22} speedup vs legacy: {baseline / single:.1f}x single, {baseline / pooled:.1f}x pooled")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Peak memory, time and file size for writing and reading the processed output
+(court_cases_processed.json) with common/processed_io.py, against the old way:
+build the whole list of documents, then json.dump(indent=2) / json.load it.
+
+Every mode runs in a fresh subprocess, so the reported peak RSS (ru_maxrss)
+belongs to that mode alone. Documents are synthetic, shaped like the ones
+save_processed_data writes; --text-chars sets the length of full_text, which
+dominates their size.
+
+    python bench/bench_processed_io.py
+    python bench/bench_processed_io.py --sizes 10000 100000 --text-chars 40000
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+from common.processed_io import write_processed, iter_documents, read_meta
+
+WRITE_MODES = ("legacy", "json", "jsonl")
+READ_MODES = ("legacy", "stream", "stream-no-text")
+
+
+def synthetic_document(i, text_chars):
+    words = ("court", "plaintiff", "motion", "dismissed", "algorithm", "liability", "claim", "appeal")
+    text = " ".join(words[(i + j) % len(words)] for j in range(text_chars // 8))[:text_chars]
+    return {
+        "case_id": f"case-{i:07d}",
+        "case_name": f"Plaintiff {i} v. Defendant {i}",
+        "summary": text[:600],
+        "full_text": text,
+        "kmeans_cluster": i % 40,
+        "hdbscan_cluster": i % 300 - 1,
+        "legal_category_name": ("Tort", "IP Law", "Consumer Protection")[i % 3],
+        "hierarchical_path": f"Topic {i % 40} > Subcluster {i % 300}",
+        "x": (i % 997) / 997.0,
+        "y": (i % 991) / 991.0,
+    }
+
+
+def meta_for(n_docs):
+    return {"methodology": "benchmark", "n_documents": n_docs, "n_kmeans_topics": 40}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_write(mode, path, n_docs, text_chars):
+    docs = (synthetic_document(i, text_chars) for i in range(n_docs))
+    start = time.perf_counter()
+    if mode == "legacy":
+        data = {"documents": list(docs), "meta": meta_for(n_docs)}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+    else:
+        path = write_processed(path, docs, meta_for(n_docs), format=mode)
+    return time.perf_counter() - start, Path(path).stat().st_size
+
+
+def run_read(mode, path):
+    start = time.perf_counter()
+    if mode == "legacy":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        docs = data["documents"]
+    else:
+        exclude = ("full_text",) if mode == "stream-no-text" else ()
+        docs = list(iter_documents(path, exclude=exclude))
+        read_meta(path)
+    return time.perf_counter() - start, len(docs)
+
+
+def child(args):
+    if args.child == "write":
+        elapsed, size = run_write(args.mode, args.path, args.n, args.text_chars)
+        print(json.dumps({"seconds": elapsed, "bytes": size, "rss_mb": peak_rss_mb()}))
+    else:
+        elapsed, n = run_read(args.mode, args.path)
+        print(json.dumps({"seconds": elapsed, "docs": n, "rss_mb": peak_rss_mb()}))
+
+
+def spawn(*argv):
+    out = subprocess.run([sys.executable, __file__, *map(str, argv)], check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--text-chars", type=int, default=20000, help="length of each synthetic full_text")
+    parser.add_argument("--child", choices=["write", "read"], help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    parser.add_argument("--n", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            print(f"\n{n} documents, full_text {args.text_chars} chars")
+            print(f"  {'write':<24}{'seconds':>10}{'peak RSS MB':>14}{'file MB':>10}")
+            files = {}
+            for mode in WRITE_MODES:
+                path = Path(tmp) / f"{mode}.json"
+                r = spawn("--child", "write", "--mode", mode, "--path", path, "--n", n,
+                          "--text-chars", args.text_chars)
+                files[mode] = path.with_suffix(".jsonl") if mode == "jsonl" else path
+                print(f"  {mode:<24}{r['seconds']:>10.2f}{r['rss_mb']:>14.0f}{r['bytes'] / 2**20:>10.0f}")
+
+            print(f"  {'read':<24}{'seconds':>10}{'peak RSS MB':>14}")
+            for mode in READ_MODES:
+                sources = ["legacy"] if mode == "legacy" else ["json", "jsonl"]
+                for source in sources:
+                    r = spawn("--child", "read", "--mode", mode, "--path", files[source])
+                    label = mode if mode == "legacy" else f"{mode} ({source})"
+                    print(f"  {label:<24}{r['seconds']:>10.2f}{r['rss_mb']:>14.0f}")
+            for path in Path(tmp).iterdir():
+                path.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Helpers shared by the scripts in cont1/, cont2/, cont2_rd2/ and 3d_vis/.
+
+The scripts are run directly from their own folders, so they put the repo
+root on sys.path before importing from here.
+"""
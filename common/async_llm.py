@@ -0,0 +1,153 @@
+"""
+Async runner for bulk chat-completion calls.
+
+Requests run concurrently up to a fixed limit, are paced by token buckets for
+requests/minute and tokens/minute, and are retried with exponential backoff on
+429 / 5xx / connection errors. Results come back in input order.
+
+Point OPENAI_BASE_URL at common/mock_openai_server.py to run it offline.
+"""
+import asyncio
+import os
+import random
+import time
+
+
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_RPM", "500"))
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TPM", "450000"))
+CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Refills `rate` units per second up to `capacity`; acquire() waits for enough units"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        # A single request bigger than the bucket would wait forever
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Requests/minute and tokens/minute buckets shared by every call in a run"""
+
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute / 60.0, capacity=max(1, requests_per_minute // 60))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, capacity=tokens_per_minute)
+
+    async def acquire(self, estimated_tokens):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(estimated_tokens)
+
+
+class RunStats:
+    def __init__(self):
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def record_usage(self, usage):
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+        self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def report(self):
+        elapsed = max(self.elapsed, 1e-9)
+        total_tokens = self.prompt_tokens + self.completion_tokens
+        print(f"\nOpenAI throughput:")
+        print(f"  {self.requests} requests ({self.failures} failed, {self.retries} retries) in {elapsed:.1f}s")
+        print(f"  {self.requests / elapsed:.2f} requests/s, {total_tokens / elapsed:,.0f} tokens/s "
+              f"({self.prompt_tokens:,} prompt + {self.completion_tokens:,} completion)")
+
+
+def estimate_tokens(request):
+    """Rough prompt + completion size used for the tokens/minute bucket (~4 chars per token)"""
+    chars = sum(len(str(m.get("content", ""))) for m in request.get("messages", []))
+    return chars // 4 + request.get("max_tokens", request.get("max_completion_tokens", 500))
+
+
+def is_retryable(error):
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return getattr(error, "status_code", None) in RETRY_STATUS
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+async def call_with_retries(client, request, limiter, stats, max_retries=MAX_RETRIES):
+    """One chat completion, paced by `limiter` and retried with backoff on transient errors"""
+    delay = 1.0
+    for attempt in range(max_retries + 1):
+        await limiter.acquire(estimate_tokens(request))
+        try:
+            response = await client.chat.completions.create(**request)
+            stats.record_usage(getattr(response, "usage", None))
+            return response
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            stats.retries += 1
+            wait = _retry_after(e) or delay * random.uniform(0.5, 1.5)
+            await asyncio.sleep(wait)
+            delay = min(delay * 2, 60)
+
+
+async def run_chat_requests(client, requests, concurrency=CONCURRENCY, limiter=None,
+                            max_retries=MAX_RETRIES, on_done=None):
+    """
+    Run chat.completions.create(**request) for every request on an AsyncOpenAI client.
+    Returns (results, stats); each result is the response or the exception that
+    ended its retries, in the same order as `requests`.
+    on_done(index, result) is called as each request finishes.
+    """
+    limiter = limiter or RateLimiter()
+    stats = RunStats()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker(i, request):
+        async with semaphore:
+            try:
+                result = await call_with_retries(client, request, limiter, stats, max_retries)
+            except Exception as e:
+                stats.failures += 1
+                result = e
+            stats.requests += 1
+            if on_done:
+                on_done(i, result)
+            return result
+
+    results = await asyncio.gather(*(worker(i, r) for i, r in enumerate(requests)))
+    stats.elapsed = time.perf_counter() - stats.started
+    return results, stats
@@ -0,0 +1,230 @@
+"""
+OpenAI Batch API mode for offline bulk jobs (summaries, case extraction).
+
+Requests are written to a JSONL file, submitted as one batch, polled until the
+batch finishes, and the results are mapped back to cases by custom_id. Batches
+cost half as much as synchronous calls and are not subject to the per-minute
+rate limits.
+
+The submit/poll layer is a small backend interface (submit, status, results):
+OpenAIBatchBackend talks to the real API, FileBatchBackend completes batches
+locally so the whole flow can be run offline.
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from common.fake_completions import completion_payload, default_reply
+
+ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Batch API limits per input file: requests, and bytes
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+
+
+class BatchItemError(Exception):
+    """A single request inside a batch failed"""
+
+
+def _batch_line(custom_id, body):
+    return json.dumps({
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": ENDPOINT,
+        "body": body,
+    }, ensure_ascii=False) + "\n"
+
+
+def _write_lines(path, lines):
+    with open(path, "wb") as f:
+        for line in lines:
+            f.write(line)
+
+
+def write_batch_file(path, requests):
+    """Write (custom_id, chat.completions body) pairs as a Batch API input file"""
+    _write_lines(path, (_batch_line(custom_id, body).encode("utf-8") for custom_id, body in requests))
+
+
+def chunk_requests(requests, max_requests=MAX_BATCH_REQUESTS, max_bytes=MAX_BATCH_BYTES):
+    """
+    Split (custom_id, body) pairs into input files the Batch API accepts.
+    Returns a list of (requests, encoded JSONL lines) chunks.
+    """
+    chunks = []
+    chunk, lines, size = [], [], 0
+    for custom_id, body in requests:
+        line = _batch_line(custom_id, body).encode("utf-8")
+        if len(line) > max_bytes:
+            raise ValueError(f"Request {custom_id} is {len(line)} bytes, over the {max_bytes}-byte batch file limit")
+        if chunk and (len(chunk) >= max_requests or size + len(line) > max_bytes):
+            chunks.append((chunk, lines))
+            chunk, lines, size = [], [], 0
+        chunk.append((custom_id, body))
+        lines.append(line)
+        size += len(line)
+    if chunk:
+        chunks.append((chunk, lines))
+    return chunks
+
+
+def read_jsonl(text):
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+class OpenAIBatchBackend:
+    def __init__(self, client, completion_window="24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, path):
+        with open(path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=input_file.id,
+            endpoint=ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        """Return (status, completed count, total count)"""
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return batch.status, getattr(counts, "completed", 0), getattr(counts, "total", 0)
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        lines = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                lines.extend(read_jsonl(self.client.files.content(file_id).text))
+        return lines
+
+
+class FileBatchBackend:
+    """
+    Local stand-in for the Batch API. Submitted files are copied into
+    `directory` and completed after `polls_until_done` status checks, with
+    each request answered by reply(body).
+    """
+
+    def __init__(self, directory, reply=None, polls_until_done=1):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.reply = reply or fake_reply
+        self.polls_until_done = polls_until_done
+        self._polls = {}
+
+    def submit(self, path):
+        batch_id = f"batch_local_{time.time_ns()}"
+        (self.directory / f"{batch_id}.input.jsonl").write_text(Path(path).read_text(encoding="utf-8"), encoding="utf-8")
+        self._polls[batch_id] = 0
+        return batch_id
+
+    def status(self, batch_id):
+        output = self.directory / f"{batch_id}.output.jsonl"
+        lines = read_jsonl((self.directory / f"{batch_id}.input.jsonl").read_text(encoding="utf-8"))
+        if output.exists():
+            return "completed", len(lines), len(lines)
+
+        self._polls[batch_id] = self._polls.get(batch_id, 0) + 1
+        if self._polls[batch_id] < self.polls_until_done:
+            return "in_progress", 0, len(lines)
+
+        with open(output, "w", encoding="utf-8") as f:
+            for line in lines:
+                body = line["body"]
+                f.write(json.dumps({
+                    "id": f"batch_req_{line['custom_id']}",
+                    "custom_id": line["custom_id"],
+                    "response": {"status_code": 200, "body": completion_payload(body, self.reply(body))},
+                    "error": None,
+                }, ensure_ascii=False) + "\n")
+        return "completed", len(lines), len(lines)
+
+    def results(self, batch_id):
+        return read_jsonl((self.directory / f"{batch_id}.output.jsonl").read_text(encoding="utf-8"))
+
+
+def fake_reply(body):
+    # Structured-output requests need parseable JSON back
+    if body.get("response_format"):
+        return "{}"
+    return default_reply(body)
+
+
+def _parse_result(line):
+    if line.get("error"):
+        return BatchItemError(line["error"].get("message", str(line["error"])))
+    response = line.get("response") or {}
+    if response.get("status_code") != 200:
+        error = (response.get("body") or {}).get("error", {})
+        return BatchItemError(f"HTTP {response.get('status_code')}: {error.get('message', 'unknown error')}")
+    return response["body"]["choices"][0]["message"]["content"]
+
+
+def run_batch(backend, requests, work_dir, name, poll_interval=30):
+    """
+    Submit `requests` ((custom_id, body) pairs) and block until every batch finishes.
+    Returns {custom_id: content string or BatchItemError}; requests an expired
+    batch did not get to are BatchItemErrors too.
+
+    Batch ids are saved in work_dir with a digest of their input file, so
+    re-running after a crash resumes polling instead of paying for the same
+    batch twice; a saved batch whose input differs from the current chunk is
+    not reused.
+    """
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    batch_ids = []
+    for n, (chunk, lines) in enumerate(chunk_requests(requests)):
+        id_file = work_dir / f"{name}.{n:03d}.batch_id"
+        input_path = work_dir / f"{name}.{n:03d}.requests.jsonl"
+        digest = hashlib.sha256(b"".join(lines)).hexdigest()
+        saved = id_file.read_text().split() if id_file.exists() else []
+        if len(saved) == 2 and saved[1] == digest:
+            batch_id = saved[0]
+            print(f"  Resuming batch {batch_id} ({len(chunk)} requests)")
+        else:
+            if saved:
+                print(f"  Batch {saved[0]} was submitted for different requests; not reusing it")
+            _write_lines(input_path, lines)
+            batch_id = backend.submit(input_path)
+            id_file.write_text(f"{batch_id}\n{digest}\n")
+            print(f"  Submitted batch {batch_id} ({len(chunk)} requests)")
+        batch_ids.append((batch_id, id_file, input_path, chunk))
+
+    results = {}
+    for batch_id, id_file, _, chunk in batch_ids:
+        while True:
+            status, completed, total = backend.status(batch_id)
+            print(f"  Batch {batch_id}: {status} ({completed}/{total})")
+            if status in TERMINAL_STATUSES:
+                break
+            time.sleep(poll_interval)
+
+        if status not in ("completed", "expired"):
+            # Forget the dead batch so the next run submits a fresh one
+            id_file.unlink()
+            raise RuntimeError(f"Batch {batch_id} ended with status '{status}'")
+
+        # An expired batch still returns, and bills, the requests it finished
+        for line in backend.results(batch_id):
+            results[line["custom_id"]] = _parse_result(line)
+        if status == "expired":
+            unfinished = [custom_id for custom_id, _ in chunk if custom_id not in results]
+            print(f"  Batch {batch_id} expired with {len(unfinished)} requests unfinished")
+            for custom_id in unfinished:
+                results[custom_id] = BatchItemError(f"batch {batch_id} expired before this request ran")
+
+    for _, id_file, input_path, _ in batch_ids:
+        id_file.unlink()
+        input_path.unlink(missing_ok=True)
+    for custom_id, _ in requests:
+        results.setdefault(custom_id, BatchItemError("no result returned"))
+    return results
@@ -0,0 +1,199 @@
+"""
+Columnar copy of the processed clustering output, for readers that only need
+a few fields.
+
+Next to new_court_cases_processed.json (or .jsonl) the pipeline writes a
+`<name>.table/` directory:
+
+  cases.arrow   - every short field (x, y, cluster ids and names, categories)
+                  as an uncompressed Arrow IPC file, read memory-mapped
+  text.parquet  - the large text fields (TEXT_COLUMNS), zstd-compressed and
+                  only read when asked for
+
+    columns = load_columns("new_court_cases_processed.json", ["x", "y", "kmeans_cluster"])
+    docs = load_documents("new_court_cases_processed.json", exclude=("full_text",))
+
+Numeric columns come back as numpy arrays, everything else as lists. When
+there is no table, it is older than the JSON, or pyarrow is not installed,
+both functions fall back to streaming the JSON through common.processed_io,
+so every reader works on older outputs too.
+"""
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+from common.processed_io import iter_documents, resolve_path
+
+TEXT_COLUMNS = ("summary", "full_text")
+CASES_FILE = "cases.arrow"
+TEXT_FILE = "text.parquet"
+# Text rows buffered before each Parquet row group is written
+BATCH_SIZE = 1000
+
+# Schema metadata key holding the documents' original field order
+_ORDER_KEY = b"columns"
+
+
+def available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def table_dir(path):
+    path = Path(path)
+    return path.with_name(f"{path.stem}.table")
+
+
+def has_case_table(path):
+    """Whether a case table at least as new as the processed file exists and can be read"""
+    cases = table_dir(path) / CASES_FILE
+    if not (available() and cases.exists()):
+        return False
+    source = resolve_path(path)
+    return not source.exists() or cases.stat().st_mtime >= source.stat().st_mtime
+
+
+def write_case_table(path, documents, text_columns=TEXT_COLUMNS, batch_size=BATCH_SIZE):
+    """
+    Write `documents` (any iterable, consumed once) as the case table of the
+    processed file `path`. Text columns are streamed out in row groups; the
+    short columns are held until the end. Returns the table directory.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = table_dir(path)
+    directory.mkdir(parents=True, exist_ok=True)
+    text_schema = pa.schema([(name, pa.large_string()) for name in text_columns])
+    order = []
+    columns = {}
+    text = {name: [] for name in text_columns}
+    n_rows = 0
+    pending = 0
+
+    text_tmp = directory / f"{TEXT_FILE}.tmp"
+    with pq.ParquetWriter(str(text_tmp), text_schema, compression="zstd") as writer:
+        for doc in documents:
+            for name, value in doc.items():
+                if name not in columns and name not in text:
+                    columns[name] = [None] * n_rows
+                if name not in order:
+                    order.append(name)
+                if name not in text:
+                    columns[name].append(value)
+            for name, values in text.items():
+                values.append(doc.get(name))
+            n_rows += 1
+            pending += 1
+            # Fields a document lacks are null in its row
+            for values in columns.values():
+                if len(values) < n_rows:
+                    values.append(None)
+            if pending >= batch_size:
+                writer.write_table(pa.table(text, schema=text_schema))
+                text = {name: [] for name in text_columns}
+                pending = 0
+        if pending:
+            writer.write_table(pa.table(text, schema=text_schema))
+
+    cases = pa.table({name: pa.array(values) for name, values in columns.items()})
+    cases = cases.replace_schema_metadata({_ORDER_KEY: json.dumps(order)})
+    cases_tmp = directory / f"{CASES_FILE}.tmp"
+    with pa.OSFile(str(cases_tmp), "wb") as sink, pa.ipc.new_file(sink, cases.schema) as writer:
+        writer.write_table(cases)
+
+    os.replace(text_tmp, directory / TEXT_FILE)
+    os.replace(cases_tmp, directory / CASES_FILE)
+    return directory
+
+
+def _read_cases(path):
+    import pyarrow as pa
+
+    # Memory-mapped, so only the pages of the columns actually used are read
+    source = pa.memory_map(str(table_dir(path) / CASES_FILE))
+    return pa.ipc.open_file(source).read_all()
+
+
+def _read_text(path, names):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(str(table_dir(path) / TEXT_FILE), columns=list(names), memory_map=True)
+
+
+def _text_names(path):
+    import pyarrow.parquet as pq
+
+    return pq.read_schema(str(table_dir(path) / TEXT_FILE)).names
+
+
+def _column_values(column):
+    import pyarrow as pa
+
+    if (pa.types.is_integer(column.type) or pa.types.is_floating(column.type)) and column.null_count == 0:
+        return column.to_numpy()
+    return column.to_pylist()
+
+
+def _as_column(values):
+    # Same types as _column_values returns, for the JSON fallback
+    if values and all(type(v) in (int, float) for v in values):
+        return np.asarray(values)
+    return values
+
+
+def load_columns(path, columns):
+    """
+    {name: values} for the named fields of every document, in document order;
+    None where a document lacks the field
+    """
+    columns = list(columns)
+    if not has_case_table(path):
+        values = {name: [] for name in columns}
+        exclude = tuple(name for name in TEXT_COLUMNS if name not in columns)
+        for doc in iter_documents(path, exclude=exclude):
+            for name in columns:
+                values[name].append(doc.get(name))
+        return {name: _as_column(v) for name, v in values.items()}
+
+    cases = _read_cases(path)
+    known_text = _text_names(path)
+    wanted_text = [name for name in columns if name not in cases.column_names and name in known_text]
+    text = _read_text(path, wanted_text) if wanted_text else None
+    values = {}
+    for name in columns:
+        if name in wanted_text:
+            values[name] = _column_values(text.column(name))
+        elif name in cases.column_names:
+            values[name] = _column_values(cases.column(name))
+        else:
+            # No document has the field, as the JSON fallback reports it
+            values[name] = [None] * cases.num_rows
+    return values
+
+
+def load_documents(path, exclude=(), rows=None):
+    """
+    Documents as dicts, without the fields named in `exclude`. `rows`
+    (ascending positions) keeps only those documents.
+    """
+    if not has_case_table(path):
+        docs = iter_documents(path, exclude=exclude)
+        if rows is None:
+            return list(docs)
+        keep = set(rows)
+        return [doc for i, doc in enumerate(docs) if i in keep]
+
+    cases = _read_cases(path)
+    order = json.loads(cases.schema.metadata[_ORDER_KEY])
+    text_names = [name for name in _text_names(path) if name not in exclude]
+    if text_names:
+        text = _read_text(path, text_names)
+        for name in text_names:
+            cases = cases.append_column(name, text.column(name))
+    if rows is not None:
+        cases = cases.take(rows)
+    names = [name for name in order if name not in exclude and name in cases.column_names]
+    return cases.select(names).to_pylist()
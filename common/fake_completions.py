@@ -0,0 +1,34 @@
+"""
+Canned chat completions for running the LLM scripts offline.
+
+Shared by the mock HTTP server (common/mock_openai_server.py) and the local
+Batch API stand-in (common.batch_jobs.FileBatchBackend), so neither depends on
+the other.
+"""
+import time
+
+
+def default_reply(body):
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in body.get("messages", []))
+    return f"Mock response to a {prompt_chars}-character prompt."
+
+
+def completion_payload(body, content):
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": f"chatcmpl-mock-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
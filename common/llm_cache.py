@@ -0,0 +1,258 @@
+"""
+Persistent chat-completion cache shared by every script that calls OpenAI.
+
+Responses are keyed by a hash of the full request (model, messages,
+temperature, response_format/schema, max_tokens, ...), so re-running a stage
+with the same prompts is served from disk instead of the API. Entries live in
+one SQLite file at the repo root and the least recently used ones are evicted
+once the file grows past LLM_CACHE_MAX_MB.
+
+Wrap a client once and use it as before:
+
+    client = CachedChatClient(OpenAI(api_key=key))
+    client.chat.completions.create(model=..., messages=..., temperature=0)
+
+Only deterministic requests (temperature=0) are cached. Sampled ones, a
+non-zero temperature or none at all (the API default is 1), go straight to
+the API unless the caller opts in with CachedChatClient(..., cache_sampled=True)
+or LLM_CACHE_SAMPLED=1, accepting that re-runs repeat the first sample.
+
+LLM_CACHE=0 turns the cache off, LLM_CACHE_REFRESH=1 ignores existing entries
+(and overwrites them with fresh responses).
+"""
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH",
+    str(Path(__file__).resolve().parent.parent / ".llm_cache" / "responses.sqlite")
+)
+MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "512")) * 1024 * 1024)
+ENABLED = os.getenv("LLM_CACHE", "1") != "0"
+REFRESH = os.getenv("LLM_CACHE_REFRESH", "0") == "1"
+CACHE_SAMPLED = os.getenv("LLM_CACHE_SAMPLED", "0") == "1"
+
+# USD per 1M (input, output) tokens, used to report money saved by cache hits
+PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-5.1": (1.25, 10.00),
+}
+
+# Request options that do not change the response; extra_body can carry
+# model parameters, so it stays in the key
+_TRANSPORT_KEYS = {"timeout", "extra_headers"}
+
+
+def cache_key(request):
+    payload = {k: v for k, v in request.items() if k not in _TRANSPORT_KEYS}
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def request_cost(model, prompt_tokens, completion_tokens):
+    # Dated snapshots ("gpt-4o-2024-08-06") are priced like their base model
+    for name in sorted(PRICES, key=len, reverse=True):
+        if model and model.startswith(name):
+            price_in, price_out = PRICES[name]
+            return (prompt_tokens * price_in + completion_tokens * price_out) / 1e6
+    return 0.0
+
+
+class LLMCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                content TEXT NOT NULL,
+                prompt_tokens INTEGER NOT NULL,
+                completion_tokens INTEGER NOT NULL,
+                latency REAL NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self.conn.commit()
+
+        # Per-run counters
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.saved_usd = 0.0
+        self.saved_tokens = 0
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT model, content, prompt_tokens, completion_tokens, latency FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+
+        model, content, prompt_tokens, completion_tokens, latency = row
+        self.hits += 1
+        self.saved_seconds += latency
+        self.saved_tokens += prompt_tokens + completion_tokens
+        self.saved_usd += request_cost(model, prompt_tokens, completion_tokens)
+        return {
+            "model": model,
+            "content": content,
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+        }
+
+    def put(self, key, model, content, prompt_tokens, completion_tokens, latency):
+        size = len(content.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO responses
+                   (key, model, content, prompt_tokens, completion_tokens, latency, size, created_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key, model, content, prompt_tokens, completion_tokens, latency, size, now, now)
+            )
+            self.conn.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until back under 90% of the limit
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            doomed.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+        self.conn.commit()
+
+    def report(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return
+        print(f"\nLLM cache: {self.hits}/{lookups} hits ({100 * self.hits / lookups:.0f}%), "
+              f"saved {self.saved_tokens:,} tokens, ${self.saved_usd:.2f} and {self.saved_seconds:.0f}s of API time")
+
+
+_cache = None
+
+
+def get_cache():
+    """Process-wide cache instance; prints its hit/miss report at exit"""
+    global _cache
+    if _cache is None:
+        _cache = LLMCache()
+        atexit.register(_cache.report)
+    return _cache
+
+
+def _cached_response(entry):
+    """Rebuild the parts of a ChatCompletion the scripts read"""
+    return SimpleNamespace(
+        model=entry["model"],
+        cached=True,
+        choices=[SimpleNamespace(
+            index=0,
+            finish_reason="stop",
+            message=SimpleNamespace(role="assistant", content=entry["content"]),
+        )],
+        usage=SimpleNamespace(
+            prompt_tokens=entry["prompt_tokens"],
+            completion_tokens=entry["completion_tokens"],
+            total_tokens=entry["prompt_tokens"] + entry["completion_tokens"],
+        ),
+    )
+
+
+def _store(cache, key, request, response, latency):
+    content = response.choices[0].message.content
+    if content is None:
+        return
+    usage = getattr(response, "usage", None)
+    cache.put(
+        key,
+        getattr(response, "model", None) or request.get("model"),
+        content,
+        getattr(usage, "prompt_tokens", 0) or 0,
+        getattr(usage, "completion_tokens", 0) or 0,
+        latency,
+    )
+
+
+class CachedChatClient:
+    """
+    Wraps an OpenAI client so chat.completions.create goes through the cache.
+    Everything else (files, batches, ...) is passed through to the client.
+    cache_sampled=True also caches requests with a non-zero temperature.
+    """
+
+    def __init__(self, client, cache=None, cache_sampled=CACHE_SAMPLED):
+        self._client = client
+        self.cache = cache if cache is not None else (get_cache() if ENABLED else None)
+        self.cache_sampled = cache_sampled
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _cacheable(self, request):
+        if self.cache is None or request.get("stream"):
+            return False
+        return self.cache_sampled or request.get("temperature", 1) == 0
+
+    def _create(self, **request):
+        if not self._cacheable(request):
+            return self._client.chat.completions.create(**request)
+
+        key = cache_key(request)
+        entry = None if REFRESH else self.cache.get(key)
+        if entry is not None:
+            return _cached_response(entry)
+
+        start = time.perf_counter()
+        response = self._client.chat.completions.create(**request)
+        _store(self.cache, key, request, response, time.perf_counter() - start)
+        return response
+
+
+class AsyncCachedChatClient(CachedChatClient):
+    """CachedChatClient for AsyncOpenAI clients"""
+
+    async def _create(self, **request):
+        if not self._cacheable(request):
+            return await self._client.chat.completions.create(**request)
+
+        key = cache_key(request)
+        entry = None if REFRESH else self.cache.get(key)
+        if entry is not None:
+            return _cached_response(entry)
+
+        start = time.perf_counter()
+        response = await self._client.chat.completions.create(**request)
+        _store(self.cache, key, request, response, time.perf_counter() - start)
+        return response
@@ -0,0 +1,107 @@
+"""
+Dependency-aware scheduler for chat-completion calls.
+
+Each LLMTask names the tasks whose results it needs. Every task starts as
+soon as its own dependencies are done, so independent calls run concurrently
+and a dependent call never waits on unrelated work. All calls share one
+concurrency limit, one RateLimiter and the retry policy of common.async_llm.
+
+    tasks = [
+        LLMTask("a", build=lambda r: request_a, parse=read_text, fallback=lambda e, r: "A"),
+        LLMTask("b", build=lambda r: request_using(r["a"]), parse=read_text,
+                fallback=lambda e, r: "B", deps=["a"]),
+    ]
+    results, stats = asyncio.run(run_dag(get_async_client(), tasks))
+
+A task whose call or parse fails gets fallback(error, results) as its result,
+so tasks depending on it still run.
+"""
+import asyncio
+import time
+
+from common.async_llm import RateLimiter, RunStats, call_with_retries, CONCURRENCY, MAX_RETRIES
+
+
+class LLMTask:
+    def __init__(self, name, build, parse, fallback, deps=()):
+        """
+        build(results) -> chat.completions.create kwargs
+        parse(response, results) -> the task's result
+        fallback(error, results) -> the result when the call or parse fails
+        `results` holds the results of every finished task, dependencies included.
+        """
+        self.name = name
+        self.build = build
+        self.parse = parse
+        self.fallback = fallback
+        self.deps = tuple(deps)
+
+
+def check_dag(tasks):
+    """Raise ValueError on duplicate names, unknown dependencies or cycles"""
+    by_name = {}
+    for task in tasks:
+        if task.name in by_name:
+            raise ValueError(f"Duplicate task '{task.name}'")
+        by_name[task.name] = task
+    for task in tasks:
+        for dep in task.deps:
+            if dep not in by_name:
+                raise ValueError(f"Task '{task.name}' depends on unknown task '{dep}'")
+
+    # Kahn's algorithm: whatever cannot be ordered is on a cycle
+    waiting = {task.name: len(set(task.deps)) for task in tasks}
+    dependents = {name: [] for name in by_name}
+    for task in tasks:
+        for dep in set(task.deps):
+            dependents[dep].append(task.name)
+    ready = [name for name, n in waiting.items() if n == 0]
+    ordered = 0
+    while ready:
+        name = ready.pop()
+        ordered += 1
+        for dependent in dependents[name]:
+            waiting[dependent] -= 1
+            if waiting[dependent] == 0:
+                ready.append(dependent)
+    if ordered < len(tasks):
+        stuck = sorted(name for name, n in waiting.items() if n > 0)
+        raise ValueError(f"Dependency cycle among tasks: {', '.join(stuck[:5])}")
+
+
+async def run_dag(client, tasks, concurrency=CONCURRENCY, limiter=None, max_retries=MAX_RETRIES, on_done=None):
+    """
+    Run every task on an AsyncOpenAI client, each once its dependencies are done.
+    Returns ({name: result}, stats). on_done(task, result, error) is called as
+    each task finishes; error is None unless the fallback was used.
+    """
+    tasks = list(tasks)
+    check_dag(tasks)
+    limiter = limiter or RateLimiter()
+    stats = RunStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = {task.name: asyncio.Event() for task in tasks}
+    results = {}
+
+    async def run(task):
+        for dep in task.deps:
+            await finished[dep].wait()
+        error = None
+        try:
+            request = task.build(results)
+            async with semaphore:
+                response = await call_with_retries(client, request, limiter, stats, max_retries)
+            result = task.parse(response, results)
+        except Exception as e:
+            stats.failures += 1
+            error = e
+            result = task.fallback(e, results)
+        stats.requests += 1
+        results[task.name] = result
+        finished[task.name].set()
+        if on_done:
+            on_done(task, result, error)
+
+    await asyncio.gather(*(run(task) for task in tasks))
+    stats.elapsed = time.perf_counter() - stats.started
+    return results, stats
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Minimal OpenAI-compatible HTTP server for running the LLM scripts offline.
+
+Answers POST .../chat/completions with a canned reply and realistic usage
+numbers, after an optional delay, and can inject 429/500 errors. Point a
+client at it with OpenAI(base_url=server.base_url, api_key="mock") or by
+setting OPENAI_BASE_URL.
+
+    python common/mock_openai_server.py --port 8000 --latency 0.3 --error-rate 0.1
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.fake_completions import completion_payload, default_reply
+
+
+class MockOpenAIServer:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, reply=None, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        # reply(request_body) -> assistant message content
+        self.reply = reply or default_reply
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _next_outcome(self):
+        with self._lock:
+            self.request_count += 1
+            if self.random.random() < self.error_rate:
+                self.error_count += 1
+                return self.random.choice([429, 500])
+            return 200
+
+
+def _make_handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if not self.path.endswith("/chat/completions"):
+                return self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+
+            if server.latency:
+                time.sleep(server.latency)
+
+            status = server._next_outcome()
+            if status != 200:
+                return self._send(status, {"error": {"message": "mock error", "type": "mock", "code": status}})
+
+            self._send(200, completion_payload(body, server.reply(body)))
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if status == 429:
+                self.send_header("Retry-After", "0.1")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI-compatible chat completions server")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/500")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(port=args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"Mock OpenAI server listening on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+"""
+spaCy and RAKE, loaded on first use.
+
+`spacy.load("en_core_web_sm")` takes seconds and RAKE pulls in NLTK, so the
+analysis scripts ask for them here instead of building them at import time.
+Each is built once per process.
+"""
+from functools import lru_cache
+
+SPACY_MODEL = "en_core_web_sm"
+
+
+@lru_cache(maxsize=None)
+def get_nlp(model=SPACY_MODEL):
+    import spacy
+
+    return spacy.load(model)
+
+
+@lru_cache(maxsize=None)
+def get_rake():
+    from rake_nltk import Rake
+
+    return Rake()
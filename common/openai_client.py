@@ -0,0 +1,104 @@
+"""
+One OpenAI client per process, built on first use.
+
+The client sits on a pooled httpx transport with keep-alive, so consecutive
+requests reuse open TLS connections instead of handshaking every time, and it
+is wrapped in the shared response cache (common/llm_cache.py). The API key
+comes from OPENAI_API_KEY or the nearest otherkey.txt at or above the working
+directory, which covers both the cont1 (./otherkey.txt) and cont2
+(../otherkey.txt) layouts.
+
+    from common.openai_client import get_client
+    client = get_client()
+"""
+import os
+import threading
+from pathlib import Path
+
+from common.llm_cache import CachedChatClient, AsyncCachedChatClient
+
+KEY_FILE = "otherkey.txt"
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT", "120"))
+
+_lock = threading.Lock()
+_client = None
+_async_client = None
+
+
+def read_api_key():
+    key = os.getenv("OPENAI_API_KEY")
+    if key:
+        return key
+    cwd = Path.cwd()
+    for folder in [cwd, *cwd.parents]:
+        path = folder / KEY_FILE
+        if path.exists():
+            return path.read_text().strip()
+    raise FileNotFoundError(f"Set OPENAI_API_KEY or put {KEY_FILE} in or above {cwd}")
+
+
+def _limits(max_connections, max_keepalive_connections):
+    import httpx
+
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def build_client(api_key=None, base_url=None, max_connections=MAX_CONNECTIONS,
+                 max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, cached=True):
+    """A new pooled client. Most code should call get_client() instead."""
+    # openai and httpx are imported on first use, which keeps script startup fast
+    import httpx
+    from openai import OpenAI
+
+    client = OpenAI(
+        api_key=api_key or read_api_key(),
+        base_url=base_url,
+        http_client=httpx.Client(
+            limits=_limits(max_connections, max_keepalive_connections),
+            timeout=REQUEST_TIMEOUT,
+        ),
+    )
+    return CachedChatClient(client) if cached else client
+
+
+def build_async_client(api_key=None, base_url=None, max_connections=MAX_CONNECTIONS,
+                       max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, cached=True):
+    import httpx
+    from openai import AsyncOpenAI
+
+    # Retries are left to common.async_llm, which backs off across all requests
+    client = AsyncOpenAI(
+        api_key=api_key or read_api_key(),
+        base_url=base_url,
+        max_retries=0,
+        http_client=httpx.AsyncClient(
+            limits=_limits(max_connections, max_keepalive_connections),
+            timeout=REQUEST_TIMEOUT,
+        ),
+    )
+    return AsyncCachedChatClient(client) if cached else client
+
+
+def get_client():
+    """The shared, cached, connection-pooled OpenAI client"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = build_client()
+        return _client
+
+
+def get_async_client():
+    """The shared AsyncOpenAI counterpart of get_client()"""
+    global _async_client
+    with _lock:
+        if _async_client is None:
+            _async_client = build_async_client()
+        return _async_client
@@ -0,0 +1,123 @@
+"""
+Streaming writer and reader for the processed clustering output
+(court_cases_processed.json, new_court_cases_processed.json).
+
+Documents are written one at a time, so nothing has to build a list of every
+case (full_text included) and dump it in one go. Two layouts:
+
+  json  - the usual {"documents": [...], "meta": {...}} object, one compact
+          document per line, so json.load and every existing consumer still
+          read it
+  jsonl - one document per line, nothing else
+
+Either way the meta also goes to a `<name>.meta.json` sidecar, so it can be
+read without touching the documents. iter_documents streams documents back
+from both layouts; files in the old indented layout are loaded whole.
+
+    write_processed("out.json", (doc for doc in docs), meta)
+    meta = read_meta("out.json")
+    for doc in iter_documents("out.json", exclude=("full_text",)):
+        ...
+"""
+import json
+import os
+from pathlib import Path
+
+FORMATS = ("json", "jsonl")
+
+# First line of a file written by write_processed(format="json")
+_STREAM_HEADER = '{"documents": ['
+
+
+def meta_path(path):
+    path = Path(path)
+    return path.with_name(f"{path.stem}.meta.json")
+
+
+def resolve_path(path):
+    """`path`, or its .jsonl sibling when that is the only or the newer one"""
+    path = Path(path)
+    jsonl = path.with_suffix(".jsonl")
+    if jsonl != path and jsonl.exists():
+        if not path.exists() or jsonl.stat().st_mtime > path.stat().st_mtime:
+            return jsonl
+    return path
+
+
+def write_processed(path, documents, meta, format="json"):
+    """
+    Write `documents` (any iterable, consumed once) and `meta` to `path`, plus
+    the meta sidecar. Files are replaced atomically. Returns the path written,
+    which ends in .jsonl for the jsonl format.
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}' (choose from {', '.join(FORMATS)})")
+    path = Path(path)
+    if format == "jsonl" and path.suffix != ".jsonl":
+        path = path.with_suffix(".jsonl")
+
+    first = True
+    tmp = path.with_name(f"{path.name}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        if format == "json":
+            f.write(_STREAM_HEADER + "\n")
+        for doc in documents:
+            line = json.dumps(doc, ensure_ascii=False)
+            if format == "json" and not first:
+                f.write(",\n")
+            f.write(line)
+            if format == "jsonl":
+                f.write("\n")
+            first = False
+        if format == "json":
+            f.write("\n],\n")
+            f.write(f'"meta": {json.dumps(meta, ensure_ascii=False)}}}\n')
+    os.replace(tmp, path)
+
+    sidecar = meta_path(path)
+    tmp = sidecar.with_name(f"{sidecar.name}.tmp")
+    tmp.write_text(json.dumps(meta, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, sidecar)
+    return path
+
+
+def _drop(doc, exclude):
+    for key in exclude:
+        doc.pop(key, None)
+    return doc
+
+
+def iter_documents(path, exclude=()):
+    """Documents one at a time, without fields named in `exclude`"""
+    path = resolve_path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix == ".jsonl":
+            for line in f:
+                if line.strip():
+                    yield _drop(json.loads(line), exclude)
+            return
+
+        if f.readline().rstrip("\n") != _STREAM_HEADER:
+            # Indented file from before streaming; only a full parse can read it
+            f.seek(0)
+            for doc in json.load(f).get("documents", []):
+                yield _drop(doc, exclude)
+            return
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("]"):
+                return
+            if line:
+                yield _drop(json.loads(line.rstrip(",")), exclude)
+
+
+def read_meta(path):
+    """The meta of a processed file, from its sidecar when there is one"""
+    path = resolve_path(path)
+    sidecar = meta_path(path)
+    if sidecar.exists():
+        return json.loads(sidecar.read_text(encoding="utf-8"))
+    if path.suffix == ".jsonl":
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("meta", {})
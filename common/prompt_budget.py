@@ -0,0 +1,146 @@
+"""
+Token-budgeted prompt packing for the cluster labeling scripts.
+
+Rather than sending the first N summaries of a cluster (`cluster_docs[:30]`)
+or cutting a payload at a character count, pack_items fills a token budget
+with the most representative items first: the ones whose vocabulary is
+closest to the cluster as a whole. Tokens are counted with tiktoken when it
+and its encoding files are available, otherwise estimated at ~4 characters
+per token.
+
+    packed = pack_items(cluster_docs, budget=6000)
+    prompt = f"...{packed.text}..."
+    usage.record("classify", packed)
+    ...
+    usage.report()
+"""
+import math
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+DEFAULT_MODEL = "gpt-4o"
+CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"[a-z][a-z0-9'-]{2,}")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        # Not installed, unknown model, or the encoding file cannot be downloaded
+        return None
+
+
+def count_tokens(text, model=DEFAULT_MODEL):
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text, max_tokens, model=DEFAULT_MODEL, marker="…"):
+    """Cut text to at most max_tokens, on a token boundary when tiktoken is available"""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN] + marker
+    return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens]) + marker
+
+
+def representative_order(items):
+    """
+    Indices of items, most representative first: TF-IDF cosine similarity to
+    the centroid of all items. Ties keep the original order.
+    """
+    bags = [Counter(_WORD.findall(item.lower())) for item in items]
+    doc_freq = Counter(word for bag in bags for word in bag)
+    n = len(items)
+    idf = {word: math.log((1 + n) / (1 + df)) + 1 for word, df in doc_freq.items()}
+
+    vectors = []
+    centroid = defaultdict(float)
+    for bag in bags:
+        vec = {word: count * idf[word] for word, count in bag.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        vec = {word: v / norm for word, v in vec.items()}
+        vectors.append(vec)
+        for word, v in vec.items():
+            centroid[word] += v
+
+    def similarity(i):
+        return sum(v * centroid[word] for word, v in vectors[i].items())
+
+    return sorted(range(n), key=lambda i: (-similarity(i), i))
+
+
+class PackedItems:
+    """The text of the items that fit, which items they were, and the tokens spent"""
+
+    def __init__(self, text, indices, tokens, n_items, budget):
+        self.text = text
+        self.indices = indices
+        self.tokens = tokens
+        self.n_items = n_items
+        self.budget = budget
+
+    def __repr__(self):
+        return f"PackedItems({len(self.indices)}/{self.n_items} items, {self.tokens}/{self.budget} tokens)"
+
+
+def pack_items(items, budget, model=DEFAULT_MODEL, separator="\n\n", max_item_tokens=None, order=None):
+    """
+    Join as many items as fit in `budget` tokens, most representative first.
+
+    max_item_tokens truncates any single long item instead of letting it
+    crowd out the rest. `order` overrides the ranking (a list of indices, e.g.
+    nearest-to-centroid from embeddings).
+    """
+    if order is None:
+        order = representative_order(items)
+    separator_tokens = count_tokens(separator, model) if separator else 0
+
+    parts = []
+    indices = []
+    used = 0
+    for i in order:
+        # Every further item costs a separator plus at least one token
+        if budget - used < (separator_tokens if parts else 0) + 1:
+            break
+        text = items[i]
+        if max_item_tokens is not None:
+            text = truncate_tokens(text, max_item_tokens, model)
+        cost = count_tokens(text, model) + (separator_tokens if parts else 0)
+        if used + cost > budget:
+            # A shorter item further down may still fit
+            continue
+        parts.append(text)
+        indices.append(i)
+        used += cost
+
+    return PackedItems(separator.join(parts), indices, used, len(items), budget)
+
+
+class PromptUsage:
+    """Per-call token accounting for one script run, printed with report()"""
+
+    def __init__(self):
+        self.calls = defaultdict(list)
+
+    def record(self, label, packed):
+        self.calls[label].append(packed)
+
+    def report(self):
+        if not self.calls:
+            return
+        print("\nPrompt packing (sample tokens per call):")
+        for label, packs in self.calls.items():
+            tokens = [p.tokens for p in packs]
+            kept = sum(len(p.indices) for p in packs)
+            total = sum(p.n_items for p in packs)
+            print(f"  {label}: {len(packs)} calls, avg {sum(tokens) / len(tokens):,.0f} / max {max(tokens):,} tokens "
+                  f"(budget {packs[0].budget:,}), {kept}/{total} items sent")
@@ -1,21 +1,32 @@
 import os
+import sys
 import pickle
+import argparse
+import asyncio
 from pathlib import Path
 import json
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-import io
-import PyPDF2
-from openai import OpenAI
-import time
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.async_llm import RateLimiter, run_chat_requests, CONCURRENCY, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE
+from common.batch_jobs import OpenAIBatchBackend, FileBatchBackend, run_batch
+from common.openai_client import get_client, get_async_client
+from ingest_cache import IngestCache, plan_ingest, CACHE_FILE
+from pdf_extract import BACKENDS, DEFAULT_BACKEND
+from pdf_pipeline import (
+    DriveSource,
+    LocalFolderSource,
+    run_pipeline,
+    DOWNLOAD_WORKERS,
+    EXTRACT_WORKERS,
+)
 
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 DRIVE_FOLDER_NAME = "nov_12_court_pdfs"
 OUTPUT_FILE = "court_cases_with_summaries.json"
 
+# Batch API request files, batch ids (for resuming) and local fake batches
+BATCH_DIR = "batch_jobs"
+
 # Maximum number of pages to extract from each PDF
 # 20 pages is typically enough for court opinions (covers intro, facts, analysis, holding)
 # Adjust this if you want more or fewer pages
@@ -25,8 +36,15 @@ MAX_PAGES = 17
 # Last 3 pages typically contain the holding, decision, and any final orders
 LAST_PAGES = 5
 
-def authenticate_google_drive():
-    """Authenticate with Google Drive API"""
+# Estimated tokens per opinion for --select-pages scored (see page_select.py)
+# 22 fixed pages of a typical opinion come to roughly 12-13k tokens
+PAGE_TOKEN_BUDGET = 8000
+
+def get_google_credentials():
+    """Load (or interactively create) Google Drive credentials"""
+    from google.auth.transport.requests import Request
+    from google_auth_oauthlib.flow import InstalledAppFlow
+
     creds = None
     if os.path.exists('token.pickle'):
         with open('token.pickle', 'rb') as token:
@@ -39,6 +57,14 @@ def authenticate_google_drive():
             creds = flow.run_local_server(port=0)
         with open('token.pickle', 'wb') as token:
             pickle.dump(creds, token)
+    return creds
+
+def authenticate_google_drive(creds=None):
+    """Authenticate with Google Drive API"""
+    from googleapiclient.discovery import build
+
+    if creds is None:
+        creds = get_google_credentials()
     return build('drive', 'v3', credentials=creds)
 
 def find_folder_id(service, folder_name):
@@ -56,89 +82,37 @@ def find_folder_id(service, folder_name):
     
     return folders[0]['id']
 
-def download_pdfs_from_drive(service, folder_id=None, max_pages=20, last_pages=3):
-    query = "mimeType='application/pdf'"
-    if folder_id:
-        query += f" and '{folder_id}' in parents"
-    
-    # Handle pagination to get all files
-    files = []
-    page_token = None
-    
-    while True:
-        results = service.files().list(
-            q=query,
-            fields="nextPageToken, files(id, name)",
-            pageSize=100,
-            pageToken=page_token
-        ).execute()
-        
-        files.extend(results.get('files', []))
-        page_token = results.get('nextPageToken')
-        
-        if not page_token:
-            break
-    
-    print(f"Found {len(files)} PDF files in folder")
-    
-    documents = []
-    for file in files:
-        request = service.files().get_media(fileId=file['id'])
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-        
-        fh.seek(0)
-        pdf_reader = PyPDF2.PdfReader(fh)
-        
-        total_pages = len(pdf_reader.pages)
-        
-        # Determine which pages to extract
-        if total_pages <= max_pages + last_pages:
-            # Document is short enough - extract all pages
-            pages_to_extract = list(range(total_pages))
-            extraction_note = f"all {total_pages} pages"
-        else:
-            # Extract first max_pages and last last_pages
-            first_pages = list(range(max_pages))
-            last_page_indices = list(range(total_pages - last_pages, total_pages))
-            pages_to_extract = first_pages + last_page_indices
-            extraction_note = f"first {max_pages} + last {last_pages} pages (out of {total_pages})"
-        
-        # Extract text from selected pages
-        text = ""
-        for i in pages_to_extract:
-            text += pdf_reader.pages[i].extract_text()
-        
-        documents.append({
-            'name': file['name'],
-            'text': text,
-            'file_id': file['id'],
-            'total_pages': total_pages,
-            'extracted_pages': len(pages_to_extract)
-        })
-        
-        print(f"Downloaded: {file['name']} ({extraction_note}, {len(text)} characters)")
-    
-    return documents
+def download_pdfs_from_drive(source, files=None, max_pages=20, last_pages=3,
+                             download_workers=DOWNLOAD_WORKERS, extract_workers=EXTRACT_WORKERS,
+                             backend=DEFAULT_BACKEND, token_budget=None):
+    """
+    Download and extract PDFs from a DriveSource (or a LocalFolderSource when
+    working offline). Downloads and extraction overlap, see pdf_pipeline.
+    Pass `files` to process only part of the folder listing, and a
+    token_budget to keep the best-scoring pages instead of first/last.
+    """
+    if files is None:
+        files = source.list_files()
+        print(f"Found {len(files)} PDF files in folder")
 
-def generate_summaries(documents, client, delay=1.0):
-    summaries = []
-    
-    for i, doc in enumerate(documents):
-        text = doc['text']
-        
-        print(f"\n[{i+1}/{len(documents)}] Summarizing: {doc['name']}")
-        print(f"  Text length: {len(text)} characters")
-        
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{
-                    "role": "user",
-                    "content": f"""
+    return run_pipeline(
+        source,
+        files,
+        max_pages=max_pages,
+        last_pages=last_pages,
+        download_workers=download_workers,
+        extract_workers=extract_workers,
+        backend=backend,
+        token_budget=token_budget
+    )
+
+def build_summary_request(text):
+    """chat.completions.create kwargs for summarizing one opinion"""
+    return {
+        "model": "gpt-4o",
+        "messages": [{
+            "role": "user",
+            "content": f"""
                         You are a legal expert. Analyze this court case opinion and provide:
                         1. Summary (2–3 sentences). If the case involves artificial intelligence (AI), machine learning (ML), or automated systems, explicitly highlight how the AI/automation is involved in the facts, claims, or holding.
                         2. Key Legal Issue
@@ -148,24 +122,52 @@ def generate_summaries(documents, client, delay=1.0):
                         Opinion text:
                         {text}
                         """
-                }],
-                max_tokens=500
-            )
-            
-            summary = response.choices[0].message.content
-            summaries.append(summary)
-            print(f"  ✓ Summary generated ({len(summary)} characters)")
-            
-            # Rate limiting: wait between requests
-            if i < len(documents) - 1:
-                time.sleep(delay)
-                
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
-            summaries.append(f"Error: {str(e)}")
-            # Wait longer if there's an error
-            time.sleep(delay * 2)
-    
+        }],
+        "max_tokens": 500
+    }
+
+def generate_summaries(documents, client, concurrency=CONCURRENCY, limiter=None):
+    """
+    Summarize documents concurrently on an AsyncOpenAI client.
+    Rate limits and retries are handled by common.async_llm; summaries come
+    back in the same order as documents.
+    """
+    requests = [build_summary_request(doc['text']) for doc in documents]
+
+    def on_done(i, result):
+        doc = documents[i]
+        if isinstance(result, Exception):
+            print(f"  ✗ [{i+1}/{len(documents)}] {doc['name']}: {result}")
+        else:
+            summary = result.choices[0].message.content
+            print(f"  ✓ [{i+1}/{len(documents)}] {doc['name']} ({len(doc['text'])} → {len(summary)} characters)")
+
+    results, stats = asyncio.run(run_chat_requests(
+        client, requests, concurrency=concurrency, limiter=limiter, on_done=on_done
+    ))
+    stats.report()
+
+    return [
+        f"Error: {str(r)}" if isinstance(r, Exception) else r.choices[0].message.content
+        for r in results
+    ]
+
+def generate_summaries_batch(documents, backend, work_dir=BATCH_DIR, poll_interval=30):
+    """
+    Summarize documents through the Batch API (half price, no rate limits,
+    finishes within 24h). Results are matched back by file_id.
+    """
+    requests = [(doc['file_id'], build_summary_request(doc['text'])) for doc in documents]
+    results = run_batch(backend, requests, work_dir, "summaries", poll_interval=poll_interval)
+
+    summaries = []
+    for doc in documents:
+        result = results[doc['file_id']]
+        if isinstance(result, Exception):
+            print(f"  ✗ {doc['name']}: {result}")
+            summaries.append(f"Error: {str(result)}")
+        else:
+            summaries.append(result)
     return summaries
 
 def save_to_json(documents, summaries, output_file):
@@ -189,7 +191,7 @@ def save_to_json(documents, summaries, output_file):
     total_chars = sum(len(d['text']) for d in documents)
     avg_chars = total_chars / len(documents) if documents else 0
     total_pages = sum(d['total_pages'] for d in documents)
-    extracted_pages = sum(d['extracted_pages'] for d in documents)
+    extracted_pages = sum(len(d['extracted_pages']) for d in documents)
     
     print(f"\nStatistics:")
     print(f"  Total documents: {len(documents)}")
@@ -200,35 +202,135 @@ def save_to_json(documents, summaries, output_file):
     print(f"  Average pages per document: {total_pages/len(documents):.1f}")
     print(f"  Average extracted pages: {extracted_pages/len(documents):.1f}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Download court opinion PDFs, extract text and summarize them")
+    parser.add_argument("--local-dir", help="read PDFs from this directory instead of Google Drive")
+    parser.add_argument("--download-workers", type=int, default=DOWNLOAD_WORKERS,
+                        help=f"concurrent downloads (default: {DOWNLOAD_WORKERS})")
+    parser.add_argument("--extract-workers", type=int, default=EXTRACT_WORKERS,
+                        help=f"PDF extraction processes (default: {EXTRACT_WORKERS})")
+    parser.add_argument("--pdf-backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"PDF text extraction library (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--select-pages", choices=["fixed", "scored"], default="fixed",
+                        help=f"'fixed' keeps the first {MAX_PAGES} + last {LAST_PAGES} pages, "
+                             f"'scored' the most substantive pages within --page-budget")
+    parser.add_argument("--page-budget", type=int, default=PAGE_TOKEN_BUDGET,
+                        help=f"estimated tokens per opinion with --select-pages scored (default: {PAGE_TOKEN_BUDGET})")
+    parser.add_argument("--cache", default=CACHE_FILE,
+                        help=f"ingestion cache database (default: {CACHE_FILE})")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help=f"summaries in flight at once (default: {CONCURRENCY})")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE,
+                        help=f"OpenAI requests per minute (default: {REQUESTS_PER_MINUTE})")
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE,
+                        help=f"OpenAI tokens per minute (default: {TOKENS_PER_MINUTE})")
+    parser.add_argument("--batch", choices=["openai", "local"],
+                        help="summarize through the Batch API ('local' completes batches offline)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="list the folder and report what would be downloaded and summarized, then stop")
+    return parser.parse_args()
+
 def main():
-    # Authenticate with Google Drive
-    print("\n[1/4] Authenticating with Google Drive...")
-    service = authenticate_google_drive()
-    
-    # Find the folder
-    print(f"\n[2/4] Finding folder '{DRIVE_FOLDER_NAME}'...")
-    folder_id = find_folder_id(service, DRIVE_FOLDER_NAME)
-    if not folder_id:
-        print("Exiting...")
+    args = parse_args()
+    # A local folder needs no Drive folder lookup, so it has one step fewer
+    n_steps = 3 if args.local_dir else 4
+
+    if args.local_dir:
+        print(f"\n[1/{n_steps}] Using local folder '{args.local_dir}' instead of Google Drive")
+        source = LocalFolderSource(args.local_dir)
+    else:
+        # Authenticate with Google Drive
+        print(f"\n[1/{n_steps}] Authenticating with Google Drive...")
+        creds = get_google_credentials()
+        service = authenticate_google_drive(creds)
+
+        # Find the folder
+        print(f"\n[2/{n_steps}] Finding folder '{DRIVE_FOLDER_NAME}'...")
+        folder_id = find_folder_id(service, DRIVE_FOLDER_NAME)
+        if not folder_id:
+            print("Exiting...")
+            return
+        source = DriveSource(creds, folder_id)
+
+    # Only download PDFs that are new or changed since the last run
+    files = source.list_files()
+    print(f"Found {len(files)} PDF files in folder")
+
+    # Different backends produce slightly different text, so they are cached separately
+    if args.select_pages == "scored":
+        token_budget = args.page_budget
+        settings = f"scored{token_budget}:{args.pdf_backend}"
+    else:
+        token_budget = None
+        settings = f"first{MAX_PAGES}+last{LAST_PAGES}:{args.pdf_backend}"
+    cache = IngestCache(args.cache)
+    cached, pending = plan_ingest(files, cache, settings)
+    print(f"  {len(cached)} unchanged (cached), {len(pending)} new or changed")
+
+    if args.dry_run:
+        unsummarized = sum(1 for doc in cached.values() if doc['summary'] is None)
+        print(f"\nDry run: would download and extract {len(pending)} PDFs and generate "
+              f"up to {unsummarized + len(pending)} summaries")
+        cache.close()
         return
-    
-    # Download PDFs
-    print("\n[3/4] Downloading PDFs and extracting text...")
-    print(f"  Extracting first {MAX_PAGES} pages + last {LAST_PAGES} pages from each document")
-    documents = download_pdfs_from_drive(service, folder_id, max_pages=MAX_PAGES, last_pages=LAST_PAGES)
-    
+
+    print(f"\n[{n_steps - 1}/{n_steps}] Downloading PDFs and extracting text...")
+    if token_budget is None:
+        print(f"  Extracting first {MAX_PAGES} pages + last {LAST_PAGES} pages from each document")
+    else:
+        print(f"  Extracting the highest-scoring pages, up to ~{token_budget} tokens per document")
+    new_documents = []
+    if pending:
+        new_documents = download_pdfs_from_drive(
+            source,
+            pending,
+            max_pages=MAX_PAGES,
+            last_pages=LAST_PAGES,
+            download_workers=args.download_workers,
+            extract_workers=args.extract_workers,
+            backend=args.pdf_backend,
+            token_budget=token_budget
+        )
+    hashes = {file['id']: file.get('md5Checksum', '') for file in files}
+    for doc in new_documents:
+        summary = cache.put_extraction(doc, hashes[doc['file_id']], settings)
+        cached[doc['file_id']] = dict(doc, summary=summary)
+
+    # Keep folder order; files that failed to download are left out
+    documents = [cached[file['id']] for file in files if file['id'] in cached]
     if not documents:
         print("No documents found. Exiting...")
+        cache.close()
         return
     
     # Generate summaries
-    print("\n[4/4] Generating summaries with OpenAI GPT-4...")
-    
-    with open("otherkey.txt") as f:
-        key = f.read().strip()
-    client = OpenAI(api_key=key)
-    
-    summaries = generate_summaries(documents, client, delay=1.0)
+    print(f"\n[{n_steps}/{n_steps}] Generating summaries with OpenAI GPT-4...")
+    to_summarize = [doc for doc in documents if doc['summary'] is None]
+    print(f"  {len(documents) - len(to_summarize)} summaries cached, {len(to_summarize)} to generate")
+
+    if to_summarize and args.batch == "local":
+        backend = FileBatchBackend(os.path.join(BATCH_DIR, "local"))
+        new_summaries = generate_summaries_batch(to_summarize, backend, poll_interval=0)
+    elif to_summarize and args.batch == "openai":
+        backend = OpenAIBatchBackend(get_client())
+        new_summaries = generate_summaries_batch(to_summarize, backend)
+    elif to_summarize:
+        new_summaries = generate_summaries(
+            to_summarize,
+            get_async_client(),
+            concurrency=args.concurrency,
+            limiter=RateLimiter(args.rpm, args.tpm)
+        )
+
+    if to_summarize:
+        for doc, summary in zip(to_summarize, new_summaries):
+            doc['summary'] = summary
+            # Failed summaries are not cached so the next run retries them
+            if not summary.startswith("Error: "):
+                cache.put_summary(doc['file_id'], summary)
+    cache.close()
+
+    summaries = [doc['summary'] for doc in documents]
     
     # Save to JSON
     print("\n" + "=" * 60)
@@ -1,16 +1,46 @@
+import argparse
+import asyncio
 import json
+import sys
+from pathlib import Path
 import numpy as np
-import time
-from umap import UMAP
-from sklearn.cluster import KMeans
-from hdbscan import HDBSCAN
-from openai import OpenAI
 from collections import defaultdict, Counter
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.async_llm import RateLimiter, CONCURRENCY, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE
+from common.llm_dag import LLMTask, run_dag
+from common.openai_client import get_async_client
+from common.case_table import write_case_table, available as case_table_available
+from common.processed_io import write_processed, meta_path, FORMATS
+from common.prompt_budget import pack_items, PromptUsage
+from embedding_store import EmbeddingStore, case_key, STORE_DIR
+from umap_projection import PersistedUMAP, REDUCER_DIR, DRIFT_THRESHOLD
+from knn_graph import load_knn, KNN_BACKENDS, DEFAULT_KNN_BACKEND
+from cluster_space import clustering_space, CLUSTER_SPACES, DEFAULT_CLUSTER_SPACE
+from topic_kmeans import fit_kmeans, ALGORITHMS
+from cluster_index import ClusterIndex, ClusterNesting
+from cluster_sampling import ClusterSampler
+
 INPUT_FILE = "court_cases_with_summaries.json"
 EMBEDDINGS_FILE = "embeddings.npz"
 OUTPUT_JSON = "new_court_cases_processed.json"
 
+# Token budgets for the cluster summaries sent with each naming/classification
+# prompt (previously the first 30 / 25 / 15 summaries); single summaries are
+# capped so one long case cannot crowd out the rest
+CLASSIFY_SAMPLE_TOKENS = 6000
+SUBCLUSTER_SAMPLE_TOKENS = 5000
+TOPIC_SAMPLE_TOKENS = 3000
+MAX_SUMMARY_TOKENS = 600
+
+# Summaries per prompt, picked nearest the cluster centroid in embedding space
+# with near-duplicates skipped (see cluster_sampling.py); the budgets above cap them
+CLASSIFY_SAMPLE_SIZE = 12
+SUBCLUSTER_SAMPLE_SIZE = 8
+TOPIC_SAMPLE_SIZE = 8
+
+prompt_usage = PromptUsage()
+
 # Predefined legal categories for high-level classification
 LEGAL_CATEGORIES = """
 1. Antitrust: market competition, monopolization, market power, anti-competitive practices, market dominance, price-fixing, exclusive dealing, or restraint of trade involving ANY tech companies, or anti-competitive practices by major platforms or AI companies.
@@ -41,33 +71,82 @@ def load_data(input_file):
         data = json.load(f)
     return data
 
-def load_embeddings(embeddings_file):
-    """Load pre-computed embeddings from NPZ file"""
-    print(f"\nLoading embeddings from {embeddings_file}...")
-    with np.load(embeddings_file) as data:
-        embeddings = data['embeddings']
+def load_embeddings(data, store_dir=STORE_DIR, embeddings_file=EMBEDDINGS_FILE):
+    """
+    Embeddings for `data`, looked up by case name + summary in the embedding
+    store. Falls back to embeddings.npz, matched by case name, for output of
+    older runs. Returns None if some cases have no embedding; raises
+    ValueError if embeddings.npz holds full-text rather than summary vectors.
+    """
+    store = EmbeddingStore(store_dir)
+    keys = [case_key(d['name'], d['summary']) for d in data]
+    missing = store.missing(keys)
+    if not missing:
+        embeddings = store.get(keys)
+        print(f"  Loaded {len(embeddings)} embeddings with dimension {embeddings.shape[1]} from {store_dir}/")
+        return embeddings
+
+    print(f"\nLoading embeddings from {embeddings_file} ({len(missing)} cases not in {store_dir}/)...")
+    try:
+        with np.load(embeddings_file) as npz:
+            stored = npz['embeddings']
+            names = list(npz['names']) if 'names' in npz else None
+            # Files without a recorded source predate the full-text option being tracked; assume summaries
+            source = str(npz['source']) if 'source' in npz else "summary"
+    except FileNotFoundError:
+        print(f"  {embeddings_file} not found")
+        return None
+
+    if source != "summary":
+        # Mixing them with summary vectors from the store would put cases in different spaces
+        raise ValueError(f"{embeddings_file} holds {source} embeddings, but clustering here uses summary "
+                         f"embeddings; re-run 2_process+cluster_cses.py with --embed-source summary")
+
+    if names is None:
+        # Written before names were saved alongside: only usable if it lines up by position
+        if len(stored) != len(data):
+            print(f"  Mismatch between embeddings ({len(stored)}) and data ({len(data)})")
+            return None
+        return stored
+
+    row_by_name = {name: row for row, name in enumerate(names)}
+    absent = [d['name'] for d in data if d['name'] not in row_by_name]
+    if absent:
+        print(f"  {len(absent)} cases have no embedding (e.g. {absent[0]}); re-run 2_process+cluster_cses.py")
+        return None
+    embeddings = stored[[row_by_name[d['name']] for d in data]]
     print(f"  Loaded {len(embeddings)} embeddings with dimension {embeddings.shape[1]}")
     return embeddings
 
-def reduce_dimensions(embeddings, n_components=2):
-    """Reduce embeddings to 2D using UMAP"""
+def reduce_dimensions(embeddings, keys, space=None, n_components=2, refit=False,
+                      drift_threshold=DRIFT_THRESHOLD, knn=None, reducer_dir=REDUCER_DIR):
+    """
+    Reduce embeddings to 2D using UMAP. The fitted reducer is kept in
+    reducer_dir: cases already on the map keep their coordinates and new
+    ones are projected onto it, until refit or drift forces a new fit.
+    """
     print("\nReducing dimensions with UMAP...")
-    reducer = UMAP(
+    reducer = PersistedUMAP(
+        reducer_dir,
+        space=space,
         n_components=n_components,
         random_state=42,
         n_neighbors=15,
         min_dist=0.01
     )
-    reduced = reducer.fit_transform(embeddings)
-    return reduced
+    return reducer.coordinates(keys, embeddings, refit=refit, drift_threshold=drift_threshold, knn=knn)
 
-def independent_clustering(embeddings_2d, n_docs, n_kmeans=None):
+def independent_clustering(features, n_docs, n_kmeans=None, keys=None, kmeans_algorithm="auto", warm_start=True):
     """
     Run K-Means and HDBSCAN independently, then map HDBSCAN into K-Means.
+    `features` is the clustering space: the 2-D map, or see cluster_space.py.
+    With `keys`, K-Means warm-starts from the previous run (see topic_kmeans.py).
     Following NeurIPS paper methodology:
     - K-Means: high-level topics (high recall, forces all points into clusters)
     - HDBSCAN: specific subclusters (high precision, tight coherent groups)
     """
+    from hdbscan import HDBSCAN
+
     # Auto-calculate K-Means cluster count if not specified
     if n_kmeans is None:
         n_kmeans = min(max(n_docs // 25, 15), 30)
@@ -78,8 +157,9 @@ def independent_clustering(embeddings_2d, n_docs, n_kmeans=None):
     
     # 1. K-MEANS: High-level topics (coarse layer)
     print(f"\n Running K-Means clustering...")
-    kmeans = KMeans(n_clusters=n_kmeans, random_state=42, n_init=10)
-    labels_kmeans = kmeans.fit_predict(embeddings_2d)
+    kmeans = fit_kmeans(features, n_kmeans, keys=keys, name="testing_kmeans",
+                        algorithm=kmeans_algorithm, warm_start=warm_start)
+    labels_kmeans = kmeans.labels_
     print(f"  Created {n_kmeans} high-level topics")
     
     # 2. HDBSCAN: Specific subclusters (fine layer)
@@ -90,10 +170,12 @@ def independent_clustering(embeddings_2d, n_docs, n_kmeans=None):
         cluster_selection_epsilon=0.0,
         metric='euclidean'
     )
-    labels_hdbscan = hdbscan.fit_predict(embeddings_2d)
+    labels_hdbscan = hdbscan.fit_predict(features)
     
-    n_hdbscan_clusters = len(set(labels_hdbscan)) - (1 if -1 in labels_hdbscan else 0)
-    n_noise = np.sum(labels_hdbscan == -1)
+    # One contingency table (HDBSCAN x K-Means) gives sizes, noise, dominant topics and purity
+    nesting = ClusterNesting(labels_kmeans, labels_hdbscan)
+    n_hdbscan_clusters = len(nesting.fine_ids)
+    n_noise = nesting.n_noise
     noise_pct = 100 * n_noise / len(labels_hdbscan)
     
     print(f"  HDBSCAN found {n_hdbscan_clusters} tight subclusters")
@@ -101,28 +183,9 @@ def independent_clustering(embeddings_2d, n_docs, n_kmeans=None):
     
     # 3. Verify HDBSCAN clusters nest within K-Means clusters
     print(f"\n Analyzing nesting structure...")
-    hdbscan_to_kmeans = {}
-    pure_nesting_count = 0
-    
-    for hdbscan_id in set(labels_hdbscan):
-        if hdbscan_id == -1:
-            continue
-        
-        mask = labels_hdbscan == hdbscan_id
-        kmeans_in_hdbscan = labels_kmeans[mask]
-        
-        # Check if this HDBSCAN cluster falls into a single K-Means cluster
-        dominant_kmeans = Counter(kmeans_in_hdbscan).most_common(1)[0][0]
-        purity = np.sum(kmeans_in_hdbscan == dominant_kmeans) / len(kmeans_in_hdbscan)
-        
-        hdbscan_to_kmeans[hdbscan_id] = {
-            'dominant_kmeans': int(dominant_kmeans),
-            'purity': float(purity),
-            'size': int(np.sum(mask))
-        }
-        
-        if purity >= 0.95:  # 95%+ in single K-Means cluster
-            pure_nesting_count += 1
+    hdbscan_to_kmeans = nesting.fine_to_coarse()
+    # 95%+ in single K-Means cluster
+    pure_nesting_count = int(np.sum(nesting.purity[nesting.fine_ids] >= 0.95))
     
     if len(hdbscan_to_kmeans) > 0:
         nesting_pct = 100 * pure_nesting_count / len(hdbscan_to_kmeans)
@@ -141,45 +204,28 @@ def independent_clustering(embeddings_2d, n_docs, n_kmeans=None):
         })
     
     # 5. Analyze noise distribution across K-Means clusters
-    noise_mask = labels_hdbscan == -1
-    if np.sum(noise_mask) > 0:
-        noise_kmeans = labels_kmeans[noise_mask]
-        noise_distribution = Counter(noise_kmeans)
+    if n_noise > 0:
+        noisy_kmeans = np.flatnonzero(nesting.noise)
         print(f"\n Noise points distributed across K-Means clusters:")
-        for kmeans_id in sorted(noise_distribution.keys())[:5]:
-            count = noise_distribution[kmeans_id]
-            print(f"   K-Means {kmeans_id}: {count} noise points")
-        if len(noise_distribution) > 5:
-            print(f"   ... and {len(noise_distribution) - 5} more")
+        for kmeans_id in noisy_kmeans[:5]:
+            print(f"   K-Means {kmeans_id}: {nesting.noise[kmeans_id]} noise points")
+        if len(noisy_kmeans) > 5:
+            print(f"   ... and {len(noisy_kmeans) - 5} more")
     
     return labels_kmeans, labels_hdbscan, hdbscan_to_kmeans, kmeans_to_hdbscan
 
-def classify_kmeans_topics_into_categories(summaries, labels_kmeans, client, delay=0.5):
-    """
-    Classify each K-Means topic into one of the 8 predefined legal categories.
-    Returns mapping of kmeans_label -> (category_num, category_name)
-    """
-    print("\n Classifying K-Means topics into 8 legal categories...")
-    unique_kmeans = np.unique(labels_kmeans)
-    kmeans_to_category = {}
-    
-    for i, kmeans_label in enumerate(unique_kmeans):
-        # Get documents in this K-Means topic
-        cluster_docs = [summaries[j] for j, l in enumerate(labels_kmeans) if l == kmeans_label]
-        
-        if len(cluster_docs) == 0:
-            kmeans_to_category[int(kmeans_label)] = (8, "Unrelated")
-            continue
-        
-        # Sample up to 20 documents
-        sample = "\n\n".join(cluster_docs[:30])
-        
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{
-                    "role": "user",
-                    "content": f"""You are a legal expert classifying a cluster of court cases into ONE legal category.
+def build_classify_request(cluster_docs, order=None):
+    """Chat request classifying one K-Means topic into one of the 8 legal categories"""
+    # Most representative summaries that fit the budget
+    packed = pack_items(cluster_docs, CLASSIFY_SAMPLE_TOKENS, max_item_tokens=MAX_SUMMARY_TOKENS, order=order)
+    prompt_usage.record("classify topics", packed)
+    sample = packed.text
+    
+    return {
+        "model": "gpt-4o",
+        "messages": [{
+            "role": "user",
+            "content": f"""You are a legal expert classifying a cluster of court cases into ONE legal category.
 
 Think about how AI, ML, automated systems, or algorithims may have impacted the case. 
 Use these definitions carefully and be conservative about assigning AI-related labels. 
@@ -194,59 +240,23 @@ Cases in this cluster:
 Respond with EXACTLY one digit from 1 to 8 and nothing else.
 Category number (1–8):"""
 
-                }],
-                max_tokens=10,
-                temperature=0
-            )
-            
-            category_num = int(response.choices[0].message.content.strip())
-            category_name = CATEGORY_NAMES.get(category_num, "Unknown")
-            kmeans_to_category[int(kmeans_label)] = (category_num, category_name)
-            
-            if (i + 1) % 5 == 0 or (i + 1) == len(unique_kmeans):
-                print(f"  [{i+1}/{len(unique_kmeans)}] K-Means Topic {kmeans_label} → {category_name}")
-            
-            time.sleep(delay)
-            
-        except Exception as e:
-            print(f"  Error classifying K-Means topic {kmeans_label}: {e}")
-            kmeans_to_category[int(kmeans_label)] = (8, "Unrelated")
-            time.sleep(delay * 2)
-    
-    # Print distribution
-    category_counts = Counter(cat_name for _, cat_name in kmeans_to_category.values())
-    print(f"\n Legal category distribution:")
-    for cat_name, count in sorted(category_counts.items()):
-        print(f"   {cat_name}: {count} topics")
-    
-    return kmeans_to_category
+        }],
+        "max_tokens": 10,
+        "temperature": 0
+    }
 
-def generate_hdbscan_subcluster_names(summaries, labels_hdbscan, client, delay=0.5):
-    """
-    Generate names for HDBSCAN subclusters (tight, specific groups).
-    These are the fine-grained, high-precision clusters.
-    """
-    unique_hdbscan = [l for l in np.unique(labels_hdbscan) if l != -1]
-    cluster_names = {}
-    
-    print(f"  Generating names for {len(unique_hdbscan)} HDBSCAN subclusters...")
-    
-    for i, hdbscan_label in enumerate(unique_hdbscan):
-        cluster_docs = [summaries[j] for j, l in enumerate(labels_hdbscan) if l == hdbscan_label]
-        
-        if len(cluster_docs) == 0:
-            cluster_names[int(hdbscan_label)] = f"Subcluster {hdbscan_label}"
-            continue
-        
-        # Use fewer samples since HDBSCAN clusters are tight and coherent
-        sample = "\n\n".join(cluster_docs[:25])
-        
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{
-                    "role": "user",
-                    "content": f"""You are a legal expert naming a tight, coherent subcluster of court cases.
+def build_subcluster_request(cluster_docs, order=None):
+    """Chat request naming one HDBSCAN subcluster (tight, specific group)"""
+    # Smaller budget since HDBSCAN clusters are tight and coherent
+    packed = pack_items(cluster_docs, SUBCLUSTER_SAMPLE_TOKENS, max_item_tokens=MAX_SUMMARY_TOKENS, order=order)
+    prompt_usage.record("name subclusters", packed)
+    sample = packed.text
+    
+    return {
+        "model": "gpt-4o",
+        "messages": [{
+            "role": "user",
+            "content": f"""You are a legal expert naming a tight, coherent subcluster of court cases.
 
 This is a cluster of similar court cases.
 
@@ -261,66 +271,26 @@ Court case summaries from this cluster:
 Respond with ONLY the subcluster name. No explanations, quotes, or extra text.
 
 Subcluster name:"""
-                }],
-                max_tokens=100,
-                temperature=0.3
-            )
-            
-            name = response.choices[0].message.content.strip().strip('"\'')
-            cluster_names[int(hdbscan_label)] = name
-            
-            if (i + 1) % 10 == 0 or (i + 1) == len(unique_hdbscan):
-                print(f"    [{i+1}/{len(unique_hdbscan)}] Subcluster {hdbscan_label}: {name}")
-            
-            time.sleep(delay)
-            
-        except Exception as e:
-            print(f"    Error naming subcluster {hdbscan_label}: {e}")
-            cluster_names[int(hdbscan_label)] = f"Subcluster {hdbscan_label}"
-            time.sleep(delay * 2)
-    
-    return cluster_names
+        }],
+        "max_tokens": 100,
+        "temperature": 0
+    }
 
-def generate_kmeans_topic_names(summaries, labels_kmeans, labels_hdbscan, 
-                                 kmeans_to_category, hdbscan_names, 
-                                 kmeans_to_hdbscan, client, delay=0.8):
-    """
-    Generate names for K-Means topics using HDBSCAN subcluster names as context.
-    Format: "Descriptive Topic Name: Legal Category"
-    """
-    unique_kmeans = np.unique(labels_kmeans)
-    cluster_names = {}
-    
-    print(f"  Generating category-aware names for {len(unique_kmeans)} K-Means topics...")
-    
-    for i, kmeans_label in enumerate(unique_kmeans):
-        cluster_docs = [summaries[j] for j, l in enumerate(labels_kmeans) if l == kmeans_label]
-        
-        category_num, category_name = kmeans_to_category.get(int(kmeans_label), (8, "Unrelated"))
-        
-        if len(cluster_docs) == 0:
-            cluster_names[int(kmeans_label)] = f"Topic {kmeans_label}: {category_name}"
-            continue
-        
-        # Get HDBSCAN subclusters in this K-Means topic
-        subclusters = kmeans_to_hdbscan.get(int(kmeans_label), [])
-        subcluster_names = [
-            hdbscan_names.get(sc['hdbscan_id'], f"Subcluster {sc['hdbscan_id']}")
-            for sc in subclusters[:10]  # Limit to top 10
-        ]
-        
-        sample_docs = "\n\n".join(cluster_docs[:15])
-        
-        subcluster_context = ""
-        if subcluster_names:
-            subcluster_context = f"\n\nThis topic contains these specific subclusters:\n" + "\n".join(f"- {name}" for name in subcluster_names)
-        
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{
-                    "role": "user",
-                    "content": f"""You are a legal expert naming a high-level topic cluster of court cases.
+def build_topic_request(cluster_docs, category_name, subcluster_names, order=None):
+    """Chat request naming one K-Means topic, with its category and subcluster names as context"""
+    packed = pack_items(cluster_docs, TOPIC_SAMPLE_TOKENS, max_item_tokens=MAX_SUMMARY_TOKENS, order=order)
+    prompt_usage.record("name topics", packed)
+    sample_docs = packed.text
+    
+    subcluster_context = ""
+    if subcluster_names:
+        subcluster_context = f"\n\nThis topic contains these specific subclusters:\n" + "\n".join(f"- {name}" for name in subcluster_names)
+    
+    return {
+        "model": "gpt-4o",
+        "messages": [{
+            "role": "user",
+            "content": f"""You are a legal expert naming a high-level topic cluster of court cases.
 
 This cluster has been classified as: {category_name}
 {subcluster_context}
@@ -337,30 +307,128 @@ Court case summaries from this topic:
 Respond with ONLY the cluster name in the format "Topic: Category". No explanations.
 
 Cluster name:"""
-                }],
-                max_tokens=100,
-                temperature=0.3
-            )
-            
-            name = response.choices[0].message.content.strip().strip('"\'')
-            
+        }],
+        "max_tokens": 100,
+        "temperature": 0
+    }
+
+def parse_name(response):
+    return response.choices[0].message.content.strip().strip('"\'')
+
+def classification_tasks(summaries, kmeans_index, sampler):
+    """
+    Classify each K-Means topic into one of the 8 predefined legal categories.
+    Each task's result is (category_num, category_name).
+    """
+    def parse(response, results):
+        category_num = int(response.choices[0].message.content.strip())
+        return category_num, CATEGORY_NAMES.get(category_num, "Unknown")
+    
+    def classify_task(kmeans_label):
+        members = kmeans_index.members(kmeans_label)
+        request = build_classify_request(kmeans_index.gather(summaries, kmeans_label),
+                                         order=sampler.order(members, CLASSIFY_SAMPLE_SIZE))
+        return LLMTask(f"category:{kmeans_label}", lambda results: request, parse,
+                       fallback=lambda error, results: (8, "Unrelated"))
+    
+    return [classify_task(kmeans_label) for kmeans_label in kmeans_index.labels.tolist()]
+
+def subcluster_naming_tasks(summaries, hdbscan_index, sampler):
+    """
+    Generate names for HDBSCAN subclusters (tight, specific groups).
+    These are the fine-grained, high-precision clusters.
+    """
+    def subcluster_task(hdbscan_label):
+        members = hdbscan_index.members(hdbscan_label)
+        request = build_subcluster_request(hdbscan_index.gather(summaries, hdbscan_label),
+                                           order=sampler.order(members, SUBCLUSTER_SAMPLE_SIZE))
+        return LLMTask(f"subcluster:{hdbscan_label}", lambda results: request,
+                       parse=lambda response, results: parse_name(response),
+                       fallback=lambda error, results: f"Subcluster {hdbscan_label}")
+    
+    return [subcluster_task(label) for label in hdbscan_index.labels.tolist() if label != -1]
+
+def topic_naming_tasks(summaries, kmeans_index, kmeans_to_hdbscan, sampler):
+    """
+    Generate names for K-Means topics using HDBSCAN subcluster names as context.
+    Format: "Descriptive Topic Name: Legal Category"
+    Each topic depends only on its own category and the subclusters named in its prompt.
+    """
+    def topic_task(kmeans_label):
+        members = kmeans_index.members(kmeans_label)
+        cluster_docs = kmeans_index.gather(summaries, kmeans_label)
+        order = sampler.order(members, TOPIC_SAMPLE_SIZE)
+        # Limit to top 10 subclusters
+        subcluster_ids = [sc['hdbscan_id'] for sc in kmeans_to_hdbscan.get(kmeans_label, [])[:10]]
+        category = f"category:{kmeans_label}"
+        
+        def build(results):
+            _, category_name = results[category]
+            subcluster_names = [results[f"subcluster:{h}"] for h in subcluster_ids]
+            return build_topic_request(cluster_docs, category_name, subcluster_names, order=order)
+        
+        def parse(response, results):
+            _, category_name = results[category]
+            name = parse_name(response)
             # Ensure format is correct
             if ": " not in name:
                 name = f"{name}: {category_name}"
-            
-            cluster_names[int(kmeans_label)] = name
-            
-            if (i + 1) % 5 == 0 or (i + 1) == len(unique_kmeans):
-                print(f"    [{i+1}/{len(unique_kmeans)}] Topic {kmeans_label}: {name}")
-            
-            time.sleep(delay)
-            
-        except Exception as e:
-            print(f"    Error naming topic {kmeans_label}: {e}")
-            cluster_names[int(kmeans_label)] = f"Topic {kmeans_label}: {category_name}"
-            time.sleep(delay * 2)
+            return name
+        
+        def fallback(error, results):
+            return f"Topic {kmeans_label}: {results[category][1]}"
+        
+        return LLMTask(f"topic:{kmeans_label}", build, parse, fallback,
+                       deps=[category] + [f"subcluster:{h}" for h in subcluster_ids])
+    
+    return [topic_task(kmeans_label) for kmeans_label in kmeans_index.labels.tolist()]
+
+def classify_and_name_clusters(summaries, embeddings, kmeans_index, hdbscan_index, kmeans_to_hdbscan, client,
+                               concurrency=CONCURRENCY, limiter=None):
+    """
+    Topic classification, subcluster naming and topic naming as one graph of
+    concurrent LLM calls under a shared rate limit (common/llm_dag.py): a topic
+    is named as soon as its own category and subclusters are ready. Each prompt
+    shows the summaries nearest its cluster's centroid in `embeddings`.
+    Returns (kmeans_to_category, cluster_names_hdbscan, cluster_names_kmeans).
+    """
+    sampler = ClusterSampler(embeddings)
+    tasks = (classification_tasks(summaries, kmeans_index, sampler)
+             + subcluster_naming_tasks(summaries, hdbscan_index, sampler)
+             + topic_naming_tasks(summaries, kmeans_index, kmeans_to_hdbscan, sampler))
+    totals = Counter(task.name.split(":")[0] for task in tasks)
+    print(f"  {totals['category']} topic classifications, {totals['subcluster']} subcluster names, "
+          f"{totals['topic']} topic names ({concurrency} concurrent requests)")
+    
+    done = Counter()
+    titles = {"category": "K-Means Topic", "subcluster": "Subcluster", "topic": "Topic"}
+    errors = {"category": "classifying K-Means topic", "subcluster": "naming subcluster", "topic": "naming topic"}
+    every = {"category": 5, "subcluster": 10, "topic": 5}
+    
+    def on_done(task, result, error):
+        kind, label = task.name.split(":")
+        done[kind] += 1
+        if error is not None:
+            print(f"    Error {errors[kind]} {label}: {error}")
+        elif done[kind] % every[kind] == 0 or done[kind] == totals[kind]:
+            shown = result[1] if kind == "category" else result
+            print(f"    [{done[kind]}/{totals[kind]}] {titles[kind]} {label}: {shown}")
+    
+    results, stats = asyncio.run(run_dag(client, tasks, concurrency=concurrency, limiter=limiter, on_done=on_done))
+    stats.report()
+    
+    def collect(kind):
+        return {int(name.split(":")[1]): value for name, value in results.items() if name.startswith(kind + ":")}
+    
+    kmeans_to_category = collect("category")
+    
+    # Print distribution
+    category_counts = Counter(cat_name for _, cat_name in kmeans_to_category.values())
+    print(f"\n Legal category distribution:")
+    for cat_name, count in sorted(category_counts.items()):
+        print(f"   {cat_name}: {count} topics")
     
-    return cluster_names
+    return kmeans_to_category, collect("subcluster"), collect("topic")
 
 def save_processed_data(
     embeddings_2d,
@@ -372,67 +440,68 @@ def save_processed_data(
     cluster_names_kmeans,
     cluster_names_hdbscan,
     data,
-    output_json
+    output_json,
+    output_format="json",
+    case_table=True
 ):
-    """Save all clustering results with proper hierarchy"""
-    processed = []
-    
-    for i, d in enumerate(data):
-        x, y = float(embeddings_2d[i, 0]), float(embeddings_2d[i, 1])
-        kmeans_label = int(labels_kmeans[i])
-        hdbscan_label = int(labels_hdbscan[i])
+    """Save all clustering results with proper hierarchy, streaming documents to disk"""
+    def documents():
+        # One at a time; the writer streams them to disk
+        for i, d in enumerate(data):
+            x, y = float(embeddings_2d[i, 0]), float(embeddings_2d[i, 1])
+            kmeans_label = int(labels_kmeans[i])
+            hdbscan_label = int(labels_hdbscan[i])
         
-        category_num, category_name = kmeans_to_category[int(kmeans_label)]
+            category_num, category_name = kmeans_to_category[int(kmeans_label)]
         
-        # Get HDBSCAN info if not noise
-        hdbscan_name = None
-        hdbscan_purity = None
-        if hdbscan_label != -1:
-            hdbscan_name = cluster_names_hdbscan.get(hdbscan_label, f"Subcluster {hdbscan_label}")
-            hdbscan_info = hdbscan_to_kmeans.get(hdbscan_label, {})
-            hdbscan_purity = hdbscan_info.get('purity', None)
+            # Get HDBSCAN info if not noise
+            hdbscan_name = None
+            hdbscan_purity = None
+            if hdbscan_label != -1:
+                hdbscan_name = cluster_names_hdbscan.get(hdbscan_label, f"Subcluster {hdbscan_label}")
+                hdbscan_info = hdbscan_to_kmeans.get(hdbscan_label, {})
+                hdbscan_purity = hdbscan_info.get('purity', None)
         
-        processed.append({
-            "name": d["name"],
-            "summary": d["summary"],
-            "full_text": d["full_text"],
-            "text_length": d["text_length"],
-            "x": x,
-            "y": y,
+            yield {
+                "name": d["name"],
+                "summary": d["summary"],
+                "full_text": d["full_text"],
+                "text_length": d["text_length"],
+                "x": x,
+                "y": y,
             
-            # Coarse layer: K-Means topics
-            "kmeans_cluster": kmeans_label,
-            "kmeans_cluster_name": cluster_names_kmeans.get(kmeans_label, f"Topic {kmeans_label}"),
+                # Coarse layer: K-Means topics
+                "kmeans_cluster": kmeans_label,
+                "kmeans_cluster_name": cluster_names_kmeans.get(kmeans_label, f"Topic {kmeans_label}"),
             
-            # Fine layer: HDBSCAN subclusters
-            "hdbscan_cluster": hdbscan_label,
-            "hdbscan_cluster_name": hdbscan_name,
-            "is_hdbscan_noise": hdbscan_label == -1,
-            "hdbscan_nesting_purity": hdbscan_purity,
+                # Fine layer: HDBSCAN subclusters
+                "hdbscan_cluster": hdbscan_label,
+                "hdbscan_cluster_name": hdbscan_name,
+                "is_hdbscan_noise": hdbscan_label == -1,
+                "hdbscan_nesting_purity": hdbscan_purity,
             
-            # Legal category metadata
-            "legal_category": category_num,
-            "legal_category_name": category_name,
-        })
+                # Legal category metadata
+                "legal_category": category_num,
+                "legal_category_name": category_name,
+            }
     
-    # Calculate distributions
-    kmeans_sizes = Counter(labels_kmeans)
-    hdbscan_sizes = Counter(l for l in labels_hdbscan if l != -1)
+    # Topic sizes and noise per topic, from one contingency table
+    nesting = ClusterNesting(labels_kmeans, labels_hdbscan)
     
     # Build hierarchy: K-Means topics contain HDBSCAN subclusters
     hierarchy = {}
-    for kmeans_label in sorted([int(k) for k in np.unique(labels_kmeans)]):
+    for kmeans_label in np.flatnonzero(nesting.coarse_sizes).tolist():
         category_num, category_name = kmeans_to_category[int(kmeans_label)]
         
         # Get HDBSCAN subclusters in this K-Means topic
         subclusters_info = kmeans_to_hdbscan.get(int(kmeans_label), [])
         
         # Count noise points in this K-Means cluster
-        noise_in_kmeans = np.sum((labels_kmeans == kmeans_label) & (labels_hdbscan == -1))
+        noise_in_kmeans = nesting.noise[kmeans_label]
         
         hierarchy[int(kmeans_label)] = {
             "name": cluster_names_kmeans.get(int(kmeans_label), f"Topic {kmeans_label}"),
-            "size": int(kmeans_sizes[int(kmeans_label)]),
+            "size": int(nesting.coarse_sizes[kmeans_label]),
             "legal_category": int(category_num),
             "legal_category_name": str(category_name),
             "n_noise_points": int(noise_in_kmeans),
@@ -449,42 +518,76 @@ def save_processed_data(
     
     # Category distribution
     category_distribution = {str(k): int(v) for k, v in Counter(
-        kmeans_to_category[int(km)][1] for km in np.unique(labels_kmeans)
+        kmeans_to_category[int(km)][1] for km in np.flatnonzero(nesting.coarse_sizes)
     ).items()}
     
-    output_obj = {
-        "documents": processed,
-        "meta": {
-            "n_documents": int(len(processed)),
-            "n_kmeans_topics": int(len(cluster_names_kmeans)),
-            "n_hdbscan_subclusters": int(len(cluster_names_hdbscan)),
-            "n_hdbscan_noise": int(np.sum(labels_hdbscan == -1)),
-            "methodology": "Independent K-Means and HDBSCAN clustering (NeurIPS paper style)",
-            
-            "cluster_names_kmeans": {int(k): str(v) for k, v in cluster_names_kmeans.items()},
-            "cluster_names_hdbscan": {int(k): str(v) for k, v in cluster_names_hdbscan.items()},
-            
-            "legal_categories": {int(k): str(v) for k, v in CATEGORY_NAMES.items()},
-            "category_distribution": category_distribution,
-            "kmeans_to_category": {int(k): {"number": int(v[0]), "name": str(v[1])} 
-                                   for k, v in kmeans_to_category.items()},
-            
-            "hierarchy": hierarchy,
-        }
+    meta = {
+        "n_documents": int(len(data)),
+        "n_kmeans_topics": int(len(cluster_names_kmeans)),
+        "n_hdbscan_subclusters": int(len(cluster_names_hdbscan)),
+        "n_hdbscan_noise": nesting.n_noise,
+        "methodology": "Independent K-Means and HDBSCAN clustering (NeurIPS paper style)",
+        
+        "cluster_names_kmeans": {int(k): str(v) for k, v in cluster_names_kmeans.items()},
+        "cluster_names_hdbscan": {int(k): str(v) for k, v in cluster_names_hdbscan.items()},
+        
+        "legal_categories": {int(k): str(v) for k, v in CATEGORY_NAMES.items()},
+        "category_distribution": category_distribution,
+        "kmeans_to_category": {int(k): {"number": int(v[0]), "name": str(v[1])} 
+                               for k, v in kmeans_to_category.items()},
+        
+        "hierarchy": hierarchy,
     }
     
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(output_obj, f, indent=2, ensure_ascii=False)
-    
-    print(f"\nSaved processed data to {output_json}")
+    written = write_processed(output_json, documents(), meta, format=output_format)
+    print(f"\nSaved processed data to {written} (meta also in {meta_path(written).name})")
+    save_case_table(written, documents, case_table)
+
+def save_case_table(written, documents, enabled):
+    """Columnar copy of the processed file, for readers that only need a few fields"""
+    if not enabled:
+        return
+    if not case_table_available():
+        print("  pyarrow is not installed; skipping the columnar case table")
+        return
+    print(f"  Saved columnar case table to {write_case_table(written, documents())}/")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Independent K-Means + HDBSCAN clustering of the case embeddings")
+    parser.add_argument("--refit-umap", action="store_true",
+                        help=f"fit UMAP from scratch instead of projecting new cases onto the map in {REDUCER_DIR}/")
+    parser.add_argument("--drift-threshold", type=float, default=DRIFT_THRESHOLD,
+                        help=f"refit once this share of cases was projected rather than fitted (default: {DRIFT_THRESHOLD})")
+    parser.add_argument("--knn-backend", choices=[*KNN_BACKENDS, "none"], default=DEFAULT_KNN_BACKEND,
+                        help=f"index for the cached kNN graph UMAP is fit on; none = UMAP builds its own (default: {DEFAULT_KNN_BACKEND})")
+    parser.add_argument("--cluster-space", choices=CLUSTER_SPACES, default=DEFAULT_CLUSTER_SPACE,
+                        help=f"features K-Means and HDBSCAN run on; the map is always 2-D UMAP (default: {DEFAULT_CLUSTER_SPACE})")
+    parser.add_argument("--kmeans", choices=ALGORITHMS, default="auto",
+                        help="K-Means variant; auto switches to MiniBatchKMeans for large corpora")
+    parser.add_argument("--cold-start", action="store_true",
+                        help="do not warm-start K-Means from the previous run's topics")
+    parser.add_argument("--output-format", choices=FORMATS, default="json",
+                        help=f"{OUTPUT_JSON} as one JSON object, or JSON Lines (.jsonl) with the meta in a sidecar")
+    parser.add_argument("--no-case-table", action="store_true",
+                        help="do not also write the columnar (Arrow/Parquet) copy of the output")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY,
+                        help=f"OpenAI requests in flight at once (default: {CONCURRENCY})")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE,
+                        help=f"requests per minute limit (default: {REQUESTS_PER_MINUTE})")
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE,
+                        help=f"tokens per minute limit (default: {TOKENS_PER_MINUTE})")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+
     print("\n" + "="*60)
     print("INDEPENDENT K-MEANS + HDBSCAN CLUSTERING")
     print("(Following NeurIPS paper methodology)")
     print("="*60)
     
-    print("\n[1/7] Loading data...")
+    print("\n[1/6] Loading data...")
     data = load_data(INPUT_FILE)
     if not data:
         print("No data found. Please run step1_generate_summaries.py first.")
@@ -492,47 +595,58 @@ def main():
     
     summaries = [d['summary'] for d in data]
     
-    print("\n[2/7] Loading pre-computed embeddings...")
-    embeddings = load_embeddings(EMBEDDINGS_FILE)
-    if len(embeddings) != len(data):
-        print(f"ERROR: Mismatch between embeddings ({len(embeddings)}) and data ({len(data)})")
+    print("\n[2/6] Loading pre-computed embeddings...")
+    embeddings = load_embeddings(data)
+    if embeddings is None:
+        print("ERROR: Missing embeddings. Please run 2_process+cluster_cses.py first.")
         return
     
-    print("\n[3/7] Reducing dimensions...")
-    embeddings_2d = reduce_dimensions(embeddings)
+    print("\n[3/6] Reducing dimensions...")
+    keys = [case_key(d['name'], d['summary']) for d in data]
+    model = EmbeddingStore(STORE_DIR).model
+    knn = None
+    if args.knn_backend != "none":
+        # Cached kNN graph, only loaded or built when a UMAP is actually fit
+        knn = lambda: load_knn(keys, embeddings, n_neighbors=15, backend=args.knn_backend, space=model)
+    embeddings_2d = reduce_dimensions(
+        embeddings,
+        keys,
+        space=model,
+        refit=args.refit_umap,
+        drift_threshold=args.drift_threshold,
+        knn=knn
+    )
+    features = clustering_space(keys, embeddings, args.cluster_space, model=model, knn=knn)
+    if features is None:
+        features = embeddings_2d
     
-    print(f"\n[4/7] Running independent clustering...")
+    print(f"\n[4/6] Running independent clustering...")
     print(f"  Dataset size: {len(data)} documents")
+    print(f"  Clustering space: {args.cluster_space} ({features.shape[1]}-d)")
     
     (labels_kmeans, labels_hdbscan, 
      hdbscan_to_kmeans, kmeans_to_hdbscan) = independent_clustering(
-        embeddings_2d, len(data)
+        features, len(data),
+        keys=keys,
+        kmeans_algorithm=args.kmeans,
+        warm_start=not args.cold_start
     )
     
-    print("\n[5/7] Classifying K-Means topics into legal categories...")
-    with open("otherkey.txt") as f:
-        key = f.read().strip()
-    client = OpenAI(api_key=key)
+    print("\n[5/6] Classifying topics and naming clusters with OpenAI...")
+    print("  HDBSCAN subclusters (fine, specific groups) and K-Means topics (broad, high-level)")
     
-    kmeans_to_category = classify_kmeans_topics_into_categories(
-        summaries, labels_kmeans, client, delay=0.5
-    )
-    
-    print("\n[6/7] Generating cluster names with OpenAI...")
-    
-    print("\n Step 1: Naming HDBSCAN subclusters (fine, specific groups)...")
-    cluster_names_hdbscan = generate_hdbscan_subcluster_names(
-        summaries, labels_hdbscan, client, delay=0.5
-    )
+    # Member indices of every topic and subcluster, shared by the naming steps
+    kmeans_index = ClusterIndex(labels_kmeans)
+    hdbscan_index = ClusterIndex(labels_hdbscan)
     
-    print("\n Step 2: Naming K-Means topics (broad, high-level)...")
-    cluster_names_kmeans = generate_kmeans_topic_names(
-        summaries, labels_kmeans, labels_hdbscan,
-        kmeans_to_category, cluster_names_hdbscan,
-        kmeans_to_hdbscan, client, delay=0.8
+    kmeans_to_category, cluster_names_hdbscan, cluster_names_kmeans = classify_and_name_clusters(
+        summaries, embeddings, kmeans_index, hdbscan_index, kmeans_to_hdbscan,
+        get_async_client(),
+        concurrency=args.concurrency,
+        limiter=RateLimiter(args.rpm, args.tpm)
     )
     
-    print("\n[7/7] Saving processed data...")
+    print("\n[6/6] Saving processed data...")
     save_processed_data(
         embeddings_2d,
         labels_kmeans,
@@ -543,8 +657,11 @@ def main():
         cluster_names_kmeans,
         cluster_names_hdbscan,
         data,
-        OUTPUT_JSON
+        OUTPUT_JSON,
+        output_format=args.output_format,
+        case_table=not args.no_case_table
     )
+    prompt_usage.report()
     
     print("\n" + "="*60)
     print("CLUSTERING COMPLETE")
@@ -1,15 +1,35 @@
+import argparse
 import json
-import numpy as np
-import torch
+import sys
+from pathlib import Path
 import time
 
-from transformers import AutoTokenizer, AutoModel
-from umap import UMAP
-from sklearn.cluster import KMeans
-from openai import OpenAI
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.openai_client import get_client
+from common.case_table import write_case_table, available as case_table_available
+from common.processed_io import write_processed, FORMATS
+from common.prompt_budget import pack_items, PromptUsage
+from embedding_engine import load_encoder, embed_texts, save_embeddings, store_model_name, BACKENDS, DEFAULT_BACKEND
+from embedding_store import EmbeddingStore, sync_embeddings, case_key, STORE_DIR
+from embed_shards import embed_sharded, SHARD_SIZE
+from chunk_embedding import embed_documents, POOLINGS, WINDOW, STRIDE
+from umap_projection import PersistedUMAP, REDUCER_DIR, DRIFT_THRESHOLD
+from knn_graph import load_knn, KNN_BACKENDS, DEFAULT_KNN_BACKEND
+from cluster_space import clustering_space, CLUSTER_SPACES, DEFAULT_CLUSTER_SPACE
+from topic_kmeans import fit_kmeans, ALGORITHMS
+from cluster_index import ClusterIndex
+from cluster_sampling import ClusterSampler
 
 INPUT_FILE = "court_cases_with_summaries.json"
 OUTPUT_JSON = "court_cases_processed.json"
+EMBEDDINGS_FILE = "embeddings.npz"
+
+# Summary tokens sent per cluster name request (about five typical summaries)
+NAMING_SAMPLE_TOKENS = 1500
+# Summaries per request, nearest the cluster centroid with near-duplicates skipped
+NAMING_SAMPLE_SIZE = 5
+
+prompt_usage = PromptUsage()
 
 
 def load_data(input_file):
@@ -22,79 +42,58 @@ def load_data(input_file):
     return data
 
 
-def load_legalbert_model():
-    """Load LegalBERT model and tokenizer"""
-    print("\nLoading LegalBERT model...")
-    model_name = "nlpaueb/legal-bert-base-uncased"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModel.from_pretrained(model_name)
-    return tokenizer, model
-
-
-def generate_embeddings(summaries, tokenizer, model):
-
-    embeddings = []
-    device = torch.device('cpu')
-    model.to(device)
-    model.eval()
-
-    for i, summary in enumerate(summaries):
-        inputs = tokenizer(
-            summary,
-            return_tensors="pt",
-            truncation=True,
-            max_length=512,
-            padding=True
-        )
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-
-        with torch.no_grad():
-            outputs = model(**inputs)
-            embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-
-        embeddings.append(embedding[0])
-
-    return np.array(embeddings)
-
-
-def reduce_dimensions(embeddings, n_components=2):
-    reducer = UMAP(
+def reduce_dimensions(embeddings, keys, space=None, n_components=2, refit=False,
+                      drift_threshold=DRIFT_THRESHOLD, knn=None, reducer_dir=f"{REDUCER_DIR}-process"):
+    # Own reducer directory: 2_5_testing.py fits with a different min_dist
+    reducer = PersistedUMAP(
+        reducer_dir,
+        space=space,
         n_components=n_components,
         random_state=42,
         n_neighbors=15,
         min_dist=0.1
     )
-    reduced = reducer.fit_transform(embeddings)
-    return reduced
+    return reducer.coordinates(keys, embeddings, refit=refit, drift_threshold=drift_threshold, knn=knn)
 
 
-def cluster_documents(embeddings_2d, n_clusters_low=50, n_clusters_high=10):
-    kmeans_low = KMeans(n_clusters=n_clusters_low, random_state=42, n_init=10)
-    labels_low = kmeans_low.fit_predict(embeddings_2d)
+def cluster_documents(features, n_clusters_low=50, n_clusters_high=10, keys=None, algorithm="auto", warm_start=True):
+    # With keys, both layers warm-start from the previous run (see topic_kmeans.py)
+    kmeans_low = fit_kmeans(features, n_clusters_low, keys=keys, name="process_low",
+                            algorithm=algorithm, warm_start=warm_start)
+    labels_low = kmeans_low.labels_
 
+    # Low-level ids are stable across warm runs, so they key the high-level fit
     centroids = kmeans_low.cluster_centers_
-    kmeans_high = KMeans(n_clusters=n_clusters_high, random_state=42, n_init=10)
-    labels_high_centroids = kmeans_high.fit_predict(centroids)
+    kmeans_high = fit_kmeans(centroids, n_clusters_high,
+                             keys=[str(i) for i in range(len(centroids))] if keys is not None else None,
+                             name="process_high", algorithm="full", warm_start=warm_start)
+    labels_high_centroids = kmeans_high.labels_
 
     # Map low-level clusters to high-level categories
-    high_level_labels = np.array([labels_high_centroids[label] for label in labels_low])
+    high_level_labels = labels_high_centroids[labels_low]
 
     return labels_low, high_level_labels, kmeans_low.cluster_centers_
 
 
-def generate_cluster_names(summaries, labels, client, delay=1.0):
+def generate_cluster_names(summaries, labels, client, delay=1.0, sampler=None):
     """
-    Generate names for clusters using OpenAI
+    Generate names for clusters using OpenAI. With a ClusterSampler, each
+    prompt shows the summaries nearest the cluster centroid.
     """
-    unique_labels = np.unique(labels)
+    index = ClusterIndex(labels)
+    unique_labels = index.labels
     cluster_names = {}
 
     for i, label in enumerate(unique_labels):
         # Get summaries for this cluster
-        cluster_docs = [summaries[j] for j, l in enumerate(labels) if l == label]
+        members = index.members(label)
+        cluster_docs = index.gather(summaries, label)
+        order = sampler.order(members, NAMING_SAMPLE_SIZE) if sampler is not None else None
 
-        # Sample up to 5 documents from the cluster
-        sample = "\n\n".join(cluster_docs[:5])
+        # Most representative summaries that fit the budget
+        packed = pack_items(cluster_docs, NAMING_SAMPLE_TOKENS, max_item_tokens=NAMING_SAMPLE_TOKENS // 2, order=order)
+        prompt_usage.record("name clusters", packed)
+        sample = packed.text
 
         try:
             response = client.chat.completions.create(
@@ -107,7 +106,9 @@ def generate_cluster_names(summaries, labels, client, delay=1.0):
 
 Cluster name:"""
                 }],
-                max_tokens=100
+                max_tokens=100,
+                # Deterministic, so re-runs are answered from the response cache
+                temperature=0
             )
 
             name = response.choices[0].message.content.strip()
@@ -134,48 +135,93 @@ def save_processed_data(
     cluster_names_low,
     cluster_names_high,
     data,
-    output_json
+    output_json,
+    output_format="json",
+    case_table=True
 ):
-    processed = []
-    for i, d in enumerate(data):
-        x, y = float(embeddings_2d[i, 0]), float(embeddings_2d[i, 1])
-        low_label = int(labels_low[i])
-        high_label = int(labels_high[i])
-
-        processed.append({
-            "name": d["name"],
-            "summary": d["summary"],
-            "full_text": d["full_text"],
-            "text_length": d["text_length"],
-            "x": x,
-            "y": y,
-            "low_cluster": low_label,
-            "high_cluster": high_label,
-            "low_cluster_name": cluster_names_low.get(
-                low_label,
-                f"Cluster {low_label}"
-            ),
-            "high_cluster_name": cluster_names_high.get(
-                high_label,
-                f"Category {high_label}"
-            ),
-        })
+    def documents():
+        # One at a time; the writer streams them to disk
+        for i, d in enumerate(data):
+            x, y = float(embeddings_2d[i, 0]), float(embeddings_2d[i, 1])
+            low_label = int(labels_low[i])
+            high_label = int(labels_high[i])
+
+            yield {
+                "name": d["name"],
+                "summary": d["summary"],
+                "full_text": d["full_text"],
+                "text_length": d["text_length"],
+                "x": x,
+                "y": y,
+                "low_cluster": low_label,
+                "high_cluster": high_label,
+                "low_cluster_name": cluster_names_low.get(
+                    low_label,
+                    f"Cluster {low_label}"
+                ),
+                "high_cluster_name": cluster_names_high.get(
+                    high_label,
+                    f"Category {high_label}"
+                ),
+            }
 
     # You can also include cluster name dictionaries at top-level if you want
-    output_obj = {
-        "documents": processed,
-        "meta": {
-            "n_documents": len(processed),
-            "cluster_names_low": cluster_names_low,
-            "cluster_names_high": cluster_names_high,
-        }
+    meta = {
+        "n_documents": len(data),
+        "cluster_names_low": cluster_names_low,
+        "cluster_names_high": cluster_names_high,
     }
 
-    with open(output_json, "w", encoding="utf-8") as f:
-        json.dump(output_obj, f, indent=2, ensure_ascii=False)
+    written = write_processed(output_json, documents(), meta, format=output_format)
+    save_case_table(written, documents, case_table)
+
+
+def save_case_table(written, documents, enabled):
+    """Columnar copy of the processed file, for readers that only need a few fields"""
+    if not enabled:
+        return
+    if not case_table_available():
+        print("  pyarrow is not installed; skipping the columnar case table")
+        return
+    print(f"  Saved columnar case table to {write_case_table(written, documents())}/")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Embed case summaries, cluster them and name the clusters")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND,
+                        help=f"LegalBERT inference backend (default: {DEFAULT_BACKEND})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="embedding processes; above 1, summaries are embedded in resumable shards")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE,
+                        help=f"summaries per shard with --workers (default: {SHARD_SIZE})")
+    parser.add_argument("--embed-source", choices=["summary", "full_text"], default="summary",
+                        help="embed the summaries, or the full opinion text in overlapping windows")
+    parser.add_argument("--pooling", choices=POOLINGS, default="mean",
+                        help="how full_text window vectors are combined (default: mean)")
+    parser.add_argument("--refit-umap", action="store_true",
+                        help="fit UMAP from scratch instead of projecting new cases onto the saved map")
+    parser.add_argument("--drift-threshold", type=float, default=DRIFT_THRESHOLD,
+                        help=f"refit once this share of cases was projected rather than fitted (default: {DRIFT_THRESHOLD})")
+    parser.add_argument("--knn-backend", choices=[*KNN_BACKENDS, "none"], default=DEFAULT_KNN_BACKEND,
+                        help=f"index for the cached kNN graph UMAP is fit on; none = UMAP builds its own (default: {DEFAULT_KNN_BACKEND})")
+    parser.add_argument("--cluster-space", choices=CLUSTER_SPACES, default=DEFAULT_CLUSTER_SPACE,
+                        help=f"features K-Means runs on; the map is always 2-D UMAP (default: {DEFAULT_CLUSTER_SPACE})")
+    parser.add_argument("--kmeans", choices=ALGORITHMS, default="auto",
+                        help="K-Means variant; auto switches to MiniBatchKMeans for large corpora")
+    parser.add_argument("--cold-start", action="store_true",
+                        help="do not warm-start K-Means from the previous run's clusters")
+    parser.add_argument("--output-format", choices=FORMATS, default="json",
+                        help=f"{OUTPUT_JSON} as one JSON object, or JSON Lines (.jsonl) with the meta in a sidecar")
+    parser.add_argument("--no-case-table", action="store_true",
+                        help="do not also write the columnar (Arrow/Parquet) copy of the output")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="report how many cases would be embedded, without loading any model")
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+
     print("\n[1/6] Loading data...")
     data = load_data(INPUT_FILE)
 
@@ -186,17 +232,59 @@ def main():
     # Extract summaries
     summaries = [d['summary'] for d in data]
 
-    # Load LegalBERT
-    print("\n[2/6] Loading LegalBERT model...")
-    tokenizer, model = load_legalbert_model()
+    # Open the embedding store
+    print("\n[2/6] Opening embedding store...")
+    if args.embed_source == "full_text":
+        # Kept apart from the summary vectors; window vectors are cached per document,
+        # so switching pooling only re-pools
+        store_dir = f"{STORE_DIR}-full_text"
+        store_model = f"{store_model_name(args.backend)}:{WINDOW}/{STRIDE}:{args.pooling}"
+    else:
+        store_dir, store_model = STORE_DIR, store_model_name(args.backend)
+    store = EmbeddingStore(store_dir, model=store_model)
+    print(f"  {len(store)} stored embeddings")
+
+    if args.dry_run:
+        missing = store.missing([case_key(d['name'], d[args.embed_source]) for d in data])
+        print(f"\nDry run: {len(data)} cases, {len(missing)} to embed from {args.embed_source} "
+              f"with {args.backend}, {len(data) - len(missing)} already stored")
+        return
 
-    # Generate embeddings FROM SUMMARIES
-    print("\n[3/6] Generating embeddings...")
-    embeddings = generate_embeddings(summaries, tokenizer, model)
+    def embed_missing(texts):
+        if args.embed_source == "full_text":
+            tokenizer, model = load_encoder(args.backend)
+            return embed_documents(texts, tokenizer, model, model_id=store_model_name(args.backend),
+                                   pooling=args.pooling)
+        if args.workers > 1:
+            return embed_sharded(texts, workers=args.workers, shard_size=args.shard_size, backend=args.backend)
+        # LegalBERT is only loaded when some summaries are new or edited;
+        # a fresh ONNX export is checked against PyTorch on a few of them
+        tokenizer, model = load_encoder(args.backend, validate_texts=texts[:32])
+        return embed_texts(texts, tokenizer, model)
+
+    # Generate embeddings FROM SUMMARIES (or full text)
+    print(f"\n[3/6] Generating embeddings from {args.embed_source}...")
+    embeddings = sync_embeddings(store, data, embed_missing, field=args.embed_source)
+    save_embeddings(EMBEDDINGS_FILE, embeddings, [d['name'] for d in data], source=args.embed_source)
 
     # Reduce dimensions
     print("\n[4/6] Reducing dimensions...")
-    embeddings_2d = reduce_dimensions(embeddings)
+    keys = [case_key(d['name'], d[args.embed_source]) for d in data]
+    knn = None
+    if args.knn_backend != "none":
+        # Cached kNN graph, only loaded or built when a UMAP is actually fit
+        knn = lambda: load_knn(keys, embeddings, n_neighbors=15, backend=args.knn_backend, space=store_model)
+    embeddings_2d = reduce_dimensions(
+        embeddings,
+        keys,
+        space=store_model,
+        refit=args.refit_umap,
+        drift_threshold=args.drift_threshold,
+        knn=knn
+    )
+    features = clustering_space(keys, embeddings, args.cluster_space, model=store_model, knn=knn)
+    if features is None:
+        features = embeddings_2d
 
     # Determine cluster counts based on dataset size
     n_docs = len(data)
@@ -205,23 +293,26 @@ def main():
 
     print(f"\nDataset size: {n_docs} documents")
     print(f"Using {n_clusters_low} fine-grained clusters and {n_clusters_high} high-level categories")
+    print(f"Clustering space: {args.cluster_space} ({features.shape[1]}-d)")
 
     # Cluster
     print("\n[5/6] Clustering...")
     labels_low, labels_high, _ = cluster_documents(
-        embeddings_2d,
+        features,
         n_clusters_low=n_clusters_low,
-        n_clusters_high=n_clusters_high
+        n_clusters_high=n_clusters_high,
+        keys=keys,
+        algorithm=args.kmeans,
+        warm_start=not args.cold_start
     )
 
     # Generate cluster names
     print("\n[6/6] Generating cluster names with OpenAI...")
-    with open("otherkey.txt") as f:
-        key = f.read().strip()
-    client = OpenAI(api_key=key)
+    client = get_client()
 
-    cluster_names_low = generate_cluster_names(summaries, labels_low, client, delay=1.0)
-    cluster_names_high = generate_cluster_names(summaries, labels_high, client, delay=1.0)
+    sampler = ClusterSampler(embeddings)
+    cluster_names_low = generate_cluster_names(summaries, labels_low, client, delay=1.0, sampler=sampler)
+    cluster_names_high = generate_cluster_names(summaries, labels_high, client, delay=1.0, sampler=sampler)
 
     # Save everything to JSON for later visualization
     print("\n" + "=" * 60)
@@ -233,8 +324,11 @@ def main():
         cluster_names_low,
         cluster_names_high,
         data,
-        OUTPUT_JSON
+        OUTPUT_JSON,
+        output_format=args.output_format,
+        case_table=not args.no_case_table
     )
+    prompt_usage.report()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
-import json
+import sys
+from pathlib import Path
 import numpy as np
-import pandas as pd
 import re
 
-import datamapplot
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.case_table import load_documents
+from common.processed_io import read_meta
 
 INPUT_JSON = "new_court_cases_processed.json"
 OUTPUT_HTML = "index.html" # FOR NOW 
@@ -12,11 +14,9 @@ OUTPUT_HTML = "index.html" # FOR NOW
 
 def load_processed_data(input_json):
     print(f"Loading processed data from {input_json}...")
-    with open(input_json, "r", encoding="utf-8") as f:
-        obj = json.load(f)
-
-    docs = obj["documents"]
-    meta = obj.get("meta", {})
+    # From the columnar case table when there is one; full_text is never shown, so it is not read
+    docs = load_documents(input_json, exclude=("full_text",))
+    meta = read_meta(input_json)
 
     print(f"  Loaded {len(docs)} documents")
     print(f"  Methodology: {meta.get('methodology', 'Unknown')}")
@@ -85,6 +85,10 @@ def extract_case_name(filename):
 
 
 def create_visualization(docs, meta, output_file):
+    # pandas and datamapplot take seconds to import; only this step needs them
+    import pandas as pd
+    import datamapplot
+
     print("\nCreating visualization...")
 
     # 2D coordinates from processed JSON
@@ -1,11 +1,8 @@
 #!/usr/bin/env python3
 import json
 import numpy as np
-import pandas as pd
 import re
 
-import datamapplot
-
 INPUT_JSON = "new_court_cases_processed.json"
 OUTPUT_HTML = "court_cases_visualization.html"
 
@@ -66,6 +63,10 @@ def extract_case_name(filename):
     return filename
 
 def create_visualization(docs, output_file):
+    # pandas and datamapplot take seconds to import; only this step needs them
+    import pandas as pd
+    import datamapplot
+
     print("\nCreating visualization...")
 
     # 2D coordinates
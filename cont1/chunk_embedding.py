@@ -0,0 +1,146 @@
+"""
+Document embeddings over the full opinion text instead of the summary.
+
+Each full_text is tokenized once and cut into overlapping windows of WINDOW
+tokens, advancing STRIDE tokens at a time. Windows from consecutive
+documents are streamed through the model in fixed-size batches, so only one
+batch plus the documents still in progress are held in memory, never every
+window of the corpus. A document's window vectors are pooled into one vector:
+
+  mean      - average of the windows
+  max       - element-wise maximum
+  attention - windows weighted by softmax(similarity to the document mean),
+              which plays down boilerplate windows that look unlike the rest
+
+The window vectors of every document are cached on disk (CHUNK_CACHE_DIR),
+keyed by text, model and window settings, so re-runs and switching pooling
+only read the cache.
+"""
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from embedding_engine import batch_runner, BATCH_SIZE, NUM_THREADS, MODEL_NAME
+
+CHUNK_CACHE_DIR = "chunk_cache"
+WINDOW = 510  # plus [CLS] and [SEP] = BERT's 512
+STRIDE = 384  # 126 tokens of overlap between neighbouring windows
+POOLINGS = ("mean", "max", "attention")
+
+
+def chunk_key(text, model_id, window, stride):
+    return hashlib.sha256(f"{model_id}:{window}:{stride}\0{text}".encode("utf-8")).hexdigest()
+
+
+def _cache_path(cache_dir, key):
+    return Path(cache_dir) / key[:2] / f"{key}.npy"
+
+
+def window_starts(n_tokens, window=WINDOW, stride=STRIDE):
+    """Start offsets of the windows covering n_tokens; the last window ends at the last token"""
+    if n_tokens <= window:
+        return [0]
+    starts = list(range(0, n_tokens - window, stride))
+    starts.append(n_tokens - window)
+    return starts
+
+
+def iter_windows(text, tokenizer, window=WINDOW, stride=STRIDE):
+    """Model inputs for each window of one document"""
+    ids = tokenizer(text or "", add_special_tokens=False, verbose=False)["input_ids"]
+    for start in window_starts(len(ids), window, stride):
+        yield tokenizer.prepare_for_model(ids[start:start + window], add_special_tokens=True, truncation=False)
+
+
+def pool(chunks, pooling="mean"):
+    """One vector from a (n_windows, dim) array of window vectors"""
+    if pooling == "mean":
+        return chunks.mean(axis=0)
+    if pooling == "max":
+        return chunks.max(axis=0)
+    if pooling == "attention":
+        mean = chunks.mean(axis=0)
+        norms = np.linalg.norm(chunks, axis=1) * (np.linalg.norm(mean) or 1.0)
+        scores = (chunks @ mean) / np.where(norms == 0, 1.0, norms)
+        # Cosine scores lie in [-1, 1]; sharpen them before the softmax
+        weights = np.exp((scores - scores.max()) * 10)
+        weights /= weights.sum()
+        return weights @ chunks
+    raise ValueError(f"Unknown pooling '{pooling}' (choose from {', '.join(POOLINGS)})")
+
+
+def embed_documents(texts, tokenizer, model, model_id=MODEL_NAME, pooling="mean",
+                    window=WINDOW, stride=STRIDE, batch_size=BATCH_SIZE, num_threads=NUM_THREADS,
+                    cache_dir=CHUNK_CACHE_DIR, progress_every=50):
+    """Pooled full-text embeddings for `texts`, a float32 array in input order"""
+    return_tensors, hidden_size, run_batch, context, threads = batch_runner(model, num_threads)
+    texts = list(texts)
+    embeddings = np.zeros((len(texts), hidden_size), dtype=np.float32)
+
+    keys = [chunk_key(text or "", model_id, window, stride) for text in texts]
+    todo = []
+    for i, key in enumerate(keys):
+        path = _cache_path(cache_dir, key)
+        if path.exists():
+            embeddings[i] = pool(np.load(path), pooling)
+        else:
+            todo.append(i)
+    print(f"  Full-text embeddings: {len(texts) - len(todo)} documents cached, {len(todo)} to embed "
+          f"({window}-token windows, stride {stride}, {pooling} pooling)")
+    if not todo:
+        return embeddings
+
+    start = time.perf_counter()
+    n_windows = 0
+    finished = 0
+    # Window vectors of documents whose windows are not all embedded yet
+    partial = {}
+    expected = {}
+    batch, owners = [], []
+
+    def finish(i):
+        nonlocal finished
+        chunks = np.stack(partial.pop(i))
+        del expected[i]
+        path = _cache_path(cache_dir, keys[i])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.stem}.tmp.npy")
+        np.save(tmp, chunks)
+        os.replace(tmp, path)
+        embeddings[i] = pool(chunks, pooling)
+        finished += 1
+        if progress_every and (finished % progress_every == 0 or finished == len(todo)):
+            elapsed = time.perf_counter() - start
+            print(f"  Embedded {finished}/{len(todo)} documents ({n_windows} windows, {elapsed:.0f}s)")
+
+    def flush():
+        nonlocal n_windows
+        inputs = tokenizer.pad(batch, padding=True, return_tensors=return_tensors)
+        n_windows += len(batch)
+        for owner, vector in zip(owners, run_batch(inputs)):
+            partial[owner].append(vector)
+            if len(partial[owner]) == expected[owner]:
+                finish(owner)
+        batch.clear()
+        owners.clear()
+
+    with context:
+        for i in todo:
+            windows = list(iter_windows(texts[i], tokenizer, window, stride))
+            partial[i] = []
+            expected[i] = len(windows)
+            for features in windows:
+                batch.append(features)
+                owners.append(i)
+                if len(batch) == batch_size:
+                    flush()
+        if batch:
+            flush()
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"  {len(todo)} documents / {n_windows} windows in {elapsed:.1f}s "
+          f"({n_windows / elapsed:.1f} windows/s, {threads} threads)")
+    return embeddings
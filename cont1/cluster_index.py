@@ -0,0 +1,79 @@
+"""
+Vectorized bookkeeping over cluster labels.
+
+ClusterIndex maps each label to its members' row indices with one stable
+argsort, split at the label boundaries, so gathering a cluster's summaries
+costs its own size rather than a scan over every document.
+
+ClusterNesting counts every (fine, coarse) label pair in one np.bincount
+pass: a contingency table of HDBSCAN subclusters (rows, noise first) by
+K-Means topics (columns). Sizes, noise counts, each subcluster's dominant
+topic and its purity are all read off that table, instead of one boolean
+mask over every document per cluster.
+"""
+import numpy as np
+
+
+class ClusterIndex:
+    def __init__(self, labels):
+        labels = np.asarray(labels)
+        # Stable, so members keep document order within each cluster
+        order = np.argsort(labels, kind="stable")
+        self.labels, starts = np.unique(labels[order], return_index=True)
+        self._members = dict(zip(self.labels.tolist(), np.split(order, starts[1:])))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def members(self, label):
+        """Row indices of `label`'s members, in document order"""
+        return self._members.get(int(label), np.zeros(0, dtype=np.intp))
+
+    def gather(self, items, label):
+        """items[i] for every member i of `label`"""
+        return [items[i] for i in self.members(label)]
+
+
+class ClusterNesting:
+    def __init__(self, coarse_labels, fine_labels):
+        """`fine_labels` may use -1 for noise; both are non-negative ints otherwise"""
+        coarse = np.asarray(coarse_labels, dtype=np.int64)
+        fine = np.asarray(fine_labels, dtype=np.int64)
+        n_coarse = int(coarse.max()) + 1 if len(coarse) else 0
+        n_rows = int(fine.max()) + 2 if len(fine) else 1
+
+        # Row 0 is noise, row f + 1 is fine cluster f
+        flat = (fine + 1) * n_coarse + coarse
+        self.table = np.bincount(flat, minlength=n_rows * n_coarse).reshape(n_rows, n_coarse)
+
+        fine_table = self.table[1:]
+        self.noise = self.table[0]
+        self.coarse_sizes = self.table.sum(axis=0)
+        self.fine_sizes = fine_table.sum(axis=1)
+        if n_coarse:
+            self.dominant = fine_table.argmax(axis=1)
+            dominant_count = fine_table.max(axis=1)
+        else:
+            self.dominant = np.zeros(len(fine_table), dtype=np.int64)
+            dominant_count = np.zeros(len(fine_table), dtype=np.int64)
+        self.purity = dominant_count / np.maximum(self.fine_sizes, 1)
+
+    @property
+    def fine_ids(self):
+        """Fine clusters with at least one member"""
+        return np.flatnonzero(self.fine_sizes)
+
+    @property
+    def n_noise(self):
+        return int(self.noise.sum())
+
+    def fine_to_coarse(self):
+        """{fine id: {'dominant_kmeans', 'purity', 'size'}}, as independent_clustering reports it"""
+        return {
+            int(f): {
+                'dominant_kmeans': int(self.dominant[f]),
+                'purity': float(self.purity[f]),
+                'size': int(self.fine_sizes[f])
+            }
+            for f in self.fine_ids
+        }
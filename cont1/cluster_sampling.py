@@ -0,0 +1,61 @@
+"""
+Which summaries of a cluster to show the model when naming or classifying it.
+
+centroid_diverse_order ranks a cluster's members by cosine similarity of their
+embedding to the cluster centroid, and skips any member nearly identical to
+one already picked, so k summaries cover the cluster's core without spending
+tokens on near-duplicates (the same case filed twice, template opinions).
+The result plugs into pack_items(order=...), which then fills its token
+budget from that ranking instead of the TF-IDF one.
+
+LegalBERT CLS vectors all point in much the same direction, so cosines are
+taken after subtracting the corpus mean (`center`); otherwise every pair
+looks like a near-duplicate.
+"""
+import numpy as np
+
+# Centered cosine above which a candidate adds nothing to what is already picked
+MAX_SIMILARITY = 0.92
+
+
+def _unit_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def centroid_diverse_order(embeddings, k=None, center=None, max_similarity=MAX_SIMILARITY):
+    """
+    Positions of the most representative rows of `embeddings` (one cluster's
+    members), nearest to the centroid first, at most k of them, none more
+    similar than max_similarity to an earlier pick.
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if len(vectors) == 0:
+        return []
+    if center is not None:
+        vectors = vectors - center
+    vectors = _unit_rows(vectors)
+    centroid = _unit_rows(vectors.mean(axis=0))
+
+    limit = len(vectors) if k is None else min(k, len(vectors))
+    picked = []
+    for i in np.argsort(-(vectors @ centroid), kind="stable"):
+        if picked and np.max(vectors[picked] @ vectors[i]) > max_similarity:
+            continue
+        picked.append(int(i))
+        if len(picked) == limit:
+            break
+    return picked
+
+
+class ClusterSampler:
+    """centroid_diverse_order over the members of any cluster of one embedding matrix"""
+
+    def __init__(self, embeddings, max_similarity=MAX_SIMILARITY):
+        self.embeddings = np.asarray(embeddings, dtype=np.float32)
+        self.center = self.embeddings.mean(axis=0)
+        self.max_similarity = max_similarity
+
+    def order(self, members, k=None):
+        """Positions within `members` (row indices of one cluster), best first"""
+        return centroid_diverse_order(self.embeddings[members], k, self.center, self.max_similarity)
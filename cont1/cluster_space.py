@@ -0,0 +1,92 @@
+"""
+The feature space K-Means and HDBSCAN run in, kept apart from the 2-D map.
+
+  umap2d - the 2-D UMAP map coordinates (what the clustering always used)
+  raw    - the embeddings themselves (768-d LegalBERT)
+  pca50  - PCA down to 50 dimensions
+  umap10 - a 10-d UMAP tuned for clustering (min_dist=0), fit on the cached
+           kNN graph when one is given
+
+pca50 and umap10 are computed once per corpus and embedding model and cached
+under SPACE_DIR, so re-clustering or changing the map does not redo them.
+
+    features = clustering_space(keys, embeddings, "pca50", model=store.model)
+    if features is None:
+        features = embeddings_2d
+"""
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+SPACE_DIR = "cluster_space"
+CLUSTER_SPACES = ("umap2d", "raw", "pca50", "umap10")
+DEFAULT_CLUSTER_SPACE = "umap2d"
+PCA_COMPONENTS = 50
+UMAP_COMPONENTS = 10
+
+
+def _space_prefix(space, model):
+    # The model name is hashed, since it may contain slashes
+    model_tag = hashlib.sha256(str(model).encode("utf-8")).hexdigest()[:8]
+    return f"{space}-{model_tag}-"
+
+
+def space_path(keys, space, model=None, cache_dir=SPACE_DIR):
+    digest = hashlib.sha256()
+    for key in keys:
+        digest.update(key.encode("utf-8") + b"\0")
+    return Path(cache_dir) / f"{_space_prefix(space, model)}{digest.hexdigest()[:16]}.npy"
+
+
+def project(embeddings, space, knn=None):
+    """Compute the `space` features of embeddings (no caching)"""
+    if space == "raw":
+        return np.asarray(embeddings, dtype=np.float32)
+    if space == "pca50":
+        from sklearn.decomposition import PCA
+
+        n_components = min(PCA_COMPONENTS, *embeddings.shape)
+        return PCA(n_components=n_components, random_state=42).fit_transform(embeddings).astype(np.float32)
+    if space == "umap10":
+        from umap import UMAP
+
+        params = dict(n_components=UMAP_COMPONENTS, random_state=42, n_neighbors=15, min_dist=0.0)
+        if knn is not None:
+            params["precomputed_knn"] = knn()
+        return UMAP(**params).fit_transform(embeddings).astype(np.float32)
+    raise ValueError(f"Unknown clustering space '{space}' (choose from {', '.join(CLUSTER_SPACES)})")
+
+
+def clustering_space(keys, embeddings, space=DEFAULT_CLUSTER_SPACE, model=None, knn=None, cache_dir=SPACE_DIR):
+    """
+    Features to cluster `embeddings` on, or None for umap2d (cluster on the
+    map coordinates). `knn` is an optional callable returning a precomputed
+    kNN graph for umap10.
+    """
+    if space == "umap2d":
+        return None
+    if space == "raw":
+        return project(embeddings, space)
+
+    keys = list(keys)
+    path = space_path(keys, space, model, cache_dir)
+    if path.exists():
+        features = np.load(path)
+        print(f"  Loaded {space} clustering features ({features.shape[1]}-d) from {path}")
+        return features
+
+    start = time.perf_counter()
+    features = project(embeddings, space, knn)
+    print(f"  Computed {space} clustering features ({features.shape[1]}-d) in {time.perf_counter() - start:.1f}s")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Features of earlier versions of the corpus for this model are never read again
+    for stale in path.parent.glob(f"{_space_prefix(space, model)}*.npy"):
+        stale.unlink()
+    tmp = path.with_name(f"{path.stem}.tmp.npy")
+    np.save(tmp, features)
+    os.replace(tmp, path)
+    return features
@@ -1,31 +1,34 @@
 #!/usr/bin/env python3
-import json
+import sys
 from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.case_table import load_columns
+from common.processed_io import read_meta
 
 INPUT_JSON = "../misc/new_court_cases_processed.json"
 
 
 def load_documents(input_json):
     print(f"Loading processed data from {input_json}...")
-    with open(input_json, "r", encoding="utf-8") as f:
-        obj = json.load(f)
-
-    docs = obj["documents"]
-    meta = obj.get("meta", {})
-    print(f"  Loaded {len(docs)} documents")
-    return docs, meta
+    # Only the category column is read
+    categories = load_columns(input_json, ["legal_category_name"])["legal_category_name"]
+    meta = read_meta(input_json)
+    print(f"  Loaded {len(categories)} documents")
+    return categories, meta
 
 
-def count_categories(docs):
+def count_categories(categories):
     # Count by numeric ID and by human-readable name
-    counts_by_name = Counter(d.get("legal_category_name", "Unknown") for d in docs)
+    counts_by_name = Counter(name if name is not None else "Unknown" for name in categories)
 
     return counts_by_name
 
 
 def main():
-    docs, meta = load_documents(INPUT_JSON)
-    counts_by_name = count_categories(docs)
+    categories, meta = load_documents(INPUT_JSON)
+    counts_by_name = count_categories(categories)
 
     # Optional: pull canonical category names from meta if present
     legal_categories_meta = meta.get("legal_categories", {})
@@ -0,0 +1,96 @@
+"""
+Sharded multi-process embedding for large backfills.
+
+The texts to embed are split into fixed-size shards; N worker processes each
+load the model once and write one `embeddings.shard-XXXX.npy` per shard. The
+shards are then merged back in input order. Shards are written atomically
+into a directory named after a hash of the texts, so re-running the same job
+after a crash only embeds the shards that are still missing.
+
+    embeddings = embed_sharded(summaries, workers=4, backend="onnx-int8")
+"""
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+
+from embedding_engine import load_encoder, embed_texts, BATCH_SIZE, DEFAULT_BACKEND
+
+SHARD_DIR = "embedding_shards"
+SHARD_SIZE = 500
+
+# Set in each worker process by _init_worker
+_encoder = None
+
+
+def job_dir(texts, shard_size, backend, shard_dir=SHARD_DIR):
+    digest = hashlib.sha256()
+    digest.update(f"{backend}:{shard_size}\0".encode("utf-8"))
+    for text in texts:
+        digest.update(text.encode("utf-8") + b"\0")
+    return Path(shard_dir) / digest.hexdigest()[:16]
+
+
+def shard_path(directory, shard):
+    return Path(directory) / f"embeddings.shard-{shard:04d}.npy"
+
+
+def _init_worker(backend, num_threads):
+    global _encoder
+    _encoder = load_encoder(backend, num_threads=num_threads)
+
+
+def _embed_shard(shard, texts, path, batch_size, num_threads):
+    tokenizer, model = _encoder
+    embeddings = embed_texts(texts, tokenizer, model, batch_size=batch_size,
+                             num_threads=num_threads, progress_every=0)
+    # np.save appends .npy to names without it, so the temp name keeps the suffix
+    tmp = path.with_name(f"{path.stem}.tmp.npy")
+    np.save(tmp, embeddings)
+    os.replace(tmp, path)
+    return shard
+
+
+def embed_sharded(texts, workers=2, shard_size=SHARD_SIZE, backend=DEFAULT_BACKEND,
+                  batch_size=BATCH_SIZE, threads_per_worker=None, shard_dir=SHARD_DIR):
+    """Embed `texts` across `workers` processes; returns a float32 array in input order"""
+    texts = list(texts)
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    directory = job_dir(texts, shard_size, backend, shard_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    shards = list(range((len(texts) + shard_size - 1) // shard_size))
+    pending = [s for s in shards if not shard_path(directory, s).exists()]
+    print(f"  {len(shards)} shards of up to {shard_size}: {len(shards) - len(pending)} done, "
+          f"{len(pending)} to embed on {workers} workers")
+
+    if pending:
+        if threads_per_worker is None:
+            # Split the cores between workers instead of oversubscribing them
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        if backend != "torch":
+            # Export/validate the ONNX model once here, not concurrently in every worker
+            load_encoder(backend, validate_texts=texts[:32])
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending)), mp_context=get_context("spawn"),
+                                 initializer=_init_worker, initargs=(backend, threads_per_worker)) as pool:
+            futures = [
+                pool.submit(_embed_shard, s, texts[s * shard_size:(s + 1) * shard_size],
+                            shard_path(directory, s), batch_size, threads_per_worker)
+                for s in pending
+            ]
+            for done, future in enumerate(as_completed(futures), 1):
+                shard = future.result()
+                elapsed = time.perf_counter() - start
+                print(f"  Shard {shard:04d} done [{done}/{len(pending)}, {elapsed:.0f}s]")
+
+    embeddings = np.concatenate([np.load(shard_path(directory, s)) for s in shards])
+    shutil.rmtree(directory)
+    return embeddings
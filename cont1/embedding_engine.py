@@ -0,0 +1,139 @@
+"""
+Batched LegalBERT embeddings on CPU.
+
+Summaries are tokenized once, sorted by token length and run through the
+model in batches padded only to the longest summary in each batch, so little
+work is spent on padding while every core is kept busy. The CLS vector of
+each summary is returned in the original order.
+
+    tokenizer, model = load_legalbert_model()
+    embeddings = embed_texts(summaries, tokenizer, model, batch_size=32)
+    save_embeddings("embeddings.npz", embeddings, names)
+
+Padding positions are masked out, so each vector matches the one-at-a-time
+loop up to float rounding (batched matmuls sum in a different order);
+batch_size=1 reproduces it exactly.
+
+The forward pass runs on PyTorch or, with backend "onnx" / "onnx-int8", on
+ONNX Runtime (see embedding_onnx); load_encoder picks between them.
+"""
+import contextlib
+import os
+import time
+
+import numpy as np
+
+from embedding_onnx import OnnxEncoder, load_onnx_encoder
+
+MODEL_NAME = "nlpaueb/legal-bert-base-uncased"
+MAX_LENGTH = 512
+BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "16"))
+
+# Intra-op threads for torch / ONNX Runtime; 0 keeps the default (one per physical core)
+NUM_THREADS = int(os.getenv("EMBED_THREADS", "0"))
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+
+
+def load_legalbert_model(model_name=MODEL_NAME):
+    """Load LegalBERT model and tokenizer"""
+    from transformers import AutoTokenizer, AutoModel
+
+    print("\nLoading LegalBERT model...")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    return tokenizer, model
+
+
+def load_encoder(backend=DEFAULT_BACKEND, model_name=MODEL_NAME, num_threads=NUM_THREADS, validate_texts=None):
+    """
+    (tokenizer, model) for embed_texts. For the ONNX backends the model is an
+    OnnxEncoder, exported on first use and checked against PyTorch on
+    validate_texts.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    if backend == "torch":
+        return load_legalbert_model(model_name)
+
+    from transformers import AutoTokenizer
+
+    print(f"\nLoading LegalBERT ({backend}) with ONNX Runtime...")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    encoder = load_onnx_encoder(model_name, tokenizer, quantized=backend == "onnx-int8",
+                                num_threads=num_threads, validate_texts=validate_texts)
+    return tokenizer, encoder
+
+
+def store_model_name(backend=DEFAULT_BACKEND, model_name=MODEL_NAME):
+    """Name vectors are stored under; backends are kept apart since their vectors differ slightly"""
+    return model_name if backend == "torch" else f"{model_name}:{backend}"
+
+
+def batch_runner(model, num_threads=NUM_THREADS, device="cpu"):
+    """
+    How to run padded batches through `model` (a transformers model or an
+    OnnxEncoder): returns (return_tensors for tokenizer.pad, hidden size,
+    run_batch(inputs) -> CLS vectors, context manager to run under, thread label).
+    """
+    if isinstance(model, OnnxEncoder):
+        return "np", model.hidden_size, model.cls, contextlib.nullcontext(), f"{num_threads or 'default'} ONNX Runtime"
+
+    import torch
+
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    device = torch.device(device)
+    model.to(device)
+    model.eval()
+
+    def run_batch(inputs):
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+        outputs = model(**inputs)
+        return outputs.last_hidden_state[:, 0, :].float().cpu().numpy()
+
+    return "pt", model.config.hidden_size, run_batch, torch.inference_mode(), f"{torch.get_num_threads()} torch"
+
+
+def embed_texts(texts, tokenizer, model, batch_size=BATCH_SIZE, num_threads=NUM_THREADS,
+                device="cpu", max_length=MAX_LENGTH, progress_every=10):
+    """
+    CLS embeddings for `texts` as a float32 array of shape (len(texts), hidden size).
+    `model` is a transformers model or an OnnxEncoder (whose threads are set when it is built).
+    """
+    return_tensors, hidden_size, run_batch, context, threads = batch_runner(model, num_threads, device)
+
+    start = time.perf_counter()
+    # Tokenize everything up front, unpadded, to sort by length
+    encoded = tokenizer(list(texts), truncation=True, max_length=max_length)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    order = np.argsort(lengths, kind="stable")
+
+    embeddings = np.zeros((len(texts), hidden_size), dtype=np.float32)
+    n_batches = (len(order) + batch_size - 1) // batch_size
+    with context:
+        for b, first in enumerate(range(0, len(order), batch_size)):
+            batch_idx = order[first:first + batch_size]
+            features = [{k: encoded[k][i] for k in encoded.keys()} for i in batch_idx]
+            inputs = tokenizer.pad(features, padding=True, return_tensors=return_tensors)
+            embeddings[batch_idx] = run_batch(inputs)
+
+            if progress_every and ((b + 1) % progress_every == 0 or b + 1 == n_batches):
+                print(f"  Embedded {min(first + batch_size, len(order))}/{len(order)} summaries")
+
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"  {len(texts)} embeddings in {elapsed:.1f}s ({len(texts) / elapsed:.1f} docs/s, "
+          f"batch size {batch_size}, {threads} threads)")
+    return embeddings
+
+
+def save_embeddings(path, embeddings, names=None, source=None):
+    """Write the embeddings.npz that 2_5_testing.py loads; `source` is the text field embedded"""
+    arrays = {"embeddings": np.asarray(embeddings, dtype=np.float32)}
+    if names is not None:
+        arrays["names"] = np.asarray(names, dtype=str)
+    if source is not None:
+        arrays["source"] = np.asarray(source, dtype=str)
+    np.savez(path, **arrays)
+    print(f"Saved {len(embeddings)} embeddings to {path}")
@@ -0,0 +1,126 @@
+"""
+ONNX Runtime backend for the LegalBERT embeddings.
+
+On first use the PyTorch model is exported to ONNX (dynamic batch and
+sequence axes) and, for the int8 backend, dynamically quantized; the files
+are kept under ONNX_DIR and reused afterwards. OnnxEncoder runs them with
+ONNX Runtime on CPU and plugs into embedding_engine.embed_texts in place of
+the PyTorch model.
+
+Quantization changes the vectors slightly, so every fresh export is checked
+against the PyTorch CLS vectors and rejected if the cosine similarity of any
+sample drops below MIN_COSINE.
+"""
+import os
+from pathlib import Path
+
+import numpy as np
+
+ONNX_DIR = os.getenv("EMBED_ONNX_DIR", "onnx_models")
+MIN_COSINE = float(os.getenv("EMBED_MIN_COSINE", "0.99"))
+OPSET = 17
+
+_INPUTS = ["input_ids", "attention_mask", "token_type_ids"]
+
+
+def onnx_path(model_name, quantized, onnx_dir=ONNX_DIR):
+    stem = model_name.replace("/", "__")
+    return Path(onnx_dir) / f"{stem}{'.int8' if quantized else ''}.onnx"
+
+
+def export_onnx(tokenizer, model, path):
+    """Export a transformers BERT model to ONNX, returning last_hidden_state"""
+    import torch
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    model.eval()
+    model.config.return_dict = False
+    sample = tokenizer(["The court granted the motion to dismiss."], return_tensors="pt")
+    axes = {0: "batch", 1: "sequence"}
+    with torch.inference_mode():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in _INPUTS),
+            str(path),
+            input_names=_INPUTS,
+            output_names=["last_hidden_state", "pooler_output"],
+            dynamic_axes={**{name: axes for name in _INPUTS}, "last_hidden_state": axes, "pooler_output": {0: "batch"}},
+            opset_version=OPSET,
+            do_constant_folding=True,
+        )
+    model.config.return_dict = True
+    return path
+
+
+def quantize_int8(fp32_path, int8_path):
+    """Dynamic int8 quantization of the weights (activations stay float)"""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+    return Path(int8_path)
+
+
+class OnnxEncoder:
+    """Runs an exported BERT with ONNX Runtime; embed_texts treats it like the torch model"""
+
+    def __init__(self, path, num_threads=0):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = num_threads  # 0 = one per physical core
+        options.inter_op_num_threads = 1
+        self.path = Path(path)
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.hidden_size = self.session.get_outputs()[0].shape[-1]
+
+    def cls(self, inputs):
+        """CLS vectors for one padded batch of numpy inputs"""
+        feed = {name: np.asarray(inputs[name], dtype=np.int64) for name in self.input_names}
+        last_hidden_state = self.session.run(["last_hidden_state"], feed)[0]
+        return last_hidden_state[:, 0, :].astype(np.float32)
+
+
+def cosine_rows(a, b):
+    return np.sum(a * b, axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+
+
+def check_quality(reference, embeddings, min_cosine=MIN_COSINE):
+    """Raise if any vector drifted further than min_cosine from the PyTorch one"""
+    cosine = cosine_rows(reference, embeddings)
+    worst = float(np.min(cosine))
+    print(f"  ONNX vs PyTorch cosine: min {worst:.5f}, mean {float(np.mean(cosine)):.5f}")
+    if worst < min_cosine:
+        raise ValueError(f"ONNX embeddings drift too far from PyTorch (min cosine {worst:.5f} < {min_cosine})")
+    return worst
+
+
+def load_onnx_encoder(model_name, tokenizer, quantized=True, num_threads=0, validate_texts=None, onnx_dir=ONNX_DIR):
+    """
+    OnnxEncoder for model_name, exporting (and quantizing) it first if needed.
+    A fresh export is validated on validate_texts against PyTorch.
+    """
+    path = onnx_path(model_name, quantized, onnx_dir)
+    if path.exists():
+        return OnnxEncoder(path, num_threads)
+
+    from transformers import AutoModel
+    from embedding_engine import embed_texts
+
+    print(f"  Exporting {model_name} to ONNX{' (int8)' if quantized else ''}...")
+    model = AutoModel.from_pretrained(model_name)
+    fp32_path = export_onnx(tokenizer, model, onnx_path(model_name, False, onnx_dir))
+    if quantized:
+        quantize_int8(fp32_path, path)
+
+    encoder = OnnxEncoder(path, num_threads)
+    if validate_texts:
+        reference = embed_texts(validate_texts, tokenizer, model, progress_every=0)
+        try:
+            check_quality(reference, embed_texts(validate_texts, tokenizer, encoder, progress_every=0))
+        except ValueError:
+            path.unlink()
+            raise
+    return encoder
@@ -0,0 +1,150 @@
+"""
+Persistent, incremental store of summary embeddings.
+
+Vectors are keyed by a hash of case name + summary, so an unchanged case is
+never embedded twice and an edited summary gets a fresh vector. On disk the
+store is a directory with
+
+  vectors.f32  - raw float32 rows, appended to and read through np.memmap
+  index.json   - model name, dimension and the key of every row, in row order
+
+New rows are appended and the index is rewritten atomically afterwards, so
+an interrupted run leaves at worst some unreferenced rows at the end of
+vectors.f32, which are cut off on the next open. Rows of cases that left the
+corpus are removed by compact().
+
+    store = EmbeddingStore("embedding_store", model=MODEL_NAME)
+    embeddings = sync_embeddings(store, data, lambda texts: embed_texts(texts, tokenizer, model))
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+STORE_DIR = "embedding_store"
+
+
+def case_key(name, summary):
+    return hashlib.sha256(f"{name}\0{summary}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, directory=STORE_DIR, model=None):
+        self.directory = Path(directory)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.index_path = self.directory / "index.json"
+
+        index = {}
+        if self.index_path.exists():
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        if model is not None and index.get("model") not in (None, model):
+            # Vectors from a different model are not comparable; start over
+            print(f"  Embedding store was built with {index['model']}, rebuilding for {model}")
+            index = {}
+
+        self.model = model or index.get("model")
+        self.dim = index.get("dim")
+        self.keys = index.get("keys", [])
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+        self._truncate_to_index()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.rows
+
+    def _truncate_to_index(self):
+        size = self.vectors_path.stat().st_size if self.vectors_path.exists() else 0
+        expected = len(self.keys) * (self.dim or 0) * 4
+        if size < expected:
+            # Vectors were replaced but the index was not (crash mid-compaction)
+            print("  Embedding store index does not match its vectors, rebuilding")
+            self.keys, self.rows = [], {}
+            expected = 0
+        if size > expected:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(expected)
+
+    def _matrix(self):
+        if not self.keys:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self.keys), self.dim))
+
+    def _write_index(self):
+        tmp = self.index_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"model": self.model, "dim": self.dim, "keys": self.keys}), encoding="utf-8")
+        os.replace(tmp, self.index_path)
+
+    def missing(self, keys):
+        """Keys not in the store, first occurrence order, without duplicates"""
+        return list(dict.fromkeys(k for k in keys if k not in self.rows))
+
+    def get(self, keys):
+        """Vectors for `keys` in the order given, as an in-memory float32 array"""
+        rows = [self.rows[k] for k in keys]
+        return np.asarray(self._matrix()[rows], dtype=np.float32)
+
+    def add(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if len(keys) != len(vectors):
+            raise ValueError(f"{len(keys)} keys for {len(vectors)} vectors")
+        if not len(keys):
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Store holds {self.dim}-d vectors, got {vectors.shape[1]}-d")
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.vectors_path, "ab") as f:
+            f.write(vectors.tobytes())
+        for key in keys:
+            self.rows[key] = len(self.keys)
+            self.keys.append(key)
+        self._write_index()
+
+    def compact(self, keep_keys):
+        """Drop every row whose key is not in keep_keys. Returns the number removed."""
+        keep_keys = set(keep_keys)
+        keep = [k for k in self.keys if k in keep_keys]
+        removed = len(self.keys) - len(keep)
+        if not removed:
+            return 0
+
+        vectors = self.get(keep)
+        tmp = self.vectors_path.with_suffix(".f32.tmp")
+        with open(tmp, "wb") as f:
+            f.write(vectors.tobytes())
+        # Rows are written before the index, so a crash between the two
+        # replaces is caught by the size check on the next open
+        os.replace(tmp, self.vectors_path)
+        self.keys = keep
+        self.rows = {key: row for row, key in enumerate(keep)}
+        self._write_index()
+        return removed
+
+
+def sync_embeddings(store, data, embed_fn, compact=True, field="summary"):
+    """
+    Embeddings for every case in `data` (dicts with 'name' and `field`),
+    in data order. Only cases missing from the store are passed to
+    embed_fn(list of texts); with compact=True, rows of cases no longer
+    in `data` are dropped afterwards.
+    """
+    keys = [case_key(d['name'], d[field]) for d in data]
+    missing = store.missing(keys)
+    print(f"  Embedding store: {len(keys) - len(missing)} cached, {len(missing)} to embed")
+
+    if missing:
+        text_by_key = {key: d[field] for key, d in zip(keys, data)}
+        store.add(missing, embed_fn([text_by_key[key] for key in missing]))
+
+    if compact:
+        removed = store.compact(keys)
+        if removed:
+            print(f"  Removed {removed} embeddings of cases no longer in the corpus")
+
+    return store.get(keys)
@@ -0,0 +1,104 @@
+"""
+Persistent cache for step 1 (download -> extract -> summarize).
+
+Rows are keyed by Drive file_id and carry the file's content hash plus the
+extraction settings used, so a re-run only touches PDFs that are new, were
+modified, or were extracted with different settings. Summaries are stored
+next to the extracted text so unchanged cases never hit OpenAI again.
+"""
+import json
+import sqlite3
+import time
+
+CACHE_FILE = "ingest_cache.sqlite"
+
+
+class IngestCache:
+    def __init__(self, path=CACHE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS cases (
+                file_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                name TEXT NOT NULL,
+                text TEXT NOT NULL,
+                total_pages INTEGER NOT NULL,
+                extracted_pages INTEGER NOT NULL,
+                page_indices TEXT,
+                summary TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+        # Databases from before page_indices was recorded
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(cases)")}
+        if 'page_indices' not in columns:
+            self.conn.execute("ALTER TABLE cases ADD COLUMN page_indices TEXT")
+        self.conn.commit()
+
+    def get(self, file_id, content_hash, settings):
+        """Return the cached document for this exact file version, or None"""
+        row = self.conn.execute(
+            "SELECT * FROM cases WHERE file_id = ? AND content_hash = ? AND settings = ?",
+            (file_id, content_hash, settings)
+        ).fetchone()
+        # Rows without page indices predate them and are extracted again
+        if row is None or row['page_indices'] is None:
+            return None
+        return {
+            'name': row['name'],
+            'text': row['text'],
+            'file_id': row['file_id'],
+            'total_pages': row['total_pages'],
+            'extracted_pages': json.loads(row['page_indices']),
+            'summary': row['summary'],
+        }
+
+    def put_extraction(self, doc, content_hash, settings):
+        """
+        Store freshly extracted text. A cached summary survives only if the
+        text is exactly what it was generated from; returns that summary or None.
+        """
+        row = self.conn.execute(
+            "SELECT text, summary FROM cases WHERE file_id = ?", (doc['file_id'],)
+        ).fetchone()
+        summary = row['summary'] if row is not None and row['text'] == doc['text'] else None
+        self.conn.execute(
+            """INSERT OR REPLACE INTO cases
+               (file_id, content_hash, settings, name, text, total_pages, extracted_pages,
+                page_indices, summary, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (doc['file_id'], content_hash, settings, doc['name'], doc['text'],
+             doc['total_pages'], len(doc['extracted_pages']), json.dumps(doc['extracted_pages']),
+             summary, time.time())
+        )
+        self.conn.commit()
+        return summary
+
+    def put_summary(self, file_id, summary):
+        self.conn.execute(
+            "UPDATE cases SET summary = ?, updated_at = ? WHERE file_id = ?",
+            (summary, time.time(), file_id)
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def plan_ingest(files, cache, settings):
+    """
+    Split the folder listing into documents already in the cache and files
+    that still need downloading. Returns (cached {file_id: doc}, pending files).
+    """
+    cached = {}
+    pending = []
+    for file in files:
+        doc = cache.get(file['id'], file.get('md5Checksum', ''), settings)
+        if doc is None:
+            pending.append(file)
+        else:
+            cached[file['id']] = doc
+    return cached, pending
@@ -0,0 +1,116 @@
+"""
+k-nearest-neighbour graph over the case embeddings, built by an ANN index
+and cached on disk so UMAP does not rebuild it inside every fit.
+
+Backends:
+
+  pynndescent - NN-descent, what UMAP runs internally; the index is kept, so a
+                reducer fitted on the graph can still transform new cases
+  hnswlib     - HNSW, quicker to build on large corpora; a reducer fitted on
+                it cannot transform, so new cases mean a refit
+  exact       - brute force with sklearn, for small corpora and recall checks
+
+The graph is returned as (indices, distances, search_index), the tuple UMAP
+takes as `precomputed_knn`, and cached under KNN_DIR keyed by the case keys,
+embedding space (model), k, metric and backend:
+
+    knn = load_knn(keys, embeddings, space=store.model)
+    UMAP(n_neighbors=15, precomputed_knn=knn).fit_transform(embeddings)
+"""
+import hashlib
+import os
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+
+KNN_DIR = "knn_cache"
+KNN_BACKENDS = ("pynndescent", "hnswlib", "exact")
+DEFAULT_KNN_BACKEND = "pynndescent"
+N_NEIGHBORS = 15
+METRIC = "euclidean"
+
+
+def _knn_prefix(n_neighbors, metric, backend, space):
+    # The space (usually a model name) is hashed, since it may contain slashes
+    space_tag = hashlib.sha256(str(space).encode("utf-8")).hexdigest()[:8]
+    return f"{backend}-{metric}-k{n_neighbors}-{space_tag}-"
+
+
+def knn_path(keys, n_neighbors, metric, backend, space=None, cache_dir=KNN_DIR):
+    digest = hashlib.sha256()
+    for key in keys:
+        digest.update(key.encode("utf-8") + b"\0")
+    return Path(cache_dir) / f"{_knn_prefix(n_neighbors, metric, backend, space)}{digest.hexdigest()[:16]}.npz"
+
+
+def build_knn(embeddings, n_neighbors=N_NEIGHBORS, metric=METRIC, backend=DEFAULT_KNN_BACKEND, num_threads=-1):
+    """(indices, distances, search_index) of each row's n_neighbors nearest rows, itself included"""
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if backend == "pynndescent":
+        from pynndescent import NNDescent
+
+        index = NNDescent(embeddings, n_neighbors=n_neighbors, metric=metric, n_jobs=num_threads, low_memory=True)
+        indices, distances = index.neighbor_graph
+        return indices, distances, index
+
+    if backend == "hnswlib":
+        import hnswlib
+
+        if metric not in ("euclidean", "cosine"):
+            raise ValueError(f"hnswlib supports euclidean and cosine, not '{metric}'")
+        index = hnswlib.Index(space="l2" if metric == "euclidean" else "cosine", dim=embeddings.shape[1])
+        index.init_index(max_elements=len(embeddings), ef_construction=200, M=16)
+        index.add_items(embeddings, np.arange(len(embeddings)), num_threads=num_threads)
+        index.set_ef(max(2 * n_neighbors, 64))
+        indices, distances = index.knn_query(embeddings, k=n_neighbors, num_threads=num_threads)
+        if metric == "euclidean":
+            # hnswlib reports squared L2
+            distances = np.sqrt(np.maximum(distances, 0))
+        return indices.astype(np.int32), distances.astype(np.float32), None
+
+    if backend == "exact":
+        from sklearn.neighbors import NearestNeighbors
+
+        nn = NearestNeighbors(n_neighbors=n_neighbors, metric=metric, n_jobs=num_threads).fit(embeddings)
+        distances, indices = nn.kneighbors(embeddings)
+        return indices.astype(np.int32), distances.astype(np.float32), None
+
+    raise ValueError(f"Unknown kNN backend '{backend}' (choose from {', '.join(KNN_BACKENDS)})")
+
+
+def load_knn(keys, embeddings, n_neighbors=N_NEIGHBORS, metric=METRIC, backend=DEFAULT_KNN_BACKEND,
+             space=None, cache_dir=KNN_DIR):
+    """The cached kNN graph of these cases, built and saved on a miss"""
+    keys = list(keys)
+    path = knn_path(keys, n_neighbors, metric, backend, space, cache_dir)
+    index_path = path.with_suffix(".index.pkl")
+    if path.exists() and (backend != "pynndescent" or index_path.exists()):
+        with np.load(path) as npz:
+            indices, distances = npz["indices"], npz["distances"]
+        search_index = None
+        if backend == "pynndescent":
+            with open(index_path, "rb") as f:
+                search_index = pickle.load(f)
+        print(f"  Loaded {n_neighbors}-NN graph of {len(keys)} cases from {path}")
+        return indices, distances, search_index
+
+    start = time.perf_counter()
+    indices, distances, search_index = build_knn(embeddings, n_neighbors, metric, backend)
+    print(f"  Built {n_neighbors}-NN graph of {len(keys)} cases with {backend} in {time.perf_counter() - start:.1f}s")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Graphs of earlier versions of the corpus in this space are never read again
+    for stale in path.parent.glob(f"{_knn_prefix(n_neighbors, metric, backend, space)}*"):
+        stale.unlink()
+    if search_index is not None:
+        tmp = index_path.with_name(f"{index_path.name}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(search_index, f)
+        os.replace(tmp, index_path)
+    # np.savez appends .npz to names without it, so the temp name keeps the suffix
+    tmp = path.with_name(f"{path.stem}.tmp.npz")
+    np.savez(tmp, indices=indices, distances=distances)
+    os.replace(tmp, path)
+    return indices, distances, search_index
@@ -0,0 +1,92 @@
+"""
+Score-based page selection for long opinions.
+
+Instead of always taking the first MAX_PAGES and last LAST_PAGES pages, every
+page is scored by how much of it looks like substance (section headings such
+as BACKGROUND / ANALYSIS / CONCLUSION, holding language, "IT IS ORDERED")
+versus boilerplate (certificates of service, tables of contents, counsel
+listings). The caption page(s) and the final page are always kept; the rest
+are added best-first until the token budget is spent, then put back in
+document order.
+"""
+import re
+
+# Rough size of a token in English legal text, good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+# Always kept: caption/syllabus at the front, decision and orders at the end
+KEEP_FIRST = 2
+KEEP_LAST = 1
+
+# Headings that open the parts of an opinion the summaries are built from
+HEADING_PATTERN = re.compile(
+    r"^\s*(?:[IVX]+\.|[A-H]\.|\d+\.)?\s*"
+    r"(BACKGROUND|FACTUAL BACKGROUND|PROCEDURAL (?:HISTORY|BACKGROUND)|FACTS|STATEMENT OF (?:THE )?FACTS|"
+    r"DISCUSSION|ANALYSIS|STANDARD OF REVIEW|LEGAL STANDARDS?|HOLDING|CONCLUSION|DISPOSITION|"
+    r"OPINION|MEMORANDUM (?:OPINION|AND ORDER))\b",
+    re.MULTILINE
+)
+
+# Phrases that carry the outcome or the court's reasoning
+KEYWORD_PATTERN = re.compile(
+    r"\b(?:(?:it is (?:hereby )?)?ordered|we hold|we conclude|the court (?:holds|finds|concludes)|"
+    r"affirm(?:ed)?|revers(?:e|ed)|remand(?:ed)?|vacate(?:d)?|dismiss(?:ed)?|grant(?:ed)?|den(?:y|ied)|"
+    r"summary judgment|motion to dismiss|injunction|damages|liab(?:le|ility)|"
+    r"artificial intelligence|algorithm\w*|machine learning|automated|software)\b",
+    re.IGNORECASE
+)
+
+# Pages dominated by these are rarely worth sending to the model
+BOILERPLATE_PATTERN = re.compile(
+    r"\b(?:certificate of service|table of (?:contents|authorities)|counsel for|attorneys? for|"
+    r"index of exhibits|appendix|on the briefs|oral argument)\b",
+    re.IGNORECASE
+)
+
+
+def estimate_page_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def score_page(text):
+    """Substance per 1000 characters: headings count triple, boilerplate counts against"""
+    if not text.strip():
+        return 0.0
+    headings = len(HEADING_PATTERN.findall(text.upper()))
+    keywords = len(KEYWORD_PATTERN.findall(text))
+    boilerplate = len(BOILERPLATE_PATTERN.findall(text))
+    return (3 * headings + keywords - 2 * boilerplate) * 1000 / max(len(text), 1000)
+
+
+def select_scored_pages(page_texts, token_budget, keep_first=KEEP_FIRST, keep_last=KEEP_LAST):
+    """
+    Pick page indices under `token_budget` (estimated tokens), best-scoring
+    first; pages with no substance signal are left out even if they would
+    fit. Returns (sorted page indices, estimated tokens used).
+    """
+    total_pages = len(page_texts)
+    tokens = [estimate_page_tokens(t) for t in page_texts]
+    if sum(tokens) <= token_budget:
+        # Short enough to send whole
+        return list(range(total_pages)), sum(tokens)
+
+    forced = sorted(set(range(min(keep_first, total_pages))) |
+                    set(range(max(total_pages - keep_last, 0), total_pages)))
+    chosen = set(forced)
+    used = sum(tokens[i] for i in forced)
+
+    # Ties go to the earlier page, which usually sets up the facts
+    scores = [score_page(t) for t in page_texts]
+    candidates = sorted(
+        (i for i in range(total_pages) if i not in chosen),
+        key=lambda i: (-scores[i], i)
+    )
+    for i in candidates:
+        if scores[i] <= 0:
+            break
+        if used + tokens[i] > token_budget:
+            continue
+        chosen.add(i)
+        used += tokens[i]
+
+    return sorted(chosen), used
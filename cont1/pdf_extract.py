@@ -0,0 +1,94 @@
+"""
+Pluggable PDF text extraction backends.
+
+Every backend opens PDF bytes and returns the text of a list of page indices,
+which callers join once (no repeated string concatenation).
+
+  pypdf2   - pure Python PyPDF2, the original extraction path
+  pdfium   - pypdfium2 (Google's PDFium), typically an order of magnitude faster
+  pdfminer - pdfminer.six, slower than pdfium but keeps a sensible reading
+             order on multi-column layouts
+
+pdfium and pdfminer are optional; pick one with --pdf-backend.
+"""
+import io
+
+BACKENDS = ("pypdf2", "pdfium", "pdfminer")
+DEFAULT_BACKEND = "pypdf2"
+
+
+class PyPDF2Document:
+    def __init__(self, data):
+        import PyPDF2
+        self.reader = PyPDF2.PdfReader(io.BytesIO(data))
+        self.page_count = len(self.reader.pages)
+
+    def extract(self, page_indices):
+        return [self.reader.pages[i].extract_text() for i in page_indices]
+
+    def close(self):
+        pass
+
+
+class PdfiumDocument:
+    def __init__(self, data):
+        import pypdfium2
+        self.pdf = pypdfium2.PdfDocument(data)
+        self.page_count = len(self.pdf)
+
+    def extract(self, page_indices):
+        texts = []
+        for i in page_indices:
+            page = self.pdf[i]
+            textpage = page.get_textpage()
+            texts.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return texts
+
+    def close(self):
+        self.pdf.close()
+
+
+class PdfMinerDocument:
+    def __init__(self, data):
+        from pdfminer.pdfpage import PDFPage
+        self.data = data
+        self.page_count = sum(1 for _ in PDFPage.get_pages(io.BytesIO(data)))
+
+    def extract(self, page_indices):
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+
+        # pdfminer yields the requested pages in document order, in one pass
+        wanted = sorted(set(page_indices))
+        by_index = {}
+        for i, layout in zip(wanted, extract_pages(io.BytesIO(self.data), page_numbers=wanted)):
+            by_index[i] = "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+        return [by_index.get(i, "") for i in page_indices]
+
+    def close(self):
+        pass
+
+
+_DOCUMENT_TYPES = {
+    "pypdf2": PyPDF2Document,
+    "pdfium": PdfiumDocument,
+    "pdfminer": PdfMinerDocument,
+}
+
+
+def open_pdf(data, backend=DEFAULT_BACKEND):
+    """Open PDF bytes with the given backend; the result has .page_count and .extract(indices)"""
+    if backend not in _DOCUMENT_TYPES:
+        raise ValueError(f"Unknown PDF backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    return _DOCUMENT_TYPES[backend](data)
+
+
+def extract_pages(data, page_indices, backend=DEFAULT_BACKEND):
+    """Text of the given pages, joined in the order given"""
+    doc = open_pdf(data, backend)
+    try:
+        return "".join(doc.extract(page_indices))
+    finally:
+        doc.close()
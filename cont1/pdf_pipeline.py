@@ -0,0 +1,221 @@
+"""
+Concurrent download + text extraction for the court opinion PDFs.
+
+Downloads are network bound and run on a thread pool; text extraction is
+CPU bound and runs on a process pool, with the PDF library chosen by
+`backend` (see pdf_extract). Pages are either the fixed first/last window
+or, with a token budget, the best-scoring pages (see page_select). A semaphore caps how many PDFs can be
+downloaded but not yet extracted, so memory stays flat on large folders.
+"""
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+
+from page_select import select_scored_pages
+from pdf_extract import open_pdf, DEFAULT_BACKEND
+
+DOWNLOAD_WORKERS = 8
+EXTRACT_WORKERS = os.cpu_count() or 1
+
+# Downloaded-but-not-yet-extracted PDFs held in memory at once
+MAX_IN_FLIGHT = 32
+
+
+class DriveSource:
+    """Lists and downloads the PDFs in a Google Drive folder"""
+
+    def __init__(self, credentials, folder_id=None):
+        self.credentials = credentials
+        self.folder_id = folder_id
+        self._local = threading.local()
+
+    def _service(self):
+        # Drive services wrap an httplib2 connection, which is not thread-safe,
+        # so each download thread builds its own
+        if not hasattr(self._local, "service"):
+            from googleapiclient.discovery import build
+            self._local.service = build('drive', 'v3', credentials=self.credentials, cache_discovery=False)
+        return self._local.service
+
+    def list_files(self):
+        query = "mimeType='application/pdf'"
+        if self.folder_id:
+            query += f" and '{self.folder_id}' in parents"
+
+        # Handle pagination to get all files
+        files = []
+        page_token = None
+
+        while True:
+            results = self._service().files().list(
+                q=query,
+                fields="nextPageToken, files(id, name, md5Checksum)",
+                pageSize=100,
+                pageToken=page_token
+            ).execute()
+
+            files.extend(results.get('files', []))
+            page_token = results.get('nextPageToken')
+
+            if not page_token:
+                break
+
+        return files
+
+    def fetch(self, file):
+        from googleapiclient.http import MediaIoBaseDownload
+
+        request = self._service().files().get_media(fileId=file['id'])
+        fh = io.BytesIO()
+        downloader = MediaIoBaseDownload(fh, request)
+        done = False
+        while not done:
+            status, done = downloader.next_chunk()
+        return fh.getvalue()
+
+
+class LocalFolderSource:
+    """Reads PDFs from a local directory, a stand-in for Drive when working offline"""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+
+    def list_files(self):
+        # md5Checksum mirrors the field Drive reports, so both sources can be cached the same way
+        return [
+            {
+                'id': p.relative_to(self.folder).as_posix(),
+                'name': p.name,
+                'md5Checksum': hashlib.md5(p.read_bytes()).hexdigest(),
+            }
+            for p in sorted(self.folder.rglob('*.pdf'))
+        ]
+
+    def fetch(self, file):
+        return (self.folder / file['id']).read_bytes()
+
+
+def select_pages(total_pages, max_pages, last_pages):
+    """Return (page indices to extract, human readable note)"""
+    if total_pages <= max_pages + last_pages:
+        # Document is short enough - extract all pages
+        return list(range(total_pages)), f"all {total_pages} pages"
+
+    # Extract first max_pages and last last_pages
+    first_pages = list(range(max_pages))
+    last_page_indices = list(range(total_pages - last_pages, total_pages))
+    note = f"first {max_pages} + last {last_pages} pages (out of {total_pages})"
+    return first_pages + last_page_indices, note
+
+
+def extract_pdf_text(data, max_pages, last_pages, backend=DEFAULT_BACKEND, token_budget=None):
+    """
+    Extract text from PDF bytes. Runs inside the extraction process pool.
+    With a token_budget, every page is read and scored and only the chosen
+    ones are kept; otherwise the first max_pages + last last_pages are read.
+    """
+    doc = open_pdf(data, backend)
+    try:
+        total_pages = doc.page_count
+        if token_budget is None:
+            pages_to_extract, extraction_note = select_pages(total_pages, max_pages, last_pages)
+            page_texts = doc.extract(pages_to_extract)
+        else:
+            all_texts = doc.extract(range(total_pages))
+            pages_to_extract, tokens = select_scored_pages(all_texts, token_budget)
+            page_texts = [all_texts[i] for i in pages_to_extract]
+            extraction_note = f"{len(pages_to_extract)} scored pages of {total_pages}, ~{tokens} tokens"
+
+        text = "".join(page_texts)
+    finally:
+        doc.close()
+
+    return {
+        'text': text,
+        'total_pages': total_pages,
+        'extracted_pages': pages_to_extract,
+        'extraction_note': extraction_note,
+    }
+
+
+def run_pipeline(source, files=None, max_pages=20, last_pages=3,
+                 download_workers=DOWNLOAD_WORKERS, extract_workers=EXTRACT_WORKERS,
+                 max_in_flight=MAX_IN_FLIGHT, backend=DEFAULT_BACKEND, token_budget=None):
+    """
+    Download and extract every PDF from `source`.
+    Returns documents in listing order; files that fail are reported and skipped.
+    'extracted_pages' holds the 0-based indices of the pages kept.
+    """
+    if files is None:
+        files = source.list_files()
+    if not files:
+        return []
+
+    slots = threading.BoundedSemaphore(max_in_flight)
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=extract_workers) as extract_pool, \
+            ThreadPoolExecutor(max_workers=download_workers) as download_pool:
+
+        def download(file):
+            try:
+                data = source.fetch(file)
+                # A broken process pool raises here; the slot must still be freed
+                extract_future = extract_pool.submit(extract_pdf_text, data, max_pages, last_pages, backend, token_budget)
+            except BaseException:
+                slots.release()
+                raise
+            extract_future.add_done_callback(lambda _: slots.release())
+            return len(data), extract_future
+
+        # The producer blocks here once max_in_flight PDFs are waiting on extraction
+        download_futures = []
+        for file in files:
+            slots.acquire()
+            try:
+                download_futures.append(download_pool.submit(download, file))
+            except BaseException:
+                slots.release()
+                raise
+
+        documents = []
+        total_bytes = 0
+        total_pages = 0
+        failed = 0
+        for file, download_future in zip(files, download_futures):
+            try:
+                n_bytes, extract_future = download_future.result()
+                result = extract_future.result()
+            except Exception as e:
+                failed += 1
+                print(f"  ✗ Error processing {file['name']}: {e}")
+                continue
+
+            total_bytes += n_bytes
+            total_pages += len(result['extracted_pages'])
+            documents.append({
+                'name': file['name'],
+                'text': result['text'],
+                'file_id': file['id'],
+                'total_pages': result['total_pages'],
+                'extracted_pages': result['extracted_pages']
+            })
+            print(f"Downloaded: {file['name']} ({result['extraction_note']}, {len(result['text'])} characters)")
+
+    elapsed = time.perf_counter() - start
+    print_throughput(len(documents), failed, total_bytes, total_pages, elapsed,
+                     download_workers, extract_workers, backend)
+    return documents
+
+
+def print_throughput(n_docs, failed, total_bytes, total_pages, elapsed,
+                     download_workers, extract_workers, backend):
+    elapsed = max(elapsed, 1e-9)
+    print(f"\nIngestion throughput ({download_workers} download / {extract_workers} {backend} extract workers):")
+    print(f"  Documents: {n_docs} ok, {failed} failed in {elapsed:.1f}s")
+    print(f"  {n_docs / elapsed:.2f} docs/s, {total_pages / elapsed:.1f} pages/s, "
+          f"{total_bytes / elapsed / 1e6:.2f} MB/s")
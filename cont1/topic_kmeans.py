@@ -0,0 +1,134 @@
+"""
+K-Means for the topic layers, warm-started from the previous run.
+
+Each named fit (e.g. "testing_kmeans") keeps its case keys, labels and
+centroids under STATE_DIR. On the next run the initial centroids are the
+means of each previous cluster's surviving members in the current features,
+falling back to the stored centroid for a cluster with no surviving member.
+This stays valid when the clustering space itself has moved (a UMAP refit).
+A warm fit runs K-Means once (n_init=1) from that init instead of ten cold
+restarts, and keeps topic ids stable from run to run. The number of clusters
+changing, or the feature dimension changing, means a cold start.
+
+Above MINIBATCH_MIN_DOCS cases MiniBatchKMeans is used (algorithm="auto").
+
+Every fit prints how many of the cases seen last time changed topic, after
+matching previous to current topics by overlap, so cold runs with shuffled
+ids are compared fairly.
+"""
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+STATE_DIR = "kmeans_state"
+ALGORITHMS = ("auto", "full", "minibatch")
+MINIBATCH_MIN_DOCS = 10000
+MINIBATCH_SIZE = 1024
+
+
+def _state_path(name, state_dir):
+    return Path(state_dir) / f"{name}.npz"
+
+
+def load_state(name, state_dir=STATE_DIR):
+    path = _state_path(name, state_dir)
+    if not path.exists():
+        return None
+    with np.load(path) as npz:
+        return {
+            "keys": npz["keys"].tolist(),
+            "labels": npz["labels"],
+            "centroids": npz["centroids"],
+        }
+
+
+def save_state(name, keys, labels, centroids, state_dir=STATE_DIR):
+    path = _state_path(name, state_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # np.savez appends .npz to names without it, so the temp name keeps the suffix
+    tmp = path.with_name(f"{path.stem}.tmp.npz")
+    np.savez(tmp, keys=np.array(keys, dtype=str), labels=np.asarray(labels), centroids=centroids)
+    os.replace(tmp, path)
+
+
+def warm_init(features, keys, state, n_clusters):
+    """Initial centroids from the previous run, or None when a cold start is needed"""
+    if state is None or len(state["centroids"]) != n_clusters or state["centroids"].shape[1] != features.shape[1]:
+        return None
+    init = state["centroids"].astype(features.dtype, copy=True)
+    row = {key: i for i, key in enumerate(keys)}
+    members = [[] for _ in range(n_clusters)]
+    for key, label in zip(state["keys"], state["labels"]):
+        if key in row:
+            members[label].append(row[key])
+    for label, rows in enumerate(members):
+        if rows:
+            init[label] = features[rows].mean(axis=0)
+    return init
+
+
+def label_stability(prev_keys, prev_labels, keys, labels):
+    """
+    Cases in both runs and how many changed topic, with previous topics
+    matched one-to-one to current topics by overlap; plus the adjusted Rand
+    index, which needs no matching.
+    """
+    from scipy.optimize import linear_sum_assignment
+    from sklearn.metrics import adjusted_rand_score
+
+    current = dict(zip(keys, labels))
+    pairs = [(p, current[k]) for k, p in zip(prev_keys, prev_labels) if k in current]
+    if not pairs:
+        return {"common": 0, "changed": 0, "ari": None}
+    prev, curr = np.array(pairs).T
+    overlap = np.zeros((prev.max() + 1, curr.max() + 1), dtype=np.int64)
+    np.add.at(overlap, (prev, curr), 1)
+    rows, cols = linear_sum_assignment(overlap, maximize=True)
+    kept = int(overlap[rows, cols].sum())
+    return {"common": len(pairs), "changed": len(pairs) - kept, "ari": float(adjusted_rand_score(prev, curr))}
+
+
+def fit_kmeans(features, n_clusters, keys=None, name=None, algorithm="auto", warm_start=True,
+               state_dir=STATE_DIR, random_state=42):
+    """
+    Fitted (MiniBatch)KMeans on features. With `keys` and `name` the fit is
+    warm-started from, and saved for, the next run under that name.
+    """
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    if algorithm == "auto":
+        algorithm = "minibatch" if len(features) >= MINIBATCH_MIN_DOCS else "full"
+    if algorithm not in ("full", "minibatch"):
+        raise ValueError(f"Unknown K-Means algorithm '{algorithm}' (choose from {', '.join(ALGORITHMS)})")
+
+    persist = keys is not None and name is not None
+    keys = list(keys) if persist else None
+    state = load_state(name, state_dir) if persist else None
+    init = warm_init(features, keys, state, n_clusters) if (persist and warm_start) else None
+
+    params = dict(n_clusters=n_clusters, random_state=random_state)
+    if init is not None:
+        params.update(init=init, n_init=1)
+    else:
+        params.update(n_init=10)
+    if algorithm == "minibatch":
+        kmeans = MiniBatchKMeans(batch_size=MINIBATCH_SIZE, **params)
+    else:
+        kmeans = KMeans(**params)
+
+    start = time.perf_counter()
+    labels = kmeans.fit_predict(features)
+    print(f"  {'MiniBatchKMeans' if algorithm == 'minibatch' else 'KMeans'} k={n_clusters} "
+          f"({'warm start' if init is not None else 'cold start'}) in {time.perf_counter() - start:.1f}s")
+
+    if persist:
+        if state is not None:
+            report = label_stability(state["keys"], state["labels"], keys, labels)
+            if report["common"]:
+                print(f"  Topic stability ({name}): {report['changed']}/{report['common']} cases changed topic "
+                      f"since the last run ({100 * report['changed'] / report['common']:.1f}%), "
+                      f"ARI {report['ari']:.3f}")
+        save_state(name, keys, labels, kmeans.cluster_centers_, state_dir)
+    return kmeans
@@ -0,0 +1,162 @@
+"""
+Persisted UMAP layout, so the map stays put between runs.
+
+The first run fits UMAP on every embedding, as before, and saves the fitted
+reducer (pickle) together with the coordinates of every case, keyed like the
+embedding store. Later runs reuse the stored coordinates of unchanged cases
+and place new or edited cases with reducer.transform (project_new), which
+takes milliseconds and moves nothing that is already on the map.
+
+A full refit happens when asked for (refit=True), when the UMAP parameters
+or the embedding model change, or when the share of cases that were not in
+the fitted set passes the drift threshold. Past that point, transformed
+cases no longer reflect the structure of the corpus well enough.
+
+A fit can use a precomputed kNN graph (knn_graph.load_knn) instead of
+building one inside UMAP. Graphs without a search index (hnswlib, exact)
+leave the reducer unable to transform, so new cases then mean a refit.
+"""
+import json
+import os
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+
+REDUCER_DIR = "umap_reducer"
+DRIFT_THRESHOLD = 0.2
+
+
+class PersistedUMAP:
+    def __init__(self, directory=REDUCER_DIR, space=None, **params):
+        """
+        `space` names the embedding space (e.g. the embedding store model);
+        `params` are passed to UMAP.
+        """
+        self.directory = Path(directory)
+        self.space = space
+        self.params = params
+        self.reducer = None
+        self.coords = {}
+        self.meta = {}
+        self._load()
+
+    @property
+    def _reducer_path(self):
+        return self.directory / "reducer.pkl"
+
+    @property
+    def _coords_path(self):
+        return self.directory / "coords.npz"
+
+    @property
+    def _meta_path(self):
+        return self.directory / "meta.json"
+
+    def _load(self):
+        if not (self._meta_path.exists() and self._reducer_path.exists() and self._coords_path.exists()):
+            return
+        meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        if meta.get("params") != self.params or meta.get("space") != self.space:
+            print("  UMAP settings or embedding space changed since the saved fit; it will be refit")
+            return
+        with open(self._reducer_path, "rb") as f:
+            self.reducer = pickle.load(f)
+        with np.load(self._coords_path) as npz:
+            self.coords = dict(zip(npz["keys"].tolist(), npz["coords"]))
+        self.meta = meta
+
+    def _save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        keys = list(self.coords)
+        coords = np.array([self.coords[k] for k in keys], dtype=np.float32)
+
+        # Every file goes through a temp name so a crash never leaves half a file
+        tmp = self._reducer_path.with_suffix(".pkl.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(self.reducer, f)
+        os.replace(tmp, self._reducer_path)
+        tmp = self.directory / "coords.tmp.npz"
+        np.savez(tmp, keys=np.array(keys, dtype=str), coords=coords)
+        os.replace(tmp, self._coords_path)
+        tmp = self._meta_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+        os.replace(tmp, self._meta_path)
+
+    def fit(self, keys, embeddings, knn=None):
+        """
+        Fit UMAP on all embeddings and replace every stored coordinate.
+        `knn` is an optional callable returning UMAP's precomputed_knn tuple;
+        it is only called here, so the graph is not loaded when nothing is fit.
+        """
+        from umap import UMAP
+
+        start = time.perf_counter()
+        precomputed = knn() if knn is not None else None
+        if precomputed is not None:
+            self.reducer = UMAP(precomputed_knn=precomputed, **self.params)
+        else:
+            self.reducer = UMAP(**self.params)
+        reduced = self.reducer.fit_transform(embeddings)
+        self.coords = dict(zip(keys, reduced.astype(np.float32)))
+        self.meta = {
+            "params": self.params,
+            "space": self.space,
+            "n_fit": len(keys),
+            "n_projected": 0,
+            "transformable": precomputed is None or precomputed[2] is not None,
+            "fitted_at": time.time(),
+        }
+        self._save()
+        print(f"  Fitted UMAP on {len(keys)} embeddings in {time.perf_counter() - start:.1f}s")
+        return reduced
+
+    def project_new(self, embeddings):
+        """Place embeddings on the existing map without refitting"""
+        if self.reducer is None:
+            raise RuntimeError("No fitted UMAP reducer; call fit() first")
+        return self.reducer.transform(np.asarray(embeddings))
+
+    def drift(self, keys):
+        """Share of `keys` that were not part of the fitted set"""
+        if not keys:
+            return 0.0
+        fitted = self.meta.get("n_fit", 0)
+        projected = self.meta.get("n_projected", 0) + sum(1 for k in keys if k not in self.coords)
+        return projected / max(fitted + projected, 1)
+
+    def coordinates(self, keys, embeddings, refit=False, drift_threshold=DRIFT_THRESHOLD, knn=None):
+        """
+        Coordinates for every case, in `keys` order: stored ones where the
+        case is unchanged, transformed ones for new cases, or a fresh fit.
+        """
+        keys = list(keys)
+        if refit or self.reducer is None:
+            return self.fit(keys, embeddings, knn)
+
+        drift = self.drift(keys)
+        if drift > drift_threshold:
+            print(f"  {100 * drift:.0f}% of cases were not in the fitted set "
+                  f"(threshold {100 * drift_threshold:.0f}%), refitting UMAP")
+            return self.fit(keys, embeddings, knn)
+
+        new = [i for i, k in enumerate(keys) if k not in self.coords]
+        if new and not self.meta.get("transformable", True):
+            print(f"  {len(new)} new cases, but the saved reducer was fit without a search index; refitting UMAP")
+            return self.fit(keys, embeddings, knn)
+        if new:
+            start = time.perf_counter()
+            projected = self.project_new(embeddings[new]).astype(np.float32)
+            for i, xy in zip(new, projected):
+                self.coords[keys[i]] = xy
+            self.meta["n_projected"] = self.meta.get("n_projected", 0) + len(new)
+            print(f"  Projected {len(new)} new cases onto the saved map in {time.perf_counter() - start:.2f}s")
+
+        # Forget cases that left the corpus
+        removed = len(self.coords) - len(set(keys))
+        self.coords = {k: self.coords[k] for k in keys}
+        if new or removed:
+            self._save()
+        print(f"  Reused {len(keys) - len(new)} saved coordinates (drift {100 * self.drift(keys):.0f}%)")
+        return np.array([self.coords[k] for k in keys])
@@ -1,4 +1,9 @@
 import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.case_table import load_columns, load_documents
 
 # Privacy and Data Protection
 # IP Law
@@ -8,16 +13,10 @@ import json
 NAME = 'Tort'
 
 def filter_privacy_cases(input_file, output_file):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    cases = data.get('documents', [])
-
-    filtered_cases = []
-    for case in cases:
-        if isinstance(case, dict):
-            if case.get('legal_category_name') == NAME:
-                filtered_cases.append(case)
+    # Only the category column is scanned; just the matching cases are loaded in full
+    categories = load_columns(input_file, ['legal_category_name'])['legal_category_name']
+    rows = [i for i, category in enumerate(categories) if category == NAME]
+    filtered_cases = load_documents(input_file, rows=rows)
     
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(filtered_cases, f, indent=2, ensure_ascii=False)
@@ -1,15 +1,19 @@
 import json
 import os
-from openai import OpenAI
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.batch_jobs import OpenAIBatchBackend, FileBatchBackend, run_batch
+from common.openai_client import get_client
 
 CASE_TYPE = "privacy"
 CASE_TYPE_TITLE = "Consumer Protection"
+BATCH_DIR = "batch_jobs"
 
-def extract_case_structure(case_data):
-    with open("../otherkey.txt") as f:
-        key = f.read().strip()
-    client = OpenAI(api_key=key)
-
+def build_extraction_request(case_data):
+    """chat.completions.create kwargs for extracting one case's structure"""
     schema = {
         "name": "case_extraction",
         "schema": {
@@ -75,22 +79,28 @@ def extract_case_structure(case_data):
         - For ai_presence: Read through the entire case text, extract the text describing where AI is mentioned..
         """
     
-    response = client.chat.completions.create(
-        model="gpt-5.1",
-        response_format={
+    return {
+        "model": "gpt-5.1",
+        "response_format": {
             "type": "json_schema",
             "json_schema": schema
         },
-        messages=[
+        "messages": [
             {"role": "system", "content": "Return valid JSON ONLY, following the schema."},
             {"role": "user", "content": prompt}
         ],
-        temperature=0
-    )
+        "temperature": 0
+    }
+
+def extract_case_structure(case_data, client=None):
+    client = client or get_client()
+
+    response = client.chat.completions.create(**build_extraction_request(case_data))
 
     return json.loads(response.choices[0].message.content)
 
-def process_cases(input_file, output_file):
+def process_cases(input_file, output_file, client=None):
+    client = client or get_client()
     with open(input_file, 'r') as f:
         cases = json.load(f)
     
@@ -100,7 +110,7 @@ def process_cases(input_file, output_file):
         print(f"Processing case {i+1}/{len(cases)}: {case['name']}")
         
         try:
-            extracted = extract_case_structure(case)
+            extracted = extract_case_structure(case, client)
             print(f"Extracted data: {extracted}")
             results.append(extracted)
         except Exception as e:
@@ -116,5 +126,47 @@ def process_cases(input_file, output_file):
     print(f"\nProcessed {len(results)} cases")
     print(f"Results written to {output_file}")
 
+def process_cases_batch(input_file, output_file, backend, poll_interval=30):
+    """Same output as process_cases, but all cases go out as one Batch API job"""
+    with open(input_file, 'r') as f:
+        cases = json.load(f)
+
+    # Case names are not guaranteed unique, so custom_ids are positional
+    requests = [(f"case-{i}", build_extraction_request(case)) for i, case in enumerate(cases)]
+    batch_results = run_batch(backend, requests, BATCH_DIR, f"{CASE_TYPE}_breakdown", poll_interval=poll_interval)
+
+    results = []
+    for i, case in enumerate(cases):
+        result = batch_results[f"case-{i}"]
+        try:
+            if isinstance(result, Exception):
+                raise result
+            results.append(json.loads(result))
+        except Exception as e:
+            print(f"Error processing case {case['name']}: {e}")
+            results.append({
+                "case_id": case['name'],
+                "error": str(e)
+            })
+
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nProcessed {len(results)} cases")
+    print(f"Results written to {output_file}")
+
 if __name__ == "__main__":
-    process_cases(f"{CASE_TYPE}/{CASE_TYPE_TITLE}.json", f"{CASE_TYPE}/cases_breakdown.json")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract claims, defenses and parties for each case")
+    parser.add_argument("--batch", choices=["openai", "local"],
+                        help="send all cases as one Batch API job ('local' completes batches offline)")
+    args = parser.parse_args()
+
+    input_file = f"{CASE_TYPE}/{CASE_TYPE_TITLE}.json"
+    output_file = f"{CASE_TYPE}/cases_breakdown.json"
+
+    if args.batch == "local":
+        process_cases_batch(input_file, output_file, FileBatchBackend(os.path.join(BATCH_DIR, "local")), poll_interval=0)
+    elif args.batch == "openai":
+        process_cases_batch(input_file, output_file, OpenAIBatchBackend(get_client()))
+    else:
+        process_cases(input_file, output_file)
\ No newline at end of file
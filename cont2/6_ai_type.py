@@ -3,12 +3,11 @@ import json
 from collections import Counter
 import re
 from pathlib import Path
-import spacy
-from rake_nltk import Rake
+import sys
 
 
-nlp = spacy.load("en_core_web_sm")
-rake = Rake()
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.nlp_models import get_rake
 
 NAME = "privacy"
 
@@ -35,6 +34,7 @@ def extract_ai_tech_type(description):
 
     ###
     # 1. RAKE Keyphrase Extraction
+    rake = get_rake()
     rake.extract_keywords_from_text(description)
     phrases = [p.lower() for p in rake.get_ranked_phrases()]
     phrase_text = " ".join(phrases)
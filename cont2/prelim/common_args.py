@@ -2,10 +2,17 @@
 import json
 import os
 import sys
-from openai import OpenAI
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.openai_client import get_client
+from common.prompt_budget import pack_items
 
 INPUT_PATH = "/Users/julie12yu/development/casework_vis/privacy_args_breakdown.json"
 
+# Tokens of case snippets per side (the old 18000-character cut is ~4500)
+PAYLOAD_TOKENS = 4500
+
 
 PROMPT_TEMPLATE = """You are analyzing multiple legal case snippets about AI/IP.
 Each item has an "input" (neutral summary) plus either plaintiff or defendant arguments.
@@ -26,7 +33,7 @@ def load_json(INPUT_PATH):
     with open(INPUT_PATH, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def collect_text(data, side):
+def collect_items(data, side):
     """side is 'plaintiff' or 'defendant'."""
     chunks = []
     for key in sorted(data.keys()):
@@ -38,11 +45,13 @@ def collect_text(data, side):
             arg = item.get("defendant_arg", "")
         if inp or arg:
             chunks.append(f"- INPUT: {inp}\n- ARG: {arg}")
-    return "\n\n".join(chunks)
+    return chunks
 
-def trim(text, max_chars=18000):
-    # keep it simple: trim to avoid overlong prompts
-    return text[:max_chars]
+def build_payload(data, side, budget=PAYLOAD_TOKENS):
+    # Whole items, most representative first, instead of cutting mid-item
+    packed = pack_items(collect_items(data, side), budget)
+    print(f"{side}: {len(packed.indices)}/{packed.n_items} items, {packed.tokens} tokens")
+    return packed.text
 
 def ask_gpt(client, model, side, payload):
     prompt = PROMPT_TEMPLATE.format(side=side.upper(), payload=payload)
@@ -63,14 +72,12 @@ def main():
         print(f"Failed to load JSON: {e}")
         sys.exit(1)
 
-    with open("otherkey.txt") as f:
-        key = f.read().strip()
-    client = OpenAI(api_key=key)
+    client = get_client()
     model = "gpt-4o"
 
     # Build payloads
-    plaintiff_payload = trim(collect_text(data, "plaintiff"))
-    defendant_payload = trim(collect_text(data, "defendant"))
+    plaintiff_payload = build_payload(data, "plaintiff")
+    defendant_payload = build_payload(data, "defendant")
 
     # Query GPT-4o
     print("\n=== Common Plaintiff Arguments ===\n")
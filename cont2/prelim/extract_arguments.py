@@ -1,10 +1,12 @@
 import json
-from openai import OpenAI
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from common.openai_client import get_client
 
 # Initialize client
-with open("otherkey.txt") as f:
-    key = f.read().strip()
-client = OpenAI(api_key=key)
+client = get_client()
 
 INPUT_PATH = "/Users/julie12yu/development/casework_vis/privacy_summary.txt"
 OUTPUT_PATH = "/Users/julie12yu/development/casework_vis/privacy_args_breakdown.json"
@@ -1,28 +1,29 @@
 import json
+import sys
+from pathlib import Path
 import pandas as pd
 from pandas import json_normalize
-import json
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.case_table import load_columns
 
 UNRELATED = "Unrelated"
 AILEGAL = "AI in Legal Proceedings"
 OUTPUT = "relevant_cases"
 
 def filter_privacy_cases(input_file, output_file):
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    cases = data.get('documents', [])
+    # Only the three columns kept are read, never full_text
+    columns = load_columns(input_file, ["name", "summary", "legal_category_name"])
 
     filtered_cases = []
-    for case in cases:
-        if isinstance(case, dict):
-            if case.get('legal_category_name') != UNRELATED and case.get('legal_category_name') != AILEGAL :
-                filtered_case = {
-                    "name": case.get("name"),
-                    "summary": case.get("summary"),
-                    "legal_category_name": case.get("legal_category_name")
-                }
-                filtered_cases.append(filtered_case)
+    for name, summary, category in zip(columns["name"], columns["summary"], columns["legal_category_name"]):
+        if category != UNRELATED and category != AILEGAL:
+            filtered_case = {
+                "name": name,
+                "summary": summary,
+                "legal_category_name": category
+            }
+            filtered_cases.append(filtered_case)
     
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(filtered_cases, f, indent=2, ensure_ascii=False)
@@ -1,11 +1,12 @@
 import json
-import os
-from openai import OpenAI
+import sys
+from pathlib import Path
 
-def extract_case_structure(case_data):
-    with open("../otherkey.txt") as f:
-        key = f.read().strip()
-    client = OpenAI(api_key=key)
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.openai_client import get_client
+
+def extract_case_structure(case_data, client=None):
+    client = client or get_client()
 
     schema = {
         "name": "case_extraction",
@@ -94,7 +95,8 @@ def extract_case_structure(case_data):
 
     return json.loads(response.choices[0].message.content)
 
-def process_cases(input_file, output_file):
+def process_cases(input_file, output_file, client=None):
+    client = client or get_client()
     with open(input_file, 'r') as f:
         cases = json.load(f)
     
@@ -104,7 +106,7 @@ def process_cases(input_file, output_file):
         print(f"Processing case {i+1}/{len(cases)}: {case['name']}")
         
         try:
-            extracted = extract_case_structure(case)
+            extracted = extract_case_structure(case, client)
             print(f"Extracted data: {extracted}")
             results.append(extracted)
         except Exception as e:
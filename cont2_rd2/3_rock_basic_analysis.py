@@ -2,13 +2,8 @@ import json
 from collections import Counter
 import re
 from pathlib import Path
-import spacy
-from rake_nltk import Rake
 
 
-nlp = spacy.load("en_core_web_sm")
-rake = Rake()
-
 NAME = "ipLaw"
 
 # inconsistent usage for now
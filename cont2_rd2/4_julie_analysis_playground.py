@@ -2,12 +2,11 @@ import json
 from collections import Counter
 import re
 from pathlib import Path
-import spacy
-from rake_nltk import Rake
+import sys
 
 
-nlp = spacy.load("en_core_web_sm")
-rake = Rake()
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from common.nlp_models import get_nlp, get_rake
 
 CURR_CATEGORY = "individual"
 
@@ -33,6 +32,7 @@ def extract_party_type(description):
 
     ###
     # 1. RAKE Keyphrase Extraction
+    rake = get_rake()
     rake.extract_keywords_from_text(description)
     phrases = [p.lower() for p in rake.get_ranked_phrases()]
     phrase_text = " ".join(phrases)
@@ -144,7 +144,7 @@ def extract_party_type(description):
 
     ###
     # 3. NER: FIND INDIVIDUALS
-    doc = nlp(description)
+    doc = get_nlp()(description)
     for ent in doc.ents:
         if ent.label_ == "PERSON":
             return "individual"
@@ -1,4 +1,5 @@
 import os
+import sys
 import pickle
 from pathlib import Path
 import json
@@ -12,6 +13,9 @@ import PyPDF2
 from openai import OpenAI
 import time
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.llm_cache import CachedChatClient
+
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 DRIVE_FOLDER_NAME = "nov_12_court_pdfs"
 OUTPUT_FILE = "court_cases_with_summaries.json"
@@ -269,7 +273,7 @@ def main():
     
     with open("otherkey.txt") as f:
         key = f.read().strip()
-    client = OpenAI(api_key=key)
+    client = CachedChatClient(OpenAI(api_key=key))
     
     summaries = generate_summaries(documents, client, delay=1.0)
     
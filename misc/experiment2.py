@@ -1,14 +1,22 @@
 import json
+import sys
+from pathlib import Path
 import numpy as np
 import pandas as pd
 import torch
-from transformers import AutoTokenizer, AutoModel
 from umap import UMAP
 from sklearn.cluster import KMeans
 from datamapplot import create_plot
 from openai import OpenAI
 import time
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.llm_cache import CachedChatClient
+sys.path.append(str(Path(__file__).resolve().parent.parent / "cont1"))
+from embedding_engine import load_legalbert_model, embed_texts
+from cluster_index import ClusterIndex
+from cluster_sampling import ClusterSampler
+
 INPUT_FILE = "court_cases_with_summaries.json"
 OUTPUT_HTML = "court_cases_visualization.html"
 
@@ -31,46 +39,17 @@ def load_data(input_file):
     
     return data
 
-def load_legalbert_model():
-    """Load LegalBERT model and tokenizer"""
-    print("\nLoading LegalBERT model...")
-    model_name = "nlpaueb/legal-bert-base-uncased"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModel.from_pretrained(model_name)
-    print("✓ Model loaded")
-    return tokenizer, model
-
 def generate_embeddings(summaries, tokenizer, model):
     """
     Generate embeddings from SUMMARIES (not full text)
     Summaries are designed to fit within LegalBERT's 512 token limit
     """
     print("\nGenerating embeddings from summaries...")
-    
-    embeddings = []
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    model.to(device)
-    model.eval()
-    
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
     print(f"Using device: {device}")
-    
-    for i, summary in enumerate(summaries):
-        # Embed the SUMMARY (not the full text)
-        # The tokenizer will handle truncation if needed, but summaries should fit
-        inputs = tokenizer(summary, return_tensors="pt", truncation=True, max_length=512, padding=True)
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            outputs = model(**inputs)
-            embedding = outputs.last_hidden_state[:, 0, :].cpu().numpy()
-        
-        embeddings.append(embedding[0])
-        
-        if (i + 1) % 10 == 0:
-            print(f"  Embedded {i + 1}/{len(summaries)} summaries")
-    
+    embeddings = embed_texts(summaries, tokenizer, model, device=device)
     print(f"✓ Generated {len(embeddings)} embeddings")
-    return np.array(embeddings)
+    return embeddings
 
 def reduce_dimensions(embeddings, n_components=2):
     """Reduce embeddings to 2D using UMAP"""
@@ -101,11 +80,12 @@ def cluster_documents(embeddings_2d, n_clusters_low=50, n_clusters_high=10):
     print("✓ Clustering complete")
     return labels_low, high_level_labels, kmeans_low.cluster_centers_
 
-def generate_cluster_names(summaries, labels, client, delay=1.0):
+def generate_cluster_names(summaries, labels, client, delay=1.0, sampler=None):
     """
     Generate names for clusters using OpenAI
     """
-    unique_labels = np.unique(labels)
+    index = ClusterIndex(labels)
+    unique_labels = index.labels
     cluster_names = {}
     
     print(f"\nGenerating names for {len(unique_labels)} clusters...")
@@ -113,10 +93,11 @@ def generate_cluster_names(summaries, labels, client, delay=1.0):
     
     for i, label in enumerate(unique_labels):
         # Get summaries for this cluster
-        cluster_docs = [summaries[j] for j, l in enumerate(labels) if l == label]
+        members = index.members(label)
         
-        # Sample up to 5 documents from the cluster
-        sample = "\n\n".join(cluster_docs[:5])
+        # Sample up to 5 documents from the cluster, nearest its centroid when embeddings are given
+        picks = sampler.order(members, 5) if sampler is not None else range(min(5, len(members)))
+        sample = "\n\n".join(summaries[members[j]] for j in picks)
         
         try:
             response = client.chat.completions.create(
@@ -129,7 +110,9 @@ def generate_cluster_names(summaries, labels, client, delay=1.0):
 
 Cluster name:"""
                 }],
-                max_tokens=100
+                max_tokens=100,
+                # Deterministic, so re-runs are answered from the response cache
+                temperature=0
             )
             
             cluster_names[label] = response.choices[0].message.content.strip()
@@ -224,10 +207,11 @@ def main():
     
     with open("otherkey.txt") as f:
         key = f.read().strip()
-    client = OpenAI(api_key=key)
+    client = CachedChatClient(OpenAI(api_key=key))
     
-    cluster_names_low = generate_cluster_names(summaries, labels_low, client, delay=1.0)
-    cluster_names_high = generate_cluster_names(summaries, labels_high, client, delay=1.0)
+    sampler = ClusterSampler(embeddings)
+    cluster_names_low = generate_cluster_names(summaries, labels_low, client, delay=1.0, sampler=sampler)
+    cluster_names_high = generate_cluster_names(summaries, labels_high, client, delay=1.0, sampler=sampler)
     
     # Create visualization
     print("\n" + "=" * 60)
@@ -10,41 +10,42 @@ each document has:
   - hdbscan_cluster
 """
 
-import json
+import sys
 import numpy as np
 from sklearn.metrics import silhouette_score
 from pathlib import Path
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from common.case_table import load_columns
+
 INPUT_JSON = "new_court_cases_processed.json"
 
 
 def load_data(path: str):
     print(f"Loading processed data from {path}...")
-    with open(path, "r", encoding="utf-8") as f:
-        obj = json.load(f)
-
-    docs = obj["documents"]
-    print(f"  Loaded {len(docs)} documents")
+    # Only these columns are read, memory-mapped when there is a case table
+    columns = load_columns(path, ["x", "y", "fine_cluster", "mid_cluster", "hdbscan_cluster"])
+    print(f"  Loaded {len(columns['x'])} documents")
 
     # 2D coordinates
-    X = np.array([[d["x"], d["y"]] for d in docs], dtype=float)
+    X = np.column_stack([columns["x"], columns["y"]]).astype(float)
 
     # Cluster labels
-    labels_fine = np.array([d["fine_cluster"] for d in docs], dtype=int)
-    labels_mid = np.array([d["mid_cluster"] for d in docs], dtype=int)
-    labels_hdbscan = np.array([d["hdbscan_cluster"] for d in docs], dtype=int)
+    labels_fine = np.asarray(columns["fine_cluster"], dtype=int)
+    labels_mid = np.asarray(columns["mid_cluster"], dtype=int)
+    labels_hdbscan = np.asarray(columns["hdbscan_cluster"], dtype=int)
 
     return X, labels_fine, labels_mid, labels_hdbscan
 
 
-def safe_silhouette(X, labels, name: str):
+def safe_silhouette(X, labels, name: str, metric: str = "euclidean"):
     """Compute silhouette score if there are at least 2 clusters."""
     unique_labels = np.unique(labels)
     if len(unique_labels) < 2:
         print(f"  [!] Cannot compute silhouette for {name}: only {len(unique_labels)} cluster(s).")
         return None
 
-    score = silhouette_score(X, labels)
+    score = silhouette_score(X, labels, metric=metric)
     print(f"  Silhouette score ({name}): {score:.4f}")
     return score
 